@@ -1,16 +1,40 @@
 # ai_content_generator/app.py (MODIFIED)
 
 import streamlit as st
-import google.generativeai as genai # Import genai here for configuration
 
 # Import functions/data from our source package modules
 # Note: Make sure your terminal is running 'streamlit run app.py'
 # from the 'ai_content_generator' directory so imports work.
 # ASSUMPTION: src/context.py now includes 'brand_story' and 'call_to_action' in QUESTIONS
-from src.context import QUESTIONS # Import the questions dict
-from src.generators import generate_about_page, generate_blog_post, generate_blog_post_ideas
+import hashlib
+import json
+import os
+
+from src.context import QUESTIONS, context_site_id, site_key # Import the questions dict
+from src.api_config import api_key_owner, get_model, validate_api_key
+from src.cache import get_response_cache
+from src.metrics import get_metrics
+from src.routing import get_router
+from src.scheduler import get_scheduler, estimate_tokens, DEFAULT_OUTPUT_TOKEN_ESTIMATE
+from src.idea_index import get_idea_index, save_idea_index, POSTS
+from src.generators import generate_about_page, generate_about_page_and_ideas, generate_blog_post, generate_blog_post_ideas, generate_long_blog_post, stitch_sections, render_generator_prompt, enforce_quality, inputs_hash, idea_keywords
+from src.quality import check_quality, long_post_spec
+from src.bulk import ABOUT_PAGE, BLOG_IDEAS, BLOG_POST
+from src.jobs import get_job_queue, RUNNING, FAILED, BACKGROUND
+from src.store import get_content_store
+from src.utils import get_model_name
 # utils functions are used internally by generators now
 
+POSTS_PER_PAGE = 10
+JOB_POLL_SECONDS = 1.0
+# Speculative prefetch: posts for the first ideas start in the background as soon as ideas arrive
+PREFETCH_DEFAULT = os.getenv("CONTENT_PREFETCH", "0").lower() in ("1", "true", "yes")
+PREFETCH_TOP_K = int(os.getenv("CONTENT_PREFETCH_TOP_K", "3"))
+PREFETCH_TOKEN_BUDGET = int(os.getenv("CONTENT_PREFETCH_TOKEN_BUDGET", "6000"))  # Estimated tokens per idea list
+# Post lengths offered in the UI; long-form posts are written as an outline plus parallel sections
+POST_LENGTHS = {"Standard (~600-800 words)": None, "Long-form (~1,500 words)": 1500,
+                "Long-form (~2,000 words)": 2000, "Long-form (~3,000 words)": 3000}
+
 # --- Page Config ---
 st.set_page_config(page_title="AI Content Generator", layout="wide")
 
@@ -24,34 +48,259 @@ if 'model' not in st.session_state:
     st.session_state.model = None
 if 'site_context' not in st.session_state:
     st.session_state.site_context = None # Will store the dict from the form
-if 'about_page_content' not in st.session_state:
-    st.session_state.about_page_content = None
-if 'blog_ideas' not in st.session_state:
-    st.session_state.blog_ideas = None # Will store the list of ideas
-if 'generated_blog_posts' not in st.session_state:
-    st.session_state.generated_blog_posts = {} # key: topic, value: content
+if 'posts_page' not in st.session_state:
+    st.session_state.posts_page = 0 # Page of the "Generated Blog Posts" list
+if 'seen_finished_jobs' not in st.session_state:
+    st.session_state.seen_finished_jobs = set() # Finished jobs whose output is already on screen
+# Generated content is not kept in session state: it lives in the shared
+# content store (src/store.py), survives reloads and is loaded page by page.
+store = get_content_store()
+# Model calls run as background jobs on a pool shared by all sessions (src/jobs.py),
+# so button clicks return immediately and reruns never wait for the model.
+job_queue = get_job_queue()
+
+
+# --- Helpers for the content store ---
+def current_site_id():
+    return context_site_id(st.session_state.site_context)
+
+def current_owner():
+    # Saved sites belong to the visitor's API key, so a shared deployment never lists one
+    # visitor's sites to another (the store is only used once a key is configured)
+    return api_key_owner(st.session_state.api_key)
+
+def new_site_id(context):
+    # Salted with the owner, so two visitors who enter the same details never share stored content
+    return hashlib.sha256(f"{current_owner()}:{site_key(context)}".encode("utf-8")).hexdigest()[:16]
+
+def save_about_page(context, model, content, quality=None):
+    template_id, prompt = render_generator_prompt("about_page", context, brand_story=context.get("brand_story"),
+                                                  call_to_action=context.get("call_to_action"))
+    store.put(context_site_id(context), ABOUT_PAGE, content, prompt=prompt, template_id=template_id,
+              model=get_model_name(model), metadata={"quality": quality.as_dict()} if quality else None,
+              inputs_hash=inputs_hash(ABOUT_PAGE, context))
+
+def save_blog_ideas(context, model, ideas, details=None):
+    # details: per-idea keywords, intent and estimated length from structured idea generation
+    store.put(context_site_id(context), BLOG_IDEAS, json.dumps(ideas), model=get_model_name(model),
+              metadata={"ideas": details} if details else None, inputs_hash=inputs_hash(BLOG_IDEAS, context))
+
+def load_blog_ideas():
+    """The stored idea list for the current site, or None if ideas were never generated."""
+    raw_ideas = store.get_content(current_site_id(), BLOG_IDEAS)
+    return json.loads(raw_ideas) if raw_ideas is not None else None
+
+def load_idea_details(context):
+    """{title: idea dict} for the site's stored ideas that came with metadata."""
+    stored = store.get(context_site_id(context), BLOG_IDEAS)
+    details = ((stored or {}).get("metadata") or {}).get("ideas") or []
+    return {idea["title"]: idea for idea in details}
+
+def save_blog_post(context, model, topic, content, quality=None, keywords=None, target_words=None):
+    # A long-form post is stored with its outline prompt, the request that shaped the article
+    template_name = "blog_post_outline" if target_words else "blog_post"
+    template_id, prompt = render_generator_prompt(template_name, context, topic=topic, keywords=keywords,
+                                                  target_words=target_words)
+    metadata = {"words": len(content.split())}
+    if target_words:
+        metadata["target_words"] = target_words
+    if quality:
+        metadata["quality"] = quality.as_dict()
+    store.put(context_site_id(context), BLOG_POST, content, topic=topic, prompt=prompt, template_id=template_id,
+              model=get_model_name(model), metadata=metadata, inputs_hash=inputs_hash(BLOG_POST, context))
+
+def find_stale_items(context):
+    """(artifact, topic) pairs whose stored inputs no longer match the site's current details."""
+    site_id = context_site_id(context)
+    return [(artifact, topic) for artifact in (ABOUT_PAGE, BLOG_IDEAS, BLOG_POST)
+            for topic in store.stale_topics(site_id, artifact, inputs_hash(artifact, context))]
+
+
+# --- Background jobs ---
+# These run on worker threads: they must not call Streamlit. Results go to the
+# content store; the job's `partial` text lets the UI show a stream in progress.
+def _collect_stream(job, chunks):
+    text = ""
+    for chunk in chunks or ():
+        text += chunk
+        job.partial = text
+    return text
+
+def about_page_job(job, context, model, use_cache):
+    about_content = _collect_stream(job, generate_about_page(
+        context, model,
+        brand_story=context.get("brand_story"), # Value from context (can be None or empty)
+        call_to_action=context.get("call_to_action"),
+        use_cache=use_cache, stream=True))
+    if not about_content:
+        raise RuntimeError("Failed to generate About page content (No text returned). Check console logs.")
+    about_content, quality = enforce_quality("about_page", about_content, context, model, use_cache=use_cache)
+    save_about_page(context, model, about_content, quality)
+
+def about_page_and_ideas_job(job, context, model, use_cache, prefetch=False):
+    bundle = generate_about_page_and_ideas(context, model, brand_story=context.get("brand_story"),
+                                           call_to_action=context.get("call_to_action"), use_cache=use_cache) or {}
+    if bundle.get("about_page"):
+        save_about_page(context, model, bundle["about_page"])
+    save_blog_ideas(context, model, bundle.get("blog_ideas") or [])
+    if prefetch:
+        prefetch_posts(context, model, bundle.get("blog_ideas"), use_cache)
+    if not bundle.get("about_page"):
+        raise RuntimeError("Failed to generate About page content (No text returned). Check console logs.")
+
+def blog_ideas_job(job, context, model, use_cache, prefetch=False):
+    def _show_idea(idea):
+        # Ideas are listed in the status panel as soon as each one arrives
+        job.partial += f"{job.partial.count(chr(10)) + 1}. {idea['title']}\n"
+    details = generate_blog_post_ideas(context, model, use_cache=use_cache, idea_index=get_idea_index(context),
+                                       with_details=True, on_idea=_show_idea)
+    ideas = [idea["title"] for idea in details or []]
+    save_idea_index(context)
+    save_blog_ideas(context, model, ideas, details)
+    if not ideas:
+        raise RuntimeError("Could not generate blog post ideas.")
+    if prefetch:
+        prefetch_posts(context, model, ideas, use_cache)
+
+def blog_post_job(job, context, model, topic, use_cache):
+    # Ideas generated with metadata bring their own target keywords
+    keywords = idea_keywords(load_idea_details(context).get(topic))
+    blog_content = _collect_stream(job, generate_blog_post(context, model, topic, keywords=keywords, use_cache=use_cache,
+                                                           stream=True))
+    if not blog_content:
+        raise RuntimeError(f"Failed to generate blog post for '{topic}'.")
+    blog_content, quality = enforce_quality("blog_post", blog_content, context, model, keywords=keywords,
+                                            use_cache=use_cache)
+    save_blog_post(context, model, topic, blog_content, quality, keywords)
+    get_idea_index(context, POSTS).add(topic)
+    save_idea_index(context, POSTS)
+
+def long_blog_post_job(job, context, model, topic, use_cache, target_words=2000):
+    keywords = idea_keywords(load_idea_details(context).get(topic))
+    outline = {}
+    finished = {}
+
+    def _show_outline(title, sections):
+        outline.update(title=title, sections=sections)
+        _show_section(None, None)
+
+    def _show_section(index, text):
+        # Sections finish in any order; the panel shows them in outline order as they arrive
+        if index is not None:
+            finished[index] = text
+        sections = outline["sections"]
+        placeholders = [finished.get(i) or "⏳ _Writing this section..._" for i in range(len(sections))]
+        job.partial = (f"_{len(finished)} of {len(sections)} sections ready_\n\n"
+                       + stitch_sections(outline["title"], sections, placeholders))
+
+    blog_content = generate_long_blog_post(context, model, topic, keywords=keywords, target_words=target_words,
+                                           use_cache=use_cache, on_outline=_show_outline, on_section=_show_section)
+    if not blog_content:
+        raise RuntimeError(f"Failed to generate long-form post for '{topic}'.")
+    quality = check_quality(blog_content, long_post_spec(target_words), keywords)
+    save_blog_post(context, model, topic, blog_content, quality, keywords, target_words)
+    get_idea_index(context, POSTS).add(topic)
+    save_idea_index(context, POSTS)
+
+def submit_post_job(topic, target_words=None):
+    """Queues a post for `topic`: a standard post, or a long-form one of about `target_words`."""
+    if target_words:
+        return submit_job(long_blog_post_job, BLOG_POST, f"Long-form Post: '{topic[:40]}'", topic=topic,
+                          target_words=target_words)
+    return submit_job(blog_post_job, BLOG_POST, f"Blog Post: '{topic[:40]}'", topic=topic)
+
+def prefetch_posts(context, model, ideas, use_cache):
+    """
+    Queues background posts for the first PREFETCH_TOP_K new ideas whose
+    estimated tokens fit in PREFETCH_TOKEN_BUDGET. They run only when no
+    normal job is waiting and are saved to the store like any other post.
+    """
+    site_id = context_site_id(context)
+    stored_topics = store.topics(site_id, BLOG_POST)
+    posts_index = get_idea_index(context, POSTS)
+    budget = PREFETCH_TOKEN_BUDGET
+    queued = 0
+    for topic in ideas or ():
+        if queued >= PREFETCH_TOP_K:
+            break
+        if topic in stored_topics or posts_index.find_duplicate(topic)[0] is not None:
+            continue
+        _, prompt = render_generator_prompt("blog_post", context, topic=topic)
+        estimated = estimate_tokens(prompt) + DEFAULT_OUTPUT_TOKEN_ESTIMATE
+        if estimated > budget:
+            break
+        budget -= estimated
+        job_queue.submit(blog_post_job, context, model, topic, use_cache=use_cache, kind=BLOG_POST,
+                         label=f"Blog Post: '{topic[:40]}'", group=site_id, key=job_key(context, BLOG_POST, topic),
+                         priority=BACKGROUND)
+        queued += 1
+
+def job_key(context, kind, topic=None, target_words=None):
+    """
+    Identifies the work a job does: site, kind, topic, post length and the
+    inputs hash of every artifact it writes, so a job started before a context
+    edit is not reused for the edited context.
+    """
+    artifacts = (ABOUT_PAGE, BLOG_IDEAS) if kind == "site_bundle" else (kind,)
+    return (context_site_id(context), kind, topic, target_words) + tuple(inputs_hash(artifact, context)
+                                                                         for artifact in artifacts)
+
+def submit_job(fn, kind, label, topic=None, **job_kwargs):
+    """
+    Queues a job for the current site; an identical job already queued or
+    running is reused (and a queued prefetch of it is moved up to run next).
+    Posts of different lengths (`target_words`) are different jobs, and so are
+    jobs for different versions of the site context.
+    """
+    context = dict(st.session_state.site_context)
+    site_id = context_site_id(context)
+    args = (context, st.session_state.model) + ((topic,) if topic else ())
+    return job_queue.submit(fn, *args, use_cache=st.session_state.use_cache, kind=kind, label=label, group=site_id,
+                            key=job_key(context, kind, topic, job_kwargs.get("target_words")), **job_kwargs)
+
+def show_jobs(site_id):
+    """Job status panel; polls while jobs are active and reruns the page when one finishes."""
+    site_jobs = job_queue.jobs(group=site_id)
+    finished = {job.job_id for job in site_jobs if not job.active}
+    if finished - st.session_state.seen_finished_jobs:
+        st.session_state.seen_finished_jobs |= finished
+        st.rerun() # Full rerun so the new content is read from the store
+    for job in reversed(site_jobs):
+        if job.background:
+            # Prefetches stay quiet: a failed one is simply generated on demand later
+            if job.active:
+                st.caption(f"⚡ Prefetching {job.label}" + ("..." if job.status == RUNNING else " (queued)"))
+        elif job.status == RUNNING:
+            with st.status(f"Generating {job.label}...", state="running", expanded=bool(job.partial)):
+                if job.partial:
+                    st.markdown(job.partial)
+        elif job.status == FAILED:
+            col_error, col_dismiss = st.columns([5, 1])
+            col_error.error(f"{job.label}: {job.error}")
+            if col_dismiss.button("Dismiss", key=f"dismiss_{job.job_id}"):
+                job_queue.dismiss(job.job_id)
+                st.rerun(scope="fragment")
+        elif job.active:
+            st.caption(f"⏳ Queued: {job.label}")
 
 # --- Helper function for API Configuration ---
 def configure_api(api_key_from_input):
     """Configures API and sets session state."""
-    try:
-        genai.configure(api_key=api_key_from_input)
-        # MODIFIED: Changed to a likely valid model name
-        model_instance = genai.GenerativeModel('gemini-1.5-flash-latest')
-        # Test call (optional but recommended)
-        # Consider potential errors during test call as well
-        model_instance.generate_content("Test: Say Hi", generation_config=genai.types.GenerationConfig(temperature=0.1)) # Low temp test
+    # Models come from a process-wide pool shared by all sessions, and keys are
+    # checked with a cached, unbilled metadata lookup instead of a test generation.
+    validation_error = validate_api_key(api_key_from_input)
+    model_instance = None if validation_error else get_model(api_key_from_input)
+    if model_instance:
         st.session_state.model = model_instance
         st.session_state.api_key = api_key_from_input
         st.session_state.api_configured = True
         st.sidebar.success("API Configured Successfully!")
         return True
-    except Exception as e:
-        st.session_state.api_configured = False
-        st.session_state.model = None
-        st.session_state.api_key = None
-        st.sidebar.error(f"API Config Failed: {e}")
-        return False
+    st.session_state.api_configured = False
+    st.session_state.model = None
+    st.session_state.api_key = None
+    st.sidebar.error(f"API Config Failed: {validation_error or 'Could not initialize the model. Check console logs.'}")
+    return False
 
 # --- Sidebar for API Key ---
 # (Sidebar code remains the same)
@@ -75,6 +324,36 @@ with st.sidebar:
     if st.session_state.api_configured: st.success("API Ready")
     else: st.info("API Key needed to proceed.")
 
+    # Response cache: identical prompts are answered from disk instead of the API
+    st.header("Response Cache")
+    st.checkbox("Reuse cached responses", value=True, key="use_cache",
+                help="Untick to force fresh generations (bypasses the on-disk cache).")
+    response_cache = get_response_cache()
+    if response_cache:
+        cache_stats = response_cache.stats()
+        st.caption(f"Hits: {cache_stats['hits']} · Misses: {cache_stats['misses']} · Entries: {cache_stats['entries']}")
+    else:
+        st.caption("Cache disabled (CONTENT_CACHE_DISABLED is set).")
+
+    # Request scheduler: rate budgets (GEMINI_RPM / GEMINI_TPM) and retries
+    scheduler_stats = get_scheduler().stats()
+    st.caption(f"Queue: {scheduler_stats['queue_depth']} waiting · {scheduler_stats['in_flight']} in flight · "
+               f"Retries: {scheduler_stats['retries']} · Avg wait: {scheduler_stats['avg_wait_seconds']:.1f}s")
+
+    job_stats = job_queue.stats()
+    st.caption(f"Background jobs: {job_stats['queued']} queued · {job_stats['running']} running")
+    st.checkbox("Prefetch posts for new ideas", value=PREFETCH_DEFAULT, key="prefetch",
+                help=f"Starts posts for the first {PREFETCH_TOP_K} ideas in the background as soon as ideas arrive "
+                     f"(up to ~{PREFETCH_TOKEN_BUDGET} tokens per idea list), so picking one of them is instant.")
+
+    # Per-generator latency/token percentiles for this server process
+    metrics_summary = get_metrics().summary()
+    if metrics_summary:
+        with st.expander("📈 Call Metrics"):
+            st.dataframe(metrics_summary)
+            # Model tier each generator used last, and how often it fell back to a faster tier
+            st.dataframe([dict(generator=name, **row) for name, row in sorted(get_router().stats().items())])
+
 
 # --- Main App Area ---
 st.title("✨ AI Content Generator Assistant")
@@ -105,8 +384,15 @@ else:
                 if not context_inputs.get("website_name") or not context_inputs.get("website_theme"):
                      st.warning("Please provide at least the Website Name and Theme.")
                 else:
+                    previous_context = st.session_state.site_context
+                    # Edits keep the site's id, so content whose inputs did not change is reused
+                    context_inputs["site_id"] = context_site_id(previous_context) if previous_context else new_site_id(context_inputs)
                     st.session_state.site_context = context_inputs
-                    st.success("Website Context Saved!")
+                    store.save_site(context_inputs, owner=current_owner())
+                    st.session_state.posts_page = 0
+                    changed_fields = [key for key in QUESTIONS
+                                      if previous_context and (previous_context.get(key) or "") != (context_inputs.get(key) or "")]
+                    st.success("Website Context Saved!" + (f" Changed: {', '.join(changed_fields)}." if changed_fields else ""))
                     # Optional: st.rerun()
 
     with col2_context:
@@ -117,15 +403,56 @@ else:
             with st.expander("View Current Context"):
                 st.json(st.session_state.site_context) # Will show story/cta if saved
             if st.button("🗑️ Clear Context & Start Over", key="clear_context"):
-                # ... (clear state logic remains same) ...
+                # Generated content stays in the store; reload the site below to see it again
+                st.session_state.site_context = None
+                st.session_state.posts_page = 0
                 st.rerun()
         else:
             st.info("Context not yet saved.")
+            # Restore a site (and everything generated for it) after a reload
+            saved_sites = store.list_sites(owner=current_owner())
+            if saved_sites:
+                site_labels = {site["site_id"]: f"{site['name'] or 'Unnamed'} ({site['site_id'][:6]})" for site in saved_sites}
+                chosen_site = st.selectbox("Or load a saved website:", list(site_labels), format_func=site_labels.get, key="saved_site")
+                if st.button("📂 Load Website", key="load_site"):
+                    st.session_state.site_context = store.get_site(chosen_site, owner=current_owner())
+                    st.session_state.posts_page = 0
+                    st.rerun()
 
 
     # --- Step 2: Generate Content (Only if context is saved) ---
     if st.session_state.site_context:
         st.header("Step 2: Generate Content", divider="rainbow")
+
+        # Status of this site's background jobs; auto-refreshes only while jobs are active
+        site_jobs = job_queue.jobs(group=current_site_id())
+        st.session_state.seen_finished_jobs |= {job.job_id for job in site_jobs if not job.active}
+        active_jobs = [job for job in site_jobs if job.active]
+        if site_jobs:
+            st.fragment(run_every=JOB_POLL_SECONDS if active_jobs else None)(show_jobs)(current_site_id())
+        active_kinds = {job.kind for job in active_jobs}
+
+        # Only artifacts whose prompt inputs changed since they were generated need redoing
+        stale_items = find_stale_items(st.session_state.site_context)
+        if stale_items:
+            with st.container(border=True):
+                st.warning(f"🔄 {len(stale_items)} item(s) were generated from website details that have since changed. "
+                           "Everything else is still up to date and is reused as is.")
+                stale_labels = {ABOUT_PAGE: "About Page", BLOG_IDEAS: "Blog Post Ideas"}
+                st.caption(" · ".join(stale_labels.get(artifact) or f"'{topic[:40]}'" for artifact, topic in stale_items[:12])
+                           + (" · ..." if len(stale_items) > 12 else ""))
+                if st.button(f"Regenerate {len(stale_items)} Out-of-Date Item(s)", key="regenerate_stale"):
+                    for artifact, topic in stale_items:
+                        if artifact == ABOUT_PAGE:
+                            submit_job(about_page_job, ABOUT_PAGE, "About Page")
+                        elif artifact == BLOG_IDEAS:
+                            submit_job(blog_ideas_job, BLOG_IDEAS, "Blog Post Ideas", prefetch=st.session_state.prefetch)
+                        else:
+                            # Long-form posts are regenerated at their original length
+                            stored_post = store.get(current_site_id(), BLOG_POST, topic) or {}
+                            submit_post_job(topic, (stored_post.get("metadata") or {}).get("target_words"))
+                    st.rerun()
+
         col1_gen, col2_gen = st.columns(2)
 
         # --- About Page Section ---
@@ -135,39 +462,27 @@ else:
             # --- REMOVED WIDGETS for Brand Story and CTA ---
             # These are now collected in the form above and stored in site_context
 
-            if st.button("Generate About Page", key="generate_about"):
+            if st.button("Generate About Page", key="generate_about", disabled=ABOUT_PAGE in active_kinds):
                 if not st.session_state.model:
                      st.error("API Model not configured.")
                 else:
-                    with st.spinner("Generating About Page..."):
-                        try:
-                            # --- MODIFIED: Get story/cta from context ---
-                            brand_story_from_context = st.session_state.site_context.get("brand_story") # Use key from QUESTIONS
-                            cta_from_context = st.session_state.site_context.get("call_to_action")       # Use key from QUESTIONS
-
-                            about_content = generate_about_page(
-                                st.session_state.site_context,
-                                st.session_state.model,
-                                brand_story=brand_story_from_context, # Pass value from context (can be None or empty)
-                                call_to_action=cta_from_context      # Pass value from context (can be None or empty)
-                            )
-                            # --- END MODIFICATION ---
-
-                            st.session_state.about_page_content = about_content
-                            if not about_content:
-                                 st.error("Failed to generate About page content (No text returned). Check console logs.")
-
-                        except Exception as e:
-                            st.session_state.about_page_content = None
-                            st.error("An error occurred during About Page generation.")
-                            st.exception(e)
-                            print(f"ERROR in app.py during generate_about_page call: {e}")
+                    # --- MODIFIED: story/cta come from context; the job streams into the status panel above ---
+                    submit_job(about_page_job, ABOUT_PAGE, "About Page")
+                    st.rerun()
+
+            # One combined request for the About page and the idea list (context is sent once)
+            if st.button("⚡ Generate About Page + Blog Ideas Together", key="generate_about_and_ideas",
+                         help="Uses a single model request for both; falls back to separate requests if needed.",
+                         disabled=bool(active_kinds & {ABOUT_PAGE, BLOG_IDEAS, "site_bundle"})):
+                submit_job(about_page_and_ideas_job, "site_bundle", "About Page + Blog Ideas", prefetch=st.session_state.prefetch)
+                st.rerun()
 
             # Display About Page if generated
-            if st.session_state.about_page_content:
+            about_page_content = store.get_content(current_site_id(), ABOUT_PAGE)
+            if about_page_content:
                 with st.expander("View Generated About Page", expanded=True):
-                    st.markdown(st.session_state.about_page_content)
-                    st.code(st.session_state.about_page_content, language=None)
+                    st.markdown(about_page_content)
+                    st.code(about_page_content, language=None)
 
 
         # --- Blog Ideas & Posts Section ---
@@ -178,47 +493,98 @@ else:
             # ... (Selectbox / Custom topic input) ...
             # ... (Generate Blog Post button logic) ...
             # ... (Display generated blog posts) ...
-            if st.session_state.blog_ideas is None:
-                if st.button("💡 Generate Blog Post Ideas", key="generate_ideas"):
+            blog_ideas = load_blog_ideas()
+            if blog_ideas is None:
+                if st.button("💡 Generate Blog Post Ideas", key="generate_ideas",
+                             disabled=bool(active_kinds & {BLOG_IDEAS, "site_bundle"})):
                     # ... (generate ideas logic) ...
-                    with st.spinner("Generating ideas..."):
-                        ideas = generate_blog_post_ideas(st.session_state.site_context, st.session_state.model)
-                        if ideas: st.session_state.blog_ideas = ideas
-                        else: st.session_state.blog_ideas = []
-                        st.rerun()
+                    submit_job(blog_ideas_job, BLOG_IDEAS, "Blog Post Ideas", prefetch=st.session_state.prefetch)
+                    st.rerun()
 
             topic_to_generate = None
-            if st.session_state.blog_ideas is not None:
-                if not st.session_state.blog_ideas: st.info("No blog ideas generated yet...")
+            if blog_ideas is not None:
+                # Applies to single and batch posts; long-form posts are written as an outline plus parallel sections
+                st.radio("Post length:", list(POST_LENGTHS), key="post_length", horizontal=True)
+                if not blog_ideas: st.info("No blog ideas generated yet...")
                 else:
                     # ... (selectbox logic) ...
-                    options = ["-- Select an Idea --"] + st.session_state.blog_ideas
+                    options = ["-- Select an Idea --"] + blog_ideas
                     selected_idea = st.selectbox("Choose a title:", options, key="idea_selectbox", index=0)
-                    if selected_idea != "-- Select an Idea --": topic_to_generate = selected_idea
+                    if selected_idea != "-- Select an Idea --":
+                        topic_to_generate = selected_idea
+                        idea = load_idea_details(st.session_state.site_context).get(selected_idea)
+                        if idea:
+                            st.caption(" · ".join(part for part in (
+                                f"Intent: {idea['intent']}" if idea.get("intent") else "",
+                                f"Keywords: {', '.join(idea['keywords'])}" if idea.get("keywords") else "",
+                                f"~{idea['estimated_words']} words" if idea.get("estimated_words") else "") if part))
 
                 custom_topic = st.text_input("Or Enter a Custom Topic:", key="custom_topic_input")
-                if custom_topic and not topic_to_generate: topic_to_generate = custom_topic
+                if custom_topic:
+                    # The user wants something else: prefetches that have not started yet are dropped
+                    job_queue.cancel_background(group=current_site_id())
+                    if not topic_to_generate: topic_to_generate = custom_topic
 
                 if topic_to_generate:
                     st.write(f"Ready for: **{topic_to_generate}**")
+                    saved_post = store.get_content(current_site_id(), BLOG_POST, topic_to_generate)
+                    if saved_post is not None:
+                        # e.g. a prefetched idea: shown straight away
+                        with st.expander("Saved post for this topic", expanded=True):
+                            st.markdown(saved_post)
+                        st.caption("Generating it again replaces the saved post.")
                     if st.button(f"Generate Blog Post: '{topic_to_generate[:40]}...'", key=f"generate_blog_{topic_to_generate}"):
-                         # ... (generate blog post logic) ...
-                         with st.spinner(f"Generating post..."):
-                            blog_content = generate_blog_post(st.session_state.site_context, st.session_state.model, topic_to_generate)
-                            if blog_content:
-                                st.session_state.generated_blog_posts[topic_to_generate] = blog_content
-                                st.success("Blog post generated!")
-                            else:
-                                st.error(f"Failed to generate blog post for '{topic_to_generate}'.")
-                            st.rerun()
-
-            if st.session_state.generated_blog_posts:
+                         # Queued in the background; several posts can be queued from one session
+                         submit_post_job(topic_to_generate, POST_LENGTHS[st.session_state.post_length])
+                         st.rerun()
+
+            # --- Batch generation for several ideas at once ---
+            post_count = store.count(current_site_id(), BLOG_POST)
+            if blog_ideas:
                 st.markdown("---")
                 st.subheader("📚 Generated Blog Posts")
-                # ... (display generated posts) ...
-                topics = list(st.session_state.generated_blog_posts.keys())
-                for topic in reversed(topics):
-                    content = st.session_state.generated_blog_posts[topic]
-                    with st.expander(f"📄 {topic}", expanded=False):
-                        st.markdown(content)
-                        st.code(content, language=None)
\ No newline at end of file
+                # Ideas that already have a stored post are never generated (or paid for) again
+                stored_topics = store.topics(current_site_id(), BLOG_POST)
+                queued_topics = {job.key[2] for job in active_jobs if job.kind == BLOG_POST}
+                pending_ideas = [idea for idea in blog_ideas if idea not in stored_topics and idea not in queued_topics]
+                batch_topics = st.multiselect("Generate several ideas at once:", pending_ideas, key="batch_topics")
+                if batch_topics and st.button(f"Generate {len(batch_topics)} Blog Posts", key="generate_blog_batch"):
+                    # One job per post; the shared worker pool and scheduler bound how many run at once
+                    posts_index = get_idea_index(st.session_state.site_context, POSTS)
+                    skipped = []
+                    for topic in batch_topics:
+                        existing, _ = posts_index.find_duplicate(topic)
+                        if existing is not None:
+                            skipped.append(f"'{topic}' (near-duplicate of '{existing}')")
+                        else:
+                            submit_post_job(topic, POST_LENGTHS[st.session_state.post_length])
+                    if skipped:
+                        st.warning("Skipped near-duplicate topics:\n\n" + "\n\n".join(skipped))
+                    else:
+                        st.rerun()
+
+            if post_count:
+                if not blog_ideas:
+                    st.markdown("---")
+                    st.subheader("📚 Generated Blog Posts")
+                # Only the current page of posts is loaded from the store, newest first
+                page_count = (post_count + POSTS_PER_PAGE - 1) // POSTS_PER_PAGE
+                st.session_state.posts_page = min(st.session_state.posts_page, page_count - 1)
+                for post in store.page(current_site_id(), BLOG_POST, st.session_state.posts_page, POSTS_PER_PAGE):
+                    with st.expander(f"📄 {post['topic']}", expanded=False):
+                        quality = (post.get("metadata") or {}).get("quality")
+                        if quality:
+                            checks = "⚠️ " + "; ".join(quality["issues"]) if quality["issues"] else "✅ Quality checks passed"
+                            fixes = f" · Fixed: {', '.join(quality['fixes'])}" if quality["fixes"] else ""
+                            st.caption(f"{quality['word_count']} words · {checks}{fixes}")
+                        st.markdown(post["content"])
+                        st.code(post["content"], language=None)
+                if page_count > 1:
+                    col_prev, col_page, col_next = st.columns([1, 2, 1])
+                    if col_prev.button("◀ Newer", key="posts_prev", disabled=st.session_state.posts_page == 0):
+                        st.session_state.posts_page -= 1
+                        st.rerun()
+                    col_page.caption(f"Page {st.session_state.posts_page + 1} of {page_count} · {post_count} posts")
+                    if col_next.button("Older ▶", key="posts_next", disabled=st.session_state.posts_page >= page_count - 1):
+                        st.session_state.posts_page += 1
+                        st.rerun()
\ No newline at end of file
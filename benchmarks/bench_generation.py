@@ -0,0 +1,123 @@
+# ai_content_generator/benchmarks/bench_generation.py
+
+# Offline end-to-end benchmark for the generators.
+# Uses the deterministic FakeModel from src/backends.py, so no API key or
+# network access is needed. Measures throughput and latency for About pages,
+# idea lists and bulk blog generation at several concurrency levels.
+#
+# Run from the project root:
+#   python -m benchmarks.bench_generation --latency 0.2 --posts 32 --concurrency 1 4 16
+
+import argparse
+import os
+import sys
+import time
+
+# The response cache would turn every repeated prompt into a hit; benchmark real calls
+os.environ.setdefault("CONTENT_CACHE_DISABLED", "1")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.backends import FakeModel  # noqa: E402
+from src.generators import (generate_about_page, generate_blog_post_ideas, generate_blog_posts,  # noqa: E402
+                            USE_STRUCTURED_IDEAS)
+from src.metrics import get_metrics, percentile  # noqa: E402
+from src.scheduler import configure_scheduler  # noqa: E402
+
+SITE_CONTEXT = {
+    "website_name": "Trail Notes",
+    "website_theme": "Beginner-friendly day hikes in the Alps",
+    "website_purpose": "Help new hikers plan safe, enjoyable day trips",
+    "target_audience": "Adults new to hiking",
+    "key_offerings": "Route guides, packing lists, safety tips",
+    "unique_selling_prop": "Every route is walked and rated by beginners",
+    "tone_of_voice": "friendly and encouraging",
+    "brand_story": "",
+    "call_to_action": "Browse our beginner routes",
+}
+
+
+def _latency_summary(generator_name):
+    values = sorted(s["latency"] for s in get_metrics().samples(generator_name) if not s["error"])
+    return percentile(values, 50), percentile(values, 95)
+
+
+def _run_case(name, generator_name, fn, items):
+    get_metrics().clear()
+    started = time.perf_counter()
+    ok = fn()
+    elapsed = time.perf_counter() - started
+    p50, p95 = _latency_summary(generator_name)
+    return {
+        "case": name,
+        "items": items,
+        "ok": ok,
+        "seconds": elapsed,
+        "throughput": items / elapsed if elapsed else 0.0,
+        "p50": p50,
+        "p95": p95,
+    }
+
+
+def run_benchmarks(model, posts, concurrency_levels, repeats):
+    """Runs every benchmark case and returns a list of result rows."""
+    results = []
+    # Sequential single-artifact cases (each prompt differs so nothing is shared)
+    results.append(_run_case(
+        "about_page (sequential)", "about_page",
+        lambda: sum(1 for i in range(repeats)
+                    if generate_about_page(SITE_CONTEXT, model, brand_story=f"Run {i}")),
+        repeats))
+    # Idea lists are recorded under the template they were requested with
+    ideas_generator = "blog_post_ideas_json" if USE_STRUCTURED_IDEAS else "blog_post_ideas"
+    results.append(_run_case(
+        "blog_post_ideas (sequential)", ideas_generator,
+        lambda: sum(1 for i in range(repeats)
+                    if generate_blog_post_ideas(dict(SITE_CONTEXT, website_name=f"Trail Notes {i}"), model)),
+        repeats))
+    # Bulk blog generation at each concurrency level
+    topics = [f"Benchmark topic {i}" for i in range(posts)]
+    for level in concurrency_levels:
+        results.append(_run_case(
+            f"blog_posts x{posts} (concurrency {level})", "blog_post",
+            lambda level=level: sum(1 for r in generate_blog_posts(SITE_CONTEXT, model, topics, max_concurrency=level)
+                                    if r["content"]),
+            posts))
+    return results
+
+
+def format_results(results):
+    lines = [f"{'case':<42}{'ok':>8}{'seconds':>10}{'items/s':>10}{'p50 s':>8}{'p95 s':>8}"]
+    for row in results:
+        p50 = f"{row['p50']:.3f}" if row["p50"] is not None else "-"
+        p95 = f"{row['p95']:.3f}" if row["p95"] is not None else "-"
+        lines.append(f"{row['case']:<42}{row['ok']:>4}/{row['items']:<3}{row['seconds']:>10.2f}"
+                     f"{row['throughput']:>10.2f}{p50:>8}{p95:>8}")
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline generation benchmark using the fake model backend.")
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake time-to-first-token in seconds (default: %(default)s).")
+    parser.add_argument("--tokens-per-second", type=float, default=0, help="Fake output token rate; 0 = instant (default: %(default)s).")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Probability of an injected retryable error (default: %(default)s).")
+    parser.add_argument("--posts", type=int, default=32, help="Posts per bulk case (default: %(default)s).")
+    parser.add_argument("--repeats", type=int, default=3, help="Calls per sequential case (default: %(default)s).")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="Concurrency levels for bulk cases.")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Short retry delays so injected failures don't dominate the run
+    configure_scheduler(max_retries=5, base_delay=0.05, max_delay=1.0)
+    model = FakeModel(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                      failure_rate=args.failure_rate, seed=args.seed)
+    results = run_benchmarks(model, args.posts, args.concurrency, args.repeats)
+    print()
+    print(format_results(results))
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# ai_content_generator/benchmarks/bench_import.py
+
+# Cold-start benchmark for the CLI and the generator modules.
+# Each module is imported in a fresh interpreter several times; the best
+# time, minus a bare interpreter start, is compared with a budget. The run
+# also fails if importing a module pulls in one of the heavy dependencies
+# (Gemini SDK, gRPC, NumPy, Streamlit), which must only load on first use.
+# Exits with status 1 on any regression, so it can gate CI or batch images.
+#
+# Run from the project root:
+#   python -m benchmarks.bench_import --repeats 5 --budget-ms 150
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules a short-lived worker imports before doing any work
+TARGETS = ["main", "src.generators", "src.bulk", "src.context"]
+# Dependencies that must not be loaded just by importing a target
+HEAVY_MODULES = ["google.generativeai", "google.ai.generativelanguage", "grpc", "numpy", "streamlit", "pandas"]
+
+
+def _time_import(statement, repeats):
+    """Best wall-clock time (seconds) of running `statement` in a fresh interpreter."""
+    best = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], cwd=PROJECT_ROOT, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _heavy_modules_loaded(module):
+    output = subprocess.run(
+        [sys.executable, "-c", f"import json, sys, {module}; print(json.dumps(sorted(sys.modules)))"],
+        cwd=PROJECT_ROOT, check=True, capture_output=True, text=True).stdout
+    loaded = set(json.loads(output.strip().splitlines()[-1]))
+    return [name for name in HEAVY_MODULES if name in loaded]
+
+
+def run_benchmarks(targets, repeats, budget_ms):
+    """Returns one result row per target module."""
+    baseline = _time_import("pass", repeats)
+    results = []
+    for module in targets:
+        import_ms = max(0.0, _time_import(f"import {module}", repeats) - baseline) * 1000
+        heavy = _heavy_modules_loaded(module)
+        results.append({
+            "module": module,
+            "import_ms": import_ms,
+            "heavy": heavy,
+            "ok": import_ms <= budget_ms and not heavy,
+        })
+    return results
+
+
+def format_results(results, budget_ms):
+    lines = [f"{'module':<20}{'import ms':>10}  {'heavy modules loaded':<40}{'result':>8}"]
+    for row in results:
+        heavy = ", ".join(row["heavy"]) or "-"
+        lines.append(f"{row['module']:<20}{row['import_ms']:>10.1f}  {heavy:<40}{'ok' if row['ok'] else 'FAIL':>8}")
+    lines.append(f"(budget: {budget_ms:.0f} ms per module on top of a bare interpreter start)")
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start import benchmark; exits with status 1 on a regression.")
+    parser.add_argument("--repeats", type=int, default=5, help="Fresh interpreters per module; the best run counts (default: %(default)s).")
+    parser.add_argument("--budget-ms", type=float, default=150.0, help="Maximum import time per module (default: %(default)s).")
+    parser.add_argument("--modules", nargs="+", default=TARGETS, help="Modules to import.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run_benchmarks(args.modules, max(1, args.repeats), args.budget_ms)
+    print(format_results(results, args.budget_ms))
+    return all(row["ok"] for row in results)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -1,11 +1,57 @@
+import argparse
+import os
+import threading
+
 # Import functions from our source package modules
 from src.api_config import configure_api_and_model
 from src.context import gather_website_context
-from src.generators import generate_about_page, generate_blog_post, generate_blog_post_ideas
-from src.utils import display_output
+from src.bulk import nothing_generated, run_bulk_job
+from src.export import Exporter, export_output_files, parse_formats
+from src.idea_index import get_idea_index, save_idea_index, POSTS
+from src.generators import generate_about_page, generate_blog_post, generate_blog_post_ideas, generate_blog_posts, generate_long_blog_post, enforce_quality, DEFAULT_MAX_CONCURRENCY
+from src.metrics import get_metrics, format_summary
+from src.quality import check_quality, long_post_spec
+from src.routing import get_router, format_routes
+from src.scheduler import get_scheduler
+from src.sharded import run_sharded, parse_shard_ids
+from src.utils import display_output, display_stream
+
+def apply_quality_gate(artifact, content_type, content, site_context, ai_model):
+    """Checks streamed text and prints the revised version if the quality gate changed it."""
+    revised, report = enforce_quality(artifact, content, site_context, ai_model)
+    if report and report.fixes:
+        print(f"\nQuality gate: {', '.join(report.fixes)}.")
+        display_output(f"{content_type} (revised)", revised)
+    elif report:
+        print(f"\nWord count: {report.word_count}." + (f" Quality check: {'; '.join(report.issues)}." if report.issues else ""))
+    return revised
+
+def generate_long_post_cli(site_context, ai_model, topic, post_words):
+    """Writes a long-form post, reporting each section as it finishes, and prints it."""
+    outline = {}
+    print_lock = threading.Lock()
+
+    def _print_outline(title, sections):
+        outline["sections"] = sections
+        print(f"Outline for '{title}': {len(sections)} sections, writing them in parallel...")
+
+    def _print_section(index, text):
+        with print_lock: # Sections finish on worker threads
+            print(f"  Section {index + 1}/{len(outline['sections'])} ready: {outline['sections'][index]['heading']}")
+
+    content = generate_long_blog_post(site_context, ai_model, topic, target_words=post_words,
+                                      on_outline=_print_outline, on_section=_print_section)
+    if content:
+        display_output(f"Long-form Blog Post (~{post_words} words): '{topic[:30]}...'", content)
+        report = check_quality(content, long_post_spec(post_words))
+        print(f"\nWord count: {report.word_count}." + (f" Quality check: {'; '.join(report.issues)}." if report.issues else ""))
+    return content
 
-def run_generator():
-    """Main function to orchestrate the content generation process."""
+def run_generator(post_words=0):
+    """
+    Main function to orchestrate the content generation process.
+    With post_words, topics entered at the end are written as long-form posts of about that length.
+    """
 
     print("Initializing AI Content Generator...")
     ai_model = configure_api_and_model()
@@ -23,16 +69,19 @@ def run_generator():
     # --- Generate About Page ---
     print("\n" + "="*40)
     print("Proceeding to generate the About Page...")
-    about_page_content = generate_about_page(site_context, ai_model)
-    if about_page_content:
-        display_output("About Page (~600 words)", about_page_content)
-    else:
+    about_page_stream = generate_about_page(site_context, ai_model, stream=True)
+    about_page_content = display_stream("About Page (~600 words)", about_page_stream) if about_page_stream else None
+    if not about_page_content:
         print("Failed to generate About Page content.")
+    else:
+        about_page_content = apply_quality_gate("about_page", "About Page (~600 words)", about_page_content, site_context, ai_model)
 
     # --- Generate Blog Post Ideas --- MODIFIED SECTION START
     print("\n" + "="*40)
     print("Now, let's generate some blog post ideas based on the context...")
-    blog_ideas = generate_blog_post_ideas(site_context, ai_model)
+    # The site's idea index steers the model away from titles it already suggested
+    blog_ideas = generate_blog_post_ideas(site_context, ai_model, idea_index=get_idea_index(site_context))
+    save_idea_index(site_context)
 
     if not blog_ideas:
         print("Could not generate blog post ideas. Proceeding to manual topic entry.")
@@ -42,14 +91,40 @@ def run_generator():
         for i, title in enumerate(blog_ideas):
             print(f"{i + 1}. {title}")
         print("-" * 30)
+
+        # --- Batch-generate posts for the suggested ideas ---
+        selection = input("Generate posts for these ideas now? Enter numbers (e.g. 1,3,5), 'all', or press Enter to skip:\n> ").strip().lower()
+        if selection:
+            if selection == 'all':
+                chosen_topics = list(blog_ideas)
+            else:
+                chosen_topics = []
+                for part in selection.split(','):
+                    part = part.strip()
+                    if part.isdigit() and 1 <= int(part) <= len(blog_ideas):
+                        chosen_topics.append(blog_ideas[int(part) - 1])
+            if chosen_topics:
+                results = generate_blog_posts(site_context, ai_model, chosen_topics, topic_index=get_idea_index(site_context, POSTS))
+                save_idea_index(site_context, POSTS)
+                for result in results:
+                    if result["content"]:
+                        display_output(f"Blog Post (~600-800 words): '{result['topic'][:30]}...'", result["content"])
+                    else:
+                        print(f"Failed to generate blog post content for topic: {result['topic']} ({result['error']})")
+                stats = get_scheduler().stats()
+                print(f"\nScheduler: {stats['completed']} requests completed, {stats['retries']} retries, "
+                      f"average wait {stats['avg_wait_seconds']:.1f}s (max {stats['max_wait_seconds']:.1f}s).")
+            else:
+                print("No valid idea numbers entered. Skipping batch generation.")
     # --- Generate About Page ---
     print("\n" + "="*40)
     print("Proceeding to generate the About Page...")
-    about_page_content = generate_about_page(site_context, ai_model)
-    if about_page_content:
-        display_output("About Page (~600 words)", about_page_content)
-    else:
+    about_page_stream = generate_about_page(site_context, ai_model, stream=True)
+    about_page_content = display_stream("About Page (~600 words)", about_page_stream) if about_page_stream else None
+    if not about_page_content:
         print("Failed to generate About Page content.")
+    else:
+        about_page_content = apply_quality_gate("about_page", "About Page (~600 words)", about_page_content, site_context, ai_model)
 
 
     # --- Generate Blog Posts (Example Loop) ---
@@ -67,23 +142,132 @@ def run_generator():
         # Optional: Ask for keywords if needed for this specific post
         # keywords = input("Enter any target keywords (comma-separated, optional):\n> ")
 
-        blog_post_content = generate_blog_post(
+        if post_words:
+            if generate_long_post_cli(site_context, ai_model, topic, post_words):
+                get_idea_index(site_context, POSTS).add(topic)
+                save_idea_index(site_context, POSTS)
+            else:
+                print(f"Failed to generate blog post content for topic: {topic}")
+            print("\n" + "="*40)
+            continue
+
+        blog_post_stream = generate_blog_post(
             site_context,
             ai_model,
-            topic #,
-            # keywords=keywords if keywords else None
+            topic,
+            # keywords=keywords if keywords else None,
+            stream=True
         )
 
-        if blog_post_content:
-            display_output(f"Blog Post (~600-800 words): '{topic[:30]}...'", blog_post_content)
-        else:
+        blog_post_content = display_stream(f"Blog Post (~600-800 words): '{topic[:30]}...'", blog_post_stream) if blog_post_stream else None
+        if not blog_post_content:
             print(f"Failed to generate blog post content for topic: {topic}")
+        else:
+            blog_post_content = apply_quality_gate("blog_post", f"Blog Post (~600-800 words): '{topic[:30]}...'", blog_post_content, site_context, ai_model)
+            get_idea_index(site_context, POSTS).add(topic)
+            save_idea_index(site_context, POSTS)
 
         print("\n" + "="*40) # Separator for next post or exit
 
     print("\nContent generation finished.")
+    print("\nModel call metrics:")
+    print(format_summary(get_metrics().summary()))
+    print("\nModel routing:")
+    print(format_routes(get_router().stats()))
+
+
+def run_headless(manifest_path, output_path, max_concurrency=DEFAULT_MAX_CONCURRENCY, resume=True, combined=False,
+                 export_dir=None, export_formats=("markdown",)):
+    """
+    Non-interactive entry point: generates everything listed in a job manifest.
+    With export_dir, pages are also exported to files as they finish.
+    """
+    ai_model = configure_api_and_model(interactive=False)
+    if not ai_model:
+        print("Could not initialize AI Model. Set GEMINI_API_KEY for headless runs. Exiting.")
+        return False
+    exporter = Exporter(export_dir, export_formats) if export_dir else None
+    summary = run_bulk_job(manifest_path, output_path, ai_model, max_concurrency=max_concurrency, resume=resume, combined=combined,
+                           on_record=exporter.write if exporter else None,
+                           on_site_done=exporter.finish_site if exporter else None)
+    if exporter:
+        print(f"Exported {exporter.close()} page(s) to '{export_dir}'.")
+    print("\nModel call metrics:")
+    print(format_summary(get_metrics().summary()))
+    print("\nModel routing:")
+    print(format_routes(get_router().stats()))
+    return bool(summary) and summary["failed"] == 0 and not nothing_generated(summary)
+
+
+def run_export(args, export_formats):
+    """Exports existing output files (--export-from) without generating anything."""
+    missing = [path for path in args.export_from if not os.path.exists(path)]
+    if missing:
+        print(f"Error: output file(s) not found: {', '.join(missing)}")
+        return False
+    written = export_output_files(args.export_from, args.export_dir, export_formats)
+    print(f"Exported {written} page(s) from {len(args.export_from)} file(s) to '{args.export_dir}'.")
+    return True
+
+def run_sharded_headless(args, export_formats=("markdown",)):
+    """Sharded entry point: spreads the manifest's sites over worker processes (and nodes)."""
+    shards = args.shards or args.workers
+    try:
+        shard_ids = parse_shard_ids(args.shard_ids, shards)
+    except ValueError as e:
+        print(f"Error: invalid --shard-ids: {e}")
+        return False
+    progress = run_sharded(args.manifest, args.output_dir, args.workers, shards=shards, shard_ids=shard_ids,
+                           queue_path=args.queue, backend=args.backend, max_concurrency=args.concurrency,
+                           requests_per_minute=args.rpm, tokens_per_minute=args.tpm, retry_failed=args.retry_failed,
+                           export_dir=args.export_dir, export_formats=export_formats, combined=args.combined)
+    return bool(progress) and progress["failed"] == 0 and progress["pending"] + progress["claimed"] == 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="AI Content Generator (interactive by default).")
+    parser.add_argument("--manifest", help="JSONL or CSV job manifest for headless bulk generation.")
+    parser.add_argument("--output", default="generated_content.jsonl", help="Output JSONL file (appended to; default: %(default)s).")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY, help="Maximum parallel model requests (default: %(default)s).")
+    parser.add_argument("--no-resume", action="store_true", help="Regenerate items already present in the output file.")
+    parser.add_argument("--combined", action="store_true", help="Generate each site's About page and idea list in one request.")
+    parser.add_argument("--post-words", type=int, default=0, help="Interactive mode: write the posts you enter as long-form posts of about N words (outline + parallel sections).")
+    exporting = parser.add_argument_group("export", "Write generated About pages and posts to files as they finish.")
+    exporting.add_argument("--export-dir", help="Directory for exported pages (one folder per site).")
+    exporting.add_argument("--export-format", default="markdown", help="Comma-separated formats: markdown, html, zip (default: %(default)s).")
+    exporting.add_argument("--export-from", nargs="+", metavar="OUTPUT_JSONL", help="Export existing output files instead of generating (needs --export-dir).")
+    sharding = parser.add_argument_group("sharded runs", "Spread a manifest's sites over worker processes or nodes (used when --workers is given).")
+    sharding.add_argument("--workers", type=int, help="Worker processes on this node; each runs one shard at a time.")
+    sharding.add_argument("--shards", type=int, help="Total shards across all nodes (default: --workers).")
+    sharding.add_argument("--shard-ids", help="Shards this node runs, e.g. '0-3' or '4,5,6,7' (default: all).")
+    sharding.add_argument("--output-dir", default="sharded_output", help="Directory for per-shard JSONL files and the work queue (default: %(default)s).")
+    sharding.add_argument("--queue", help="Work queue database (default: <output-dir>/work_queue.db).")
+    sharding.add_argument("--rpm", type=int, help="Requests per minute for this node, split between its workers (default: GEMINI_RPM).")
+    sharding.add_argument("--tpm", type=int, help="Tokens per minute for this node, split between its workers (default: GEMINI_TPM).")
+    sharding.add_argument("--retry-failed", action="store_true", help="Give sites that failed in an earlier run another try.")
+    sharding.add_argument("--backend", choices=["gemini", "fake"], default="gemini", help="Model backend; 'fake' runs offline for testing (default: %(default)s).")
+    args = parser.parse_args(argv)
+    if args.workers and args.no_resume:
+        # Sites finished in the queue and the shard files would still count as done
+        parser.error("--no-resume cannot be used with --workers; use a new --output-dir to regenerate everything.")
+    return args
 
 
 # --- Main Execution Guard ---
 if __name__ == "__main__":
-    run_generator()
\ No newline at end of file
+    args = parse_args()
+    try:
+        export_formats = parse_formats(args.export_format)
+    except ValueError as e:
+        raise SystemExit(f"Error: invalid --export-format: {e}")
+    if args.export_from:
+        if not args.export_dir:
+            raise SystemExit("Error: --export-from needs --export-dir.")
+        raise SystemExit(0 if run_export(args, export_formats) else 1)
+    if args.manifest and args.workers:
+        raise SystemExit(0 if run_sharded_headless(args, export_formats) else 1)
+    if args.manifest:
+        succeeded = run_headless(args.manifest, args.output, max_concurrency=args.concurrency, resume=not args.no_resume, combined=args.combined,
+                                 export_dir=args.export_dir, export_formats=export_formats)
+        raise SystemExit(0 if succeeded else 1)
+    run_generator(post_words=args.post_words)
\ No newline at end of file
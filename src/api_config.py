@@ -1,27 +1,209 @@
-import google.generativeai as genai
+# google.generativeai is imported on first use inside the functions below:
+# loading the SDK takes most of a second, and many code paths (the CLI's
+# argument parsing, context helpers, offline runs) never need it.
+import datetime
+import hashlib
 import os
+import threading
+import time
 
-def configure_api_and_model():
+# Single default model for the CLI and the Streamlit app (override with GEMINI_MODEL)
+DEFAULT_MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+# How long a key validation result is trusted before checking again
+KEY_VALIDATION_TTL_SECONDS = 15 * 60
+# Upper bound for the validation lookup, so a bad network fails fast in the UI
+KEY_VALIDATION_TIMEOUT_SECONDS = 10
+
+def configure_api_and_model(interactive=True):
     """
     Configures the Google Generative AI API and initializes the model.
     Returns the model object or None if configuration fails.
+    With interactive=False (headless runs), never prompts for a missing key.
     """
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
         print("Error: GOOGLE_API_KEY environment variable not set.")
+        if not interactive:
+            return None
         print("Please set the environment variable or paste your API key here:")
         api_key = input("Enter your Google API Key: ")
         if not api_key:
              print("API Key is required.")
              return None
 
-    try:
-        genai.configure(api_key=api_key)
-        # Consider using newer models if available and suitable
-        # e.g., 'gemini-1.5-flash', 'gemini-1.5-pro-latest'
-        model = genai.GenerativeModel('gemini-2.0-flash')
+    model = get_model(api_key)
+    if model:
         print("Gemini API configured successfully.")
+    return model
+
+
+# --- Process-wide model pool ---
+# Models are created once per (API key, model name) and shared by every caller
+# in the process (all Streamlit sessions, batch worker threads). Each API key
+# gets its own gRPC clients, so connections are reused across sessions and two
+# keys never overwrite each other's configuration. The SDK's global client
+# (genai.configure) is never set: every request goes through a per-key client.
+# The SDK has no public way to give a model its own client, so the pool sets
+# GenerativeModel._client (and get_context_cached_model uses
+# CachedContent._from_obj). Both depend on the google-generativeai version
+# pinned in requirements.txt; tests/test_api_config.py fails if an upgrade
+# removes them.
+_model_pool = {}  # (key digest, model name) -> GenerativeModel
+_model_digests = {}  # id(pooled model) -> key digest (pooled models live for the whole process)
+_key_clients = {}  # key digest -> GenerativeServiceClient
+_key_cache_clients = {}  # key digest -> CacheServiceClient (for context caching)
+_key_validations = {}  # (key digest, model name) -> (None, checked_at) for keys that passed
+_pool_lock = threading.Lock()
+
+
+def _key_digest(api_key):
+    # Pool entries are keyed by a hash so raw keys are never kept as dict keys or logged
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+def api_key_owner(api_key):
+    """Stable id for an API key that does not reveal it (e.g. the owner of sites saved in the app)."""
+    return _key_digest(api_key)[:32]
+
+
+def get_model(api_key, model_name=DEFAULT_MODEL_NAME):
+    """
+    Returns the shared GenerativeModel for this API key and model name,
+    creating it (and the key's client) on first use. Returns None on failure.
+    """
+    if not api_key:
+        print("Error: API key is required to create a model.")
+        return None
+    return _pooled_model(_key_digest(api_key), model_name, api_key)
+
+
+def get_sibling_model(model, model_name):
+    """
+    Returns the pooled model `model_name` on the same API key (and client) as
+    `model`, creating it on first use (see routing.py). Returns None if `model`
+    did not come from get_model().
+    """
+    digest = _model_key_digest(model)
+    if digest is None:
+        return None
+    return _pooled_model(digest, model_name)
+
+
+def _model_key_digest(model):
+    # Digest of the API key a pooled model was created for, or None
+    return _model_digests.get(id(model))
+
+
+def _pooled_model(digest, model_name, api_key=None):
+    # The key's client already exists for siblings, so they need no raw key
+    with _pool_lock:
+        model = _model_pool.get((digest, model_name))
+        if model is not None:
+            return model
+        try:
+            import google.generativeai as genai
+            client = _key_clients.get(digest)
+            if client is None and api_key is None:
+                return None
+            if client is None:
+                from google.ai import generativelanguage as glm
+                client = glm.GenerativeServiceClient(client_options={"api_key": api_key})
+                _key_clients[digest] = client
+                _key_cache_clients[digest] = glm.CacheServiceClient(client_options={"api_key": api_key})
+            model = genai.GenerativeModel(model_name)
+            _bind_client(model, client)
+        except Exception as e:
+            print(f"Error configuring Gemini API or initializing model: {e}")
+            return None
+        _model_pool[(digest, model_name)] = model
+        _model_digests[id(model)] = digest
         return model
+
+
+def _bind_client(model, client):
+    # Binds the per-key client instead of the SDK's global default (see the pool comment above)
+    if not hasattr(model, "_client"):
+        raise RuntimeError("this google-generativeai version has no GenerativeModel._client; "
+                           "install the version pinned in requirements.txt")
+    model._client = client
+
+
+def validate_api_key(api_key, model_name=DEFAULT_MODEL_NAME):
+    """
+    Checks that the key can access the model, using a free metadata lookup
+    instead of a billed generation. Results are cached per key for
+    KEY_VALIDATION_TTL_SECONDS (failures are not cached, so a transient error
+    can be retried at once). Returns None if valid, else an error message.
+    """
+    if not api_key:
+        return "API key is required."
+    cache_key = (_key_digest(api_key), model_name)
+    with _pool_lock:
+        cached = _key_validations.get(cache_key)
+        if cached and time.time() - cached[1] < KEY_VALIDATION_TTL_SECONDS:
+            return None
+    try:
+        from google.ai import generativelanguage as glm
+        model_client = glm.ModelServiceClient(client_options={"api_key": api_key})
+        name = model_name if model_name.startswith("models/") else f"models/{model_name}"
+        model_client.get_model(name=name, retry=None, timeout=KEY_VALIDATION_TIMEOUT_SECONDS)
     except Exception as e:
-        print(f"Error configuring Gemini API or initializing model: {e}")
-        return None
\ No newline at end of file
+        return f"{type(e).__name__}: {e}"
+    with _pool_lock:
+        _key_validations[cache_key] = (None, time.time())
+    return None
+
+
+# --- Context caching for shared prompt prefixes ---
+# The website-context block is identical for every prompt of a site, so it can
+# be uploaded once as cached content and referenced by later requests.
+# The API only accepts cached content above a minimum token count, so short
+# contexts are rejected; the rejection is remembered and callers fall back to
+# sending the full prompt.
+CONTEXT_CACHE_TTL_MINUTES = 60
+_context_cached_models = {}  # (key digest, model name, prefix digest) -> (model or None, expires_at)
+_context_cache_lock = threading.Lock()
+
+
+def get_context_cached_model(model, prefix):
+    """
+    Returns a model bound to a server-side cached copy of `prefix`,
+    or None if context caching is unavailable for this model or prefix.
+    The cache is created and used with the API key of `model`, so it only
+    works for models from get_model().
+    """
+    model_name = getattr(model, 'model_name', None)
+    if not model_name or not prefix:
+        return None
+    digest = _model_key_digest(model)
+    with _pool_lock:
+        client, cache_client = _key_clients.get(digest), _key_cache_clients.get(digest)
+    if client is None or cache_client is None:
+        return None
+    key = (digest, model_name, hashlib.sha256(prefix.encode("utf-8")).hexdigest())
+    with _context_cache_lock:
+        entry = _context_cached_models.get(key)
+        if entry and entry[1] > time.time():
+            return entry[0]
+
+    cached_model = None
+    try:
+        import google.generativeai as genai
+        from google.ai import generativelanguage as glm
+        # The SDK's CachedContent.create() would use the global client; go through this key's own
+        response = cache_client.create_cached_content(cached_content=glm.CachedContent(
+            model=model_name if model_name.startswith("models/") else f"models/{model_name}",
+            display_name=f"site-context-{key[2][:16]}",
+            contents=[glm.Content(role="user", parts=[glm.Part(text=prefix)])],
+            ttl=datetime.timedelta(minutes=CONTEXT_CACHE_TTL_MINUTES),
+        ))
+        cached_model = genai.GenerativeModel.from_cached_content(
+            cached_content=genai.caching.CachedContent._from_obj(response))
+        _bind_client(cached_model, client)
+    except Exception as e:
+        print(f"Context caching unavailable ({type(e).__name__}: {e}). Sending full prompts instead.")
+
+    with _context_cache_lock:
+        # Expire a little early so requests never reference an expired cache
+        _context_cached_models[key] = (cached_model, time.time() + CONTEXT_CACHE_TTL_MINUTES * 60 - 60)
+    return cached_model
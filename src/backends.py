@@ -0,0 +1,227 @@
+# ai_content_generator/src/backends.py
+
+# Model backend interface and a deterministic offline fake.
+#
+# call_gemini_api, stream_gemini_api and every generator accept any object
+# that behaves like google.generativeai.GenerativeModel:
+#   * model.model_name                      - used for cache keys and metrics
+#   * model.generate_content(prompt, generation_config=None, stream=False)
+#       - returns a response with .text, .usage_metadata and .prompt_feedback,
+#         or, with stream=True, an iterable of chunks with the same attributes.
+# ModelBackend documents that interface; FakeModel implements it locally with
+# configurable latency, token rate, failure injection and canned outputs, so
+# the generators and benchmarks run without network access or an API key.
+
+import abc
+import copy
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+
+WORDS = (
+    "content strategy audience growth practical guide insight community story value "
+    "simple tips planning quality readers brand voice trusted journey ideas examples "
+    "season local expert habits routine better helpful clear focus detail"
+).split()
+
+
+class ModelBackend(abc.ABC):
+    """
+    Interface for model backends used by the generators.
+    google.generativeai.GenerativeModel satisfies it without subclassing.
+    """
+
+    model_name = "backend"
+
+    @abc.abstractmethod
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        """Returns a response for `prompt`, or with stream=True an iterable of response chunks."""
+
+
+class FakeUsage:
+    def __init__(self, prompt_token_count, candidates_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class FakeResponse:
+    """Response/chunk object with the attributes call_gemini_api reads."""
+
+    def __init__(self, text, usage_metadata=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+        self.prompt_feedback = None
+
+
+class FakeAPIError(Exception):
+    """Injected failure; `code` makes it look like an HTTP/gRPC API error to the scheduler."""
+
+    def __init__(self, message, code=503):
+        super().__init__(message)
+        self.code = code
+
+
+class FakeModel(ModelBackend):
+    """
+    Deterministic local model for tests and benchmarks.
+
+    latency            - seconds before the first token (time-to-first-byte)
+    tokens_per_second  - output rate after the first token (0 = instant)
+    failure_rate       - probability (0-1) that a call raises an injected error
+    failure_code       - code of injected errors (429 and 5xx are retried by the scheduler)
+    canned_outputs     - {substring: text}; the first substring found in the prompt wins
+    post_words         - length of generated posts/pages when no canned output matches
+    seed               - makes outputs and injected failures reproducible
+    """
+
+    def __init__(self, latency=0.5, tokens_per_second=0, failure_rate=0.0, failure_code=503,
+                 canned_outputs=None, post_words=700, seed=0, model_name="models/fake-model"):
+        self.model_name = model_name
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.failure_rate = failure_rate
+        self.failure_code = failure_code
+        self.canned_outputs = canned_outputs or {}
+        self.post_words = post_words
+        self.seed = seed
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._failure_random = random.Random(seed)
+        self._root = self  # Models made by with_model_name count their calls here
+        self._variants = {}
+
+    # --- Output generation ---
+
+    def _random_for(self, prompt):
+        digest = hashlib.sha256(f"{self.seed}:{prompt}".encode("utf-8")).hexdigest()
+        return random.Random(int(digest[:16], 16))
+
+    def _paragraphs(self, rng, words):
+        paragraphs = []
+        while words > 0:
+            size = min(words, rng.randint(60, 110))
+            sentence_words = [rng.choice(WORDS) for _ in range(size)]
+            paragraphs.append(" ".join(sentence_words).capitalize() + ".")
+            words -= size
+        return paragraphs
+
+    def _article(self, rng, title, words):
+        paragraphs = self._paragraphs(rng, words)
+        lines = [f"# {title}", ""]
+        for i, paragraph in enumerate(paragraphs):
+            if i and i % 3 == 0:
+                lines += [f"## {rng.choice(WORDS).capitalize()} {rng.choice(WORDS)}", ""]
+            lines += [paragraph, ""]
+        return "\n".join(lines).strip()
+
+    def _titles(self, rng, count):
+        return [f"{rng.choice(WORDS).capitalize()} {rng.choice(WORDS)} {rng.choice(WORDS)}: a {rng.choice(WORDS)} guide"
+                for _ in range(count)]
+
+    def _trim(self, draft, max_words):
+        # Keeps whole paragraphs (and headings) while they fit
+        kept, words = [], 0
+        for paragraph in draft.split("\n\n"):
+            size = len(paragraph.split())
+            if words + size > max_words:
+                break
+            kept.append(paragraph)
+            words += size
+        return "\n\n".join(kept)
+
+    def render_output(self, prompt):
+        """Returns the deterministic output text for a prompt."""
+        for needle, text in self.canned_outputs.items():
+            if needle in prompt:
+                return text
+        rng = self._random_for(prompt)
+        if "=== ABOUT PAGE ===" in prompt:
+            titles = self._titles(rng, 10)
+            return ("=== ABOUT PAGE ===\n" + self._article(rng, "About Us", self.post_words)
+                    + "\n=== BLOG POST IDEAS ===\n" + "\n".join(f"{i}. {t}" for i, t in enumerate(titles, 1)))
+        if "=== POST <number> ===" in prompt:
+            topic_block = prompt.split("**Topics", 1)[-1].split("* Target Keywords", 1)[0]
+            topics = re.findall(r"^\d+\. (.+)$", topic_block, re.MULTILINE)
+            return "\n".join(f"=== POST {i} ===\n{self._article(rng, topic, self.post_words)}"
+                             for i, topic in enumerate(topics, 1))
+        continuation = re.search(r"Write only the continuation, about (\d+) words", prompt)
+        if continuation:
+            return "\n\n".join(self._paragraphs(rng, int(continuation.group(1))))
+        trim = re.search(r"shorten it to at most (\d+) words", prompt)
+        if trim:
+            return self._trim(prompt.split("**Draft:**", 1)[-1].strip(), int(trim.group(1)))
+        json_ideas = re.search(r"Return exactly (\d+) blog post ideas as JSON", prompt)
+        if json_ideas:
+            intents = ["informational", "commercial", "transactional", "navigational"]
+            return json.dumps({"ideas": [
+                {"title": title, "keywords": [rng.choice(WORDS), f"{rng.choice(WORDS)} {rng.choice(WORDS)}"],
+                 "intent": rng.choice(intents), "estimated_words": rng.choice([600, 800, 1000, 1200])}
+                for title in self._titles(rng, int(json_ideas.group(1)))]}, indent=2)
+        outline = re.search(r"Return the outline as JSON with exactly (\d+) sections", prompt)
+        if outline:
+            topic = re.search(r"Topic: (.+)", prompt)
+            return json.dumps({"title": topic.group(1).strip() if topic else "Article", "sections": [
+                {"heading": f"{title.split(':')[0]} ({i})", "points": [" ".join(rng.choice(WORDS) for _ in range(5))
+                                                                      for _ in range(3)]}
+                for i, title in enumerate(self._titles(rng, int(outline.group(1))), 1)]}, indent=2)
+        section = re.search(r'Write only section \d+, about (\d+) words, starting with the heading line "## (.+)"', prompt)
+        if section:
+            return "\n\n".join([f"## {section.group(2)}"] + self._paragraphs(rng, int(section.group(1))))
+        if "numbered list" in prompt:
+            return "\n".join(f"{i}. {t}" for i, t in enumerate(self._titles(rng, 10), 1))
+        topic = re.search(r"Topic: (.+)", prompt)
+        return self._article(rng, topic.group(1).strip() if topic else "About Us", self.post_words)
+
+    def with_model_name(self, model_name):
+        """
+        The same fake under another model name (used by routing.py for model
+        tiers). Calls made through it are counted on this model.
+        """
+        root = self._root
+        with root._lock:
+            variant = root._variants.get(model_name)
+            if variant is None:
+                variant = copy.copy(root)
+                variant.model_name = model_name
+                root._variants[model_name] = variant
+            return variant
+
+    # --- ModelBackend interface ---
+
+    def _maybe_fail(self):
+        root = self._root
+        with root._lock:
+            root.calls += 1
+            failed = self.failure_rate and self._failure_random.random() < self.failure_rate
+        if failed:
+            if self.failure_code == 429:
+                raise FakeAPIError("Injected quota error. Please retry in 0.1s", code=429)
+            raise FakeAPIError(f"Injected server error ({self.failure_code})", code=self.failure_code)
+
+    def _usage(self, prompt, text):
+        return FakeUsage(max(1, len(prompt) // 4), max(1, len(text) // 4))
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        self._maybe_fail()
+        text = self.render_output(prompt)
+        if stream:
+            return self._stream(prompt, text)
+        time.sleep(self.latency + self._generation_seconds(text))
+        return FakeResponse(text, self._usage(prompt, text))
+
+    def _generation_seconds(self, text):
+        return (len(text) / 4) / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def _stream(self, prompt, text, chunk_chars=200):
+        time.sleep(self.latency)
+        chunks = [text[i:i + chunk_chars] for i in range(0, len(text), chunk_chars)]
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(self._generation_seconds(chunk))
+            # Like the real API, usage metadata arrives with the last chunk
+            usage = self._usage(prompt, text) if i == len(chunks) - 1 else None
+            yield FakeResponse(chunk, usage)
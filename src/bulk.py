@@ -0,0 +1,350 @@
+# ai_content_generator/src/bulk.py
+
+# Headless bulk generation driven by a job manifest (see manifest.py).
+# Every About page, idea list and blog post is one work item. Items run in
+# parallel and each result is appended to an output JSONL file as soon as it
+# finishes, so an interrupted run can be resumed without paying for finished
+# items again. Each record stores a hash of the context fields its prompt
+# used, so after a site's details are edited only the items that depend on
+# the changed fields are regenerated.
+
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from .generators import (generate_about_page, generate_about_page_and_ideas, generate_blog_post,
+                         generate_blog_post_ideas, generate_long_blog_post, idea_keywords, inputs_hash,
+                         DEFAULT_MAX_CONCURRENCY)
+from .idea_index import IdeaIndex, get_idea_index, save_idea_index, IDEAS, POSTS
+from .manifest import iter_manifest
+from .quality import QUALITY_SPECS, check_quality, long_post_spec
+from .utils import get_last_api_error
+
+ABOUT_PAGE = "about_page"
+BLOG_IDEAS = "blog_ideas"
+BLOG_POST = "blog_post"
+SITE_BUNDLE = "site_bundle"  # About page + idea list from one combined request
+
+
+def make_item_id(site_id, artifact, topic=None):
+    """Returns the id used to recognise an item across runs."""
+    return f"{site_id}/{artifact}/{topic}" if topic else f"{site_id}/{artifact}"
+
+
+def load_completed_items(output_path):
+    """
+    Reads an existing output file and returns {item_id: (inputs hash, content)}
+    for every successfully generated item. Only idea lists keep their content
+    (their ideas with metadata, needed to queue follow-up posts); other items
+    store None to keep memory small. Failed items are retried on resume and a truncated last line
+    (from a crash mid-write) is ignored.
+    """
+    completed = {}
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("status") == "ok":
+                completed[record["item_id"]] = (record.get("inputs_hash"), completed_content(record))
+    return completed
+
+
+def completed_content(record):
+    """What a completed item keeps in memory: an idea list's ideas (with metadata if known), else None."""
+    if record.get("artifact") != BLOG_IDEAS:
+        return None
+    return record.get("idea_details") or record.get("content")
+
+
+def completed_post_topics(completed):
+    """Groups the post topics among `completed` items (from load_completed_items) by site: {site_id: [topic]}."""
+    topics = {}
+    marker = f"/{BLOG_POST}/"
+    for item_id in completed:
+        site_id, found, topic = item_id.partition(marker)
+        if found:
+            topics.setdefault(site_id, []).append(topic)
+    return topics
+
+
+def _make_task(job, artifact, topic=None, keywords=None):
+    return {"item_id": make_item_id(job["site_id"], artifact, topic), "artifact": artifact, "job": job, "topic": topic,
+            "keywords": keywords}
+
+
+def _iter_tasks(manifest_path, combined=False, on_invalid=None):
+    """Yields the work items of every job in the manifest, in manifest order (see iter_manifest for on_invalid)."""
+    for job in iter_manifest(manifest_path, on_invalid=on_invalid):
+        if combined and job["about_page"] and job["ideas"]:
+            yield _make_task(job, SITE_BUNDLE)
+        else:
+            if job["about_page"]:
+                yield _make_task(job, ABOUT_PAGE)
+            if job["ideas"]:
+                yield _make_task(job, BLOG_IDEAS)
+        for topic in job["topics"]:
+            yield _make_task(job, BLOG_POST, topic)
+
+
+def _idea_post_tasks(job, ideas):
+    """
+    Follow-up post items for the first `posts_from_ideas` generated ideas
+    (titles, or idea dicts whose keywords are passed on to the post).
+    """
+    tasks = []
+    for idea in (ideas or [])[:job["posts_from_ideas"]]:
+        if isinstance(idea, dict):
+            tasks.append(_make_task(job, BLOG_POST, idea["title"], idea_keywords(idea)))
+        else:
+            tasks.append(_make_task(job, BLOG_POST, idea))
+    return tasks
+
+
+def _make_record(task, artifact, content, error, started, idea_details=None):
+    job = task["job"]
+    if not content and not error:
+        error = "No content was returned by the model."
+    record = {
+        "item_id": make_item_id(job["site_id"], artifact, task["topic"]),
+        "site_id": job["site_id"],
+        "website_name": job["context"].get("website_name"),
+        "artifact": artifact,
+        "topic": task["topic"],
+        "status": "ok" if content else "error",
+        "content": content,
+        "error": None if content else error,
+        "inputs_hash": inputs_hash(artifact, job["context"]),
+        "seconds": round(time.time() - started, 3),
+        "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    if content and idea_details:
+        record["idea_details"] = idea_details  # Keywords, intent and estimated length per idea
+    if task.get("keywords") and artifact == BLOG_POST:
+        record["keywords"] = task["keywords"]
+    # Jobs queued before post_words existed have no such key
+    long_form = artifact == BLOG_POST and job.get("post_words")
+    if long_form:
+        record["target_words"] = job["post_words"]
+    # Checks that still fail after the generator's quality gate (cheap to recompute)
+    if content and artifact in QUALITY_SPECS:
+        keywords = task.get("keywords") if artifact == BLOG_POST else None
+        spec = long_post_spec(job["post_words"]) if long_form else QUALITY_SPECS[artifact]
+        record["quality_issues"] = check_quality(content, spec, keywords).issues
+    return record
+
+
+def _run_task(task, model):
+    """Generates one item and returns its output records (two for a site bundle)."""
+    job = task["job"]
+    context = job["context"]
+    started = time.time()
+    content = None
+    error = None
+    idea_details = None
+    try:
+        if task["artifact"] == SITE_BUNDLE:
+            bundle = generate_about_page_and_ideas(context, model, brand_story=context.get("brand_story"),
+                                                   call_to_action=context.get("call_to_action")) or {}
+            error = get_last_api_error()
+            return [_make_record(task, ABOUT_PAGE, bundle.get("about_page"), error, started),
+                    _make_record(task, BLOG_IDEAS, bundle.get("blog_ideas"), error, started)]
+        if task["artifact"] == ABOUT_PAGE:
+            content = generate_about_page(context, model, brand_story=context.get("brand_story"),
+                                          call_to_action=context.get("call_to_action"))
+        elif task["artifact"] == BLOG_IDEAS:
+            idea_details = generate_blog_post_ideas(context, model, idea_index=get_idea_index(context), with_details=True)
+            content = [idea["title"] for idea in idea_details] if idea_details else idea_details
+        elif job.get("post_words"):
+            content = generate_long_blog_post(context, model, task["topic"], keywords=task.get("keywords"),
+                                              target_words=job["post_words"])
+        else:
+            content = generate_blog_post(context, model, task["topic"], keywords=task.get("keywords"))
+        if not content:
+            error = get_last_api_error()
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        if task["artifact"] == SITE_BUNDLE:
+            return [_make_record(task, ABOUT_PAGE, None, error, started),
+                    _make_record(task, BLOG_IDEAS, None, error, started)]
+    return [_make_record(task, task["artifact"], content, error, started, idea_details)]
+
+
+def _open_output(output_path):
+    # If a previous run died mid-line, start on a fresh line so records stay parseable
+    needs_newline = False
+    if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+        with open(output_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b"\n"
+    out = open(output_path, "a", encoding="utf-8")
+    if needs_newline:
+        out.write("\n")
+    return out
+
+
+def nothing_generated(summary):
+    """True for a run whose items were all dropped as near-duplicates (a failure, not a no-op)."""
+    return summary["duplicates"] > 0 and summary["ok"] + summary["skipped"] + summary["failed"] == 0
+
+
+def run_bulk_job(manifest_path, output_path, model, max_concurrency=DEFAULT_MAX_CONCURRENCY, resume=True,
+                 combined=False, on_record=None, on_site_done=None):
+    """
+    Generates every item in the manifest with up to `max_concurrency` requests
+    in flight, appending one JSON record per item to `output_path` as it finishes.
+    With resume=True, items already recorded as 'ok' in the output are skipped,
+    unless the context fields they depend on have changed since.
+    With combined=True, each site's About page and idea list come from one request.
+    on_record(record) is called for every record written, and on_site_done(site_id)
+    once the last item of a site has been written (sites are told apart by
+    manifest order, so a site listed again later is finished again).
+    Returns a summary dict with 'ok', 'failed', 'skipped', 'stale' and 'duplicates' counts.
+    """
+    if not model:
+        print("Error: AI model object not provided for bulk generation.")
+        return None
+
+    completed = load_completed_items(output_path) if resume else {}
+    summary = {"ok": 0, "failed": 0, "skipped": 0, "stale": 0, "duplicates": 0}
+    touched_sites = {}  # site_id -> context, for saving idea indexes at the end
+    # site_id -> IdeaIndex of post topics in this run's output or scheduled by it. Topics are only
+    # checked against these, not the site's persisted posts index, which would also hold the very
+    # posts a --no-resume run (or a run to a new output file) is asked to write again.
+    run_topics = {}
+    done_topics = completed_post_topics(completed)
+    follow_ups = deque()  # Post items unlocked by finished idea lists run before new manifest items
+    open_items = {}  # site_id -> items taken from the manifest or follow-ups and not yet finished or skipped
+    manifest_site = None  # Site of the manifest row being read; it may still get items
+    max_pending = max(1, max_concurrency) * 2  # Bounded look-ahead keeps memory flat on huge manifests
+
+    def _invalid_row(line_number, error):
+        # An unreadable manifest row counts as a failed item; the rest of the run goes on
+        summary["failed"] += 1
+
+    task_iter = _iter_tasks(manifest_path, combined=combined, on_invalid=_invalid_row)
+
+    def _opened(site_id, count=1):
+        open_items[site_id] = open_items.get(site_id, 0) + count
+
+    def _closed(site_id):
+        # A site is done once the manifest has moved past it and none of its items is left
+        open_items[site_id] -= 1
+        if not open_items[site_id] and site_id != manifest_site:
+            del open_items[site_id]
+            if on_site_done:
+                on_site_done(site_id)
+
+    def _next_manifest_task():
+        nonlocal manifest_site
+        task = next(task_iter, None)
+        site_id = task["job"]["site_id"] if task else None
+        if site_id != manifest_site:
+            previous, manifest_site = manifest_site, site_id
+            if previous is not None and not open_items.get(previous):
+                open_items.pop(previous, None)
+                if on_site_done:
+                    on_site_done(previous)
+        if task:
+            _opened(site_id)
+        return task
+
+    def _add_follow_ups(tasks):
+        for task in tasks:
+            _opened(task["job"]["site_id"])
+        follow_ups.extend(tasks)
+
+    def _is_current(task, artifact=None):
+        # Done, and built from the same inputs (records from older runs have no hash and count as current)
+        entry = completed.get(task["item_id"])
+        return entry is not None and entry[0] in (None, inputs_hash(artifact or task["artifact"], task["job"]["context"]))
+
+    def _next_task():
+        while True:
+            if follow_ups:
+                task = follow_ups.popleft()
+            else:
+                task = _next_manifest_task()
+                if task is None:
+                    return None
+            site_id = task["job"]["site_id"]
+            if task["artifact"] == SITE_BUNDLE:
+                # Split the bundle back up if a previous run finished either part
+                parts = [_make_task(task["job"], ABOUT_PAGE), _make_task(task["job"], BLOG_IDEAS)]
+                if any(_is_current(part) for part in parts):
+                    _opened(site_id, len(parts))
+                    follow_ups.extendleft(reversed(parts))
+                    _closed(site_id)
+                    continue
+                return task
+            if not _is_current(task):
+                touched_sites[task["job"]["site_id"]] = task["job"]["context"]
+                if task["item_id"] in completed:
+                    summary["stale"] += 1  # Its inputs changed: regenerate without the duplicate check
+                elif task["artifact"] == BLOG_POST:
+                    # Don't pay for a post whose topic near-duplicates one already written
+                    site_id = task["job"]["site_id"]
+                    scheduled = run_topics.get(site_id)
+                    if scheduled is None:
+                        scheduled = run_topics[site_id] = IdeaIndex()
+                        scheduled.filter_new(done_topics.pop(site_id, ()))
+                    existing, _ = scheduled.find_duplicate(task["topic"])
+                    if existing is not None:
+                        summary["duplicates"] += 1
+                        print(f"Skipped: {task['item_id']} (near-duplicate of '{existing}')")
+                        _closed(site_id)
+                        continue
+                    scheduled.add(task["topic"])
+                return task
+            summary["skipped"] += 1
+            if task["artifact"] == BLOG_IDEAS and task["job"]["posts_from_ideas"]:
+                _add_follow_ups(_idea_post_tasks(task["job"], completed[task["item_id"]][1]))
+            _closed(site_id)
+
+    print(f"\nRunning bulk generation from '{manifest_path}' (up to {max_concurrency} requests at a time)...")
+    with _open_output(output_path) as out, ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+        pending = {}
+        while True:
+            while len(pending) < max_pending:
+                task = _next_task()
+                if task is None:
+                    break
+                pending[executor.submit(_run_task, task, model)] = task
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = pending.pop(future)
+                for record in future.result():
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+                    if record["status"] == "ok":
+                        summary["ok"] += 1
+                        if record["artifact"] == BLOG_POST:
+                            get_idea_index(task["job"]["context"], POSTS).add(record["topic"])
+                        completed[record["item_id"]] = (record["inputs_hash"], completed_content(record))
+                        if record["artifact"] == BLOG_IDEAS and task["job"]["posts_from_ideas"]:
+                            _add_follow_ups(_idea_post_tasks(task["job"], completed_content(record)))
+                    else:
+                        summary["failed"] += 1
+                        print(f"Failed: {record['item_id']} ({record['error']})")
+                    if on_record:
+                        on_record(record)
+                _closed(task["job"]["site_id"])
+
+    for context in touched_sites.values():
+        save_idea_index(context, IDEAS)
+        save_idea_index(context, POSTS)
+
+    print(f"\nBulk generation finished: {summary['ok']} generated ({summary['stale']} were out of date), "
+          f"{summary['failed']} failed, {summary['skipped']} already done, "
+          f"{summary['duplicates']} near-duplicate topics skipped.")
+    if nothing_generated(summary):
+        print("Error: every item was skipped as a near-duplicate; nothing was generated.")
+    return summary
+
@@ -0,0 +1,232 @@
+# ai_content_generator/src/cache.py
+
+# Persistent, content-addressed cache for model responses.
+# Identical requests (same model + prompt + generation config) are answered
+# from disk instead of being sent to the Gemini API again. Several processes
+# (sharded workers, parallel CLI runs) may share one cache directory, so each
+# process re-reads the directory before evicting instead of trusting its own
+# view of it, and the size limits hold for the directory as a whole.
+# Entries older than the age limit are evicted first, so they never push
+# fresh entries out.
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_CACHE_DIR = os.getenv("CONTENT_CACHE_DIR", ".content_cache")
+DEFAULT_MAX_ENTRIES = 2000
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024  # 100 MB
+DEFAULT_MAX_AGE_SECONDS = 7 * 24 * 60 * 60  # One week
+RESCAN_INTERVAL_SECONDS = 5.0  # How stale this process's view of the directory may get
+
+_CREATED_AT_PATTERN = re.compile(rb'"created_at":\s*([0-9.eE+-]+)')
+
+
+def make_cache_key(model_name, prompt, generation_config=None):
+    """
+    Builds a stable SHA-256 key from the model name, prompt and generation config.
+    """
+    config_text = json.dumps(generation_config, sort_keys=True, default=_config_default) if generation_config else ""
+    digest = hashlib.sha256()
+    for part in (model_name or "", prompt or "", config_text):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")  # Separator so ('ab', 'c') and ('a', 'bc') never collide
+    return digest.hexdigest()
+
+
+def _config_default(value):
+    # GenerationConfig objects are not JSON serialisable; fall back to their attributes
+    return getattr(value, "__dict__", None) or repr(value)
+
+
+def _read_created_at(path):
+    # created_at is the first field of every entry, so the file's first bytes are enough
+    try:
+        with open(path, "rb") as f:
+            match = _CREATED_AT_PATTERN.search(f.read(64))
+        return float(match.group(1)) if match else None
+    except (OSError, ValueError):
+        return None
+
+
+class ResponseCache:
+    """
+    On-disk LRU cache bounded by entry count, total size and entry age.
+    Each entry is one JSON file named after its key; the file's mtime
+    records the last access so recency survives process restarts.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_bytes=DEFAULT_MAX_BYTES, max_age_seconds=DEFAULT_MAX_AGE_SECONDS):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._index = None  # OrderedDict key -> (size in bytes, created_at or None, inode), least recently used first
+        self._total_bytes = 0
+        self._scanned_at = 0.0
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load_index(self, rescan=False):
+        # Built lazily from the directory listing, oldest access first; `rescan` rebuilds it
+        # to pick up entries other processes wrote or evicted. Only new files are opened: a
+        # rewrite replaces the file, so a known inode still has the created_at read before
+        if self._index is not None and not rescan:
+            return
+        known = self._index or {}
+        self._scanned_at = time.time()
+        self._index = OrderedDict()
+        self._total_bytes = 0
+        if not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, name[:-5], stat.st_size, stat.st_ino))
+        for _, key, size, inode in sorted(entries):
+            if key in known and known[key][2] == inode:
+                created_at = known[key][1]
+            else:
+                created_at = _read_created_at(self._path(key))
+            self._index[key] = (size, created_at, inode)
+            self._total_bytes += size
+
+    def get(self, key):
+        """
+        Returns the cached text for `key`, or None on a miss or expired entry.
+        """
+        with self._lock:
+            self._load_index()
+            path = self._path(key)
+            if key not in self._index:
+                try:
+                    stat = os.stat(path)  # Written by another process since the last scan
+                except OSError:
+                    self.misses += 1
+                    return None
+                self._index[key] = (stat.st_size, None, stat.st_ino)
+                self._total_bytes += stat.st_size
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                self._drop(key)
+                self.misses += 1
+                return None
+            if self.max_age_seconds and time.time() - entry.get("created_at", 0) > self.max_age_seconds:
+                self._drop(key)
+                self.misses += 1
+                return None
+            # Mark as most recently used, in memory and on disk
+            size, _, inode = self._index[key]
+            self._index[key] = (size, entry.get("created_at"), inode)
+            self._index.move_to_end(key)
+            try:
+                os.utime(path, None)
+            except OSError:
+                pass
+            self.hits += 1
+            return entry.get("text")
+
+    def set(self, key, text, model_name=None):
+        """
+        Stores `text` under `key` and evicts least recently used entries if over budget.
+        """
+        if not text:
+            return
+        created_at = time.time()
+        payload = json.dumps({"created_at": created_at, "model": model_name, "text": text})
+        with self._lock:
+            self._load_index()
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._path(key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(payload)
+                os.replace(tmp_path, path)  # Atomic, so readers never see a partial entry
+                inode = os.stat(path).st_ino
+            except OSError as e:
+                print(f"Warning: could not write response cache entry: {e}")
+                return
+            if key in self._index:
+                self._total_bytes -= self._index.pop(key)[0]
+            size = len(payload.encode("utf-8"))
+            self._index[key] = (size, created_at, inode)
+            self._total_bytes += size
+            if self._over_budget() or time.time() - self._scanned_at > RESCAN_INTERVAL_SECONDS:
+                self._load_index(rescan=True)  # Evict by what is really on disk, across all processes
+            self._evict()
+
+    def _drop(self, key):
+        size = self._index.pop(key, (0,))[0]
+        self._total_bytes -= size
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _over_budget(self):
+        return len(self._index) > self.max_entries or self._total_bytes > self.max_bytes
+
+    def _evict(self):
+        # Expired entries go first, wherever they are in the LRU order
+        if self.max_age_seconds:
+            cutoff = time.time() - self.max_age_seconds
+            for key in [key for key, (_, created_at, _) in self._index.items() if created_at and created_at < cutoff]:
+                self._drop(key)
+        while self._index and self._over_budget():
+            oldest_key = next(iter(self._index))
+            self._drop(oldest_key)
+
+    def clear(self):
+        """Removes every cached entry and resets the counters."""
+        with self._lock:
+            self._load_index()
+            for key in list(self._index):
+                self._drop(key)
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Returns hit/miss counters and current cache size."""
+        with self._lock:
+            self._load_index()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._index),
+                "bytes": self._total_bytes,
+            }
+
+
+# Process-wide cache shared by call_gemini_api (and therefore every generator)
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """
+    Returns the shared ResponseCache, or None if disabled via CONTENT_CACHE_DISABLED=1.
+    """
+    global _default_cache
+    if os.getenv("CONTENT_CACHE_DISABLED", "").lower() in ("1", "true", "yes"):
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
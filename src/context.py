@@ -1,5 +1,8 @@
 # ai_content_generator/src/context.py
 
+import hashlib
+import json
+
 
 # The function below gathers context via the command line (CLI).
 # It is NOT used directly by the Streamlit app (app.py), which uses
@@ -40,6 +43,22 @@ def gather_website_context():
     print("\nWebsite context gathered (CLI Mode).")
     return context
 
+def site_key(website_context):
+    """
+    Returns a short, stable identifier for a website context.
+    Only the QUESTIONS fields are hashed, so extra keys (e.g. topics) don't change it.
+    """
+    fields = {key: (website_context.get(key) or "") for key in QUESTIONS}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+def context_site_id(website_context):
+    """
+    Returns the id a context's content is stored under: its pinned 'site_id'
+    if it has one (so a site keeps its content when its details are edited),
+    otherwise site_key(website_context).
+    """
+    return website_context.get("site_id") or site_key(website_context)
+
 # Example of how the QUESTIONS dict might be used elsewhere:
 if __name__ == '__main__':
     print("--- Example: Accessing QUESTIONS Dictionary ---")
@@ -0,0 +1,344 @@
+# ai_content_generator/src/export.py
+
+# Streaming export of generated content to disk.
+# Exporter.write() takes one output record (the bulk.py JSONL format) as soon
+# as it is finished and writes the About page or post straight to files:
+#   <export-dir>/<site>/about.md, posts/<slug>.md        Markdown with front matter
+#   <export-dir>/<site>/html/about.html, posts/<slug>.html, index.html, style.css
+#   <export-dir>/<site>.zip                              static-site bundle of html/
+# Every file is written to a temporary name and renamed into place, so readers
+# never see half a file. Nothing is kept in memory between records except
+# the ids of sites whose index page and bundle still need rebuilding, and the
+# page names of those sites' posts (titles whose slugs collide get '-2',
+# '-3', ...). Index pages and bundles are rebuilt from a small per-site log on
+# disk when the site finishes (or when the export is closed), so 10k+ posts
+# export without holding any content in memory while generation carries on.
+
+import hashlib
+import html
+import json
+import os
+import re
+import threading
+import unicodedata
+import zipfile
+
+from .bulk import ABOUT_PAGE, BLOG_POST
+from .quality import parse_keywords
+
+EXPORT_FORMATS = ("markdown", "html", "zip")
+INDEX_LOG_NAME = "index.jsonl"  # One line per exported page; read back to build index pages
+HTML_DIR_NAME = "html"
+SLUG_MAX_LENGTH = 80
+
+STYLE_CSS = """body { font-family: Georgia, serif; line-height: 1.6; color: #222; margin: 0; }
+header { background: #f4f4f4; padding: 1rem 2rem; font-family: sans-serif; }
+header a { color: #222; font-weight: bold; text-decoration: none; }
+main { max-width: 46rem; margin: 2rem auto; padding: 0 1.5rem; }
+h1, h2, h3 { line-height: 1.25; }
+.date { color: #777; font-size: 0.9em; }
+"""
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title} | {site}</title>
+<link rel="stylesheet" href="{root}style.css">
+</head>
+<body>
+<header><a href="{root}index.html">{site}</a></header>
+<main>
+{body}
+</main>
+</body>
+</html>
+"""
+
+
+def parse_formats(value):
+    """Turns 'markdown,html' (or a list) into a list of export formats; raises ValueError for unknown ones."""
+    if isinstance(value, str):
+        value = value.split(",")
+    formats = [item.strip().lower() for item in value or () if item.strip()]
+    unknown = [item for item in formats if item not in EXPORT_FORMATS]
+    if unknown:
+        raise ValueError(f"unknown export format(s): {', '.join(unknown)} (choose from {', '.join(EXPORT_FORMATS)})")
+    return formats
+
+
+def slugify(text, max_length=SLUG_MAX_LENGTH):
+    """URL- and file-safe slug for a title ('Packing for Your 1st Hike!' -> 'packing-for-your-1st-hike')."""
+    ascii_text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii")
+    slug = re.sub(r"[^a-z0-9]+", "-", ascii_text.lower()).strip("-")[:max_length].strip("-")
+    # Titles with no ASCII letters (e.g. in Japanese) still need a stable, distinct name
+    return slug or "post-" + hashlib.sha256((text or "").encode("utf-8")).hexdigest()[:10]
+
+
+def _site_dir_name(site_id):
+    name = re.sub(r"[^A-Za-z0-9._-]+", "-", site_id).strip(".-")
+    return name or "site-" + hashlib.sha256(site_id.encode("utf-8")).hexdigest()[:10]
+
+
+def _write_atomic(path, text):
+    # Written next to the target and renamed over it, so a crash never leaves a partial file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+
+def front_matter(fields):
+    """YAML front matter block; values are JSON-encoded, which YAML reads as quoted strings and lists."""
+    lines = ["---"]
+    for key, value in fields.items():
+        if value not in (None, "", []):
+            lines.append(f"{key}: {json.dumps(value, ensure_ascii=False)}")
+    return "\n".join(lines + ["---", "", ""])
+
+
+# --- Markdown to HTML ---
+# Covers what the prompts produce: headings, paragraphs, bullet and numbered
+# lists, rules, bold/italic, inline code and links. Text is HTML-escaped first.
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*$")
+_BULLET = re.compile(r"^[-*+]\s+(.*)$")
+_NUMBERED = re.compile(r"^\d+[.)]\s+(.*)$")
+_INLINE_RULES = [
+    (re.compile(r"`([^`]+)`"), r"<code>\1</code>"),
+    (re.compile(r"\*\*(.+?)\*\*|__(.+?)__"), lambda m: f"<strong>{m.group(1) or m.group(2)}</strong>"),
+    (re.compile(r"(?<![*\w])\*(?!\s)(.+?)(?<!\s)\*(?!\*)|(?<!\w)_(?!\s)(.+?)(?<!\s)_(?!\w)"),
+     lambda m: f"<em>{m.group(1) or m.group(2)}</em>"),
+    (re.compile(r"\[([^\]]+)\]\((https?://[^)\s]+)\)"), r'<a href="\2">\1</a>'),
+]
+
+
+def _inline(text):
+    text = html.escape(text, quote=False)
+    for pattern, replacement in _INLINE_RULES:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def markdown_to_html(text):
+    """Converts generated Markdown to an HTML fragment."""
+    blocks = []
+    paragraph = []
+    list_tag, list_items = None, []
+
+    def _flush():
+        nonlocal list_tag, list_items
+        if paragraph:
+            blocks.append(f"<p>{_inline(' '.join(paragraph))}</p>")
+            paragraph.clear()
+        if list_items:
+            items = "".join(f"<li>{_inline(item)}</li>" for item in list_items)
+            blocks.append(f"<{list_tag}>{items}</{list_tag}>")
+            list_tag, list_items = None, []
+
+    for line in (text or "").splitlines():
+        stripped = line.strip()
+        heading = _HEADING.match(stripped)
+        item = _BULLET.match(stripped) or _NUMBERED.match(stripped)
+        if not stripped or stripped.startswith("```"):
+            _flush()
+        elif heading:
+            _flush()
+            level = len(heading.group(1))
+            blocks.append(f"<h{level}>{_inline(heading.group(2))}</h{level}>")
+        elif stripped in ("---", "***", "___"):
+            _flush()
+            blocks.append("<hr>")
+        elif item:
+            tag = "ul" if _BULLET.match(stripped) else "ol"
+            if paragraph or tag != list_tag:
+                _flush()
+            list_tag = tag
+            list_items.append(item.group(1))
+        else:
+            if list_items:
+                _flush()
+            paragraph.append(stripped)
+    _flush()
+    return "\n".join(blocks)
+
+
+def render_page(title, body_html, site_name, root=""):
+    """A complete HTML page; `root` is the relative path to the site root ('' or '../')."""
+    return PAGE_TEMPLATE.format(title=html.escape(title), site=html.escape(site_name or "Website"), root=root,
+                                body=body_html)
+
+
+class Exporter:
+    """
+    Writes finished records to `export_dir` in the given formats as they
+    arrive. Call finish_site() when a site is done (optional) and close()
+    at the end, which rebuilds index pages and bundles for the remaining sites.
+    Thread-safe.
+    """
+
+    def __init__(self, export_dir, formats=("markdown",)):
+        self.export_dir = export_dir
+        self.formats = parse_formats(formats)
+        self.html = "html" in self.formats or "zip" in self.formats  # Bundles are zipped from the HTML pages
+        self.written = 0
+        self._dirty = set()  # Sites with pages newer than their index page / bundle
+        self._post_pages = {}  # site_id -> ({topic: page}, set of pages), for sites not finished yet
+        self._lock = threading.Lock()
+
+    def _site_path(self, site_id, *parts):
+        return os.path.join(self.export_dir, _site_dir_name(site_id), *parts)
+
+    def _post_page(self, site_id, topic):
+        """
+        Page name for a post: the same topic always gets the same page, and a
+        different topic whose slug is taken gets '-2', '-3', ... Caller holds the lock.
+        """
+        if site_id not in self._post_pages:
+            # Rebuilt from the site's log, so names stay the same across runs and processes
+            by_topic, used = {}, set()
+            for entry in self._read_log(site_id):
+                if entry.get("type") == "post":
+                    by_topic.setdefault(entry["title"], entry["page"])
+                    used.add(entry["page"])
+            self._post_pages[site_id] = (by_topic, used)
+        by_topic, used = self._post_pages[site_id]
+        page = by_topic.get(topic)
+        if page is None:
+            base = slugify(topic)
+            page, number = "posts/" + base, 1
+            while page in used:
+                number += 1
+                suffix = f"-{number}"
+                page = "posts/" + base[:SLUG_MAX_LENGTH - len(suffix)].rstrip("-") + suffix
+            by_topic[topic] = page
+            used.add(page)
+        return page
+
+    def write(self, record):
+        """
+        Exports one output record (About pages and posts that succeeded; other
+        records are ignored). Returns True if files were written.
+        """
+        artifact = record.get("artifact")
+        content = record.get("content")
+        if record.get("status") != "ok" or artifact not in (ABOUT_PAGE, BLOG_POST) or not isinstance(content, str):
+            return False
+        site_id = record["site_id"]
+        if artifact == ABOUT_PAGE:
+            page, title, root = "about", "About Us", ""
+        else:
+            with self._lock:
+                page = self._post_page(site_id, record.get("topic"))
+            title, root = record.get("topic"), "../"
+        fields = {
+            "title": title,
+            "site_id": site_id,
+            "website_name": record.get("website_name"),
+            "type": "about" if artifact == ABOUT_PAGE else "post",
+            "slug": page.rsplit("/", 1)[-1],
+            "date": record.get("finished_at"),
+            "keywords": parse_keywords(record.get("keywords")),
+            "words": len(content.split()),
+            "target_words": record.get("target_words"),
+            "inputs_hash": record.get("inputs_hash"),
+        }
+        if "markdown" in self.formats:
+            _write_atomic(self._site_path(site_id, page + ".md"), front_matter(fields) + content.strip() + "\n")
+        if self.html:
+            _write_atomic(self._site_path(site_id, HTML_DIR_NAME, page + ".html"),
+                          render_page(title, markdown_to_html(content), record.get("website_name"), root))
+        entry = {"page": page, "title": title, "type": fields["type"], "date": fields["date"],
+                 "website_name": record.get("website_name")}
+        with self._lock:
+            with open(self._site_path(site_id, INDEX_LOG_NAME), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._dirty.add(site_id)
+            self.written += 1
+        return True
+
+    def _read_log(self, site_id):
+        # Every entry of the site's log, oldest first (none if the site has no pages yet)
+        try:
+            with open(self._site_path(site_id, INDEX_LOG_NAME), "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            return
+
+    def _read_index(self, site_id):
+        # Later lines win, so a regenerated page keeps one entry with its newest title and date
+        pages = {}
+        for entry in self._read_log(site_id):
+            pages[entry["page"]] = entry
+        return list(pages.values())
+
+    def finish_site(self, site_id):
+        """Rebuilds the site's index page and zip bundle (when those formats are on)."""
+        with self._lock:
+            self._post_pages.pop(site_id, None)  # Reloaded from the log if the site gets more pages
+            if site_id not in self._dirty:
+                return
+            self._dirty.discard(site_id)
+        if not self.html:
+            return
+        pages = self._read_index(site_id)
+        site_name = next((entry["website_name"] for entry in reversed(pages) if entry.get("website_name")), site_id)
+        posts = sorted((entry for entry in pages if entry["type"] == "post"), key=lambda entry: entry.get("date") or "",
+                       reverse=True)
+        lines = [f"<h1>{html.escape(site_name)}</h1>"]
+        if any(entry["type"] == "about" for entry in pages):
+            lines.append('<p><a href="about.html">About Us</a></p>')
+        if posts:
+            lines.append("<h2>Posts</h2>\n<ul>")
+            lines.extend(f'<li><a href="{html.escape(entry["page"])}.html">{html.escape(entry["title"])}</a> '
+                         f'<span class="date">{html.escape((entry.get("date") or "")[:10])}</span></li>' for entry in posts)
+            lines.append("</ul>")
+        html_dir = self._site_path(site_id, HTML_DIR_NAME)
+        _write_atomic(os.path.join(html_dir, "index.html"), render_page("Home", "\n".join(lines), site_name))
+        _write_atomic(os.path.join(html_dir, "style.css"), STYLE_CSS)
+        if "zip" in self.formats:
+            self._write_bundle(site_id, html_dir)
+
+    def _write_bundle(self, site_id, html_dir):
+        # Files are streamed from disk into the archive, which replaces the old bundle in one rename
+        bundle_path = os.path.join(self.export_dir, _site_dir_name(site_id) + ".zip")
+        temp_path = f"{bundle_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with zipfile.ZipFile(temp_path, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+            for folder, _, files in os.walk(html_dir):
+                for name in sorted(files):
+                    if name.endswith(".tmp"):
+                        continue
+                    path = os.path.join(folder, name)
+                    bundle.write(path, os.path.relpath(path, html_dir))
+        os.replace(temp_path, bundle_path)
+
+    def close(self):
+        """Finishes every site that still has unbundled pages; returns the number of pages written."""
+        with self._lock:
+            pending = list(self._dirty)
+        for site_id in pending:
+            self.finish_site(site_id)
+        return self.written
+
+
+def export_output_files(output_paths, export_dir, formats=("markdown",)):
+    """
+    Exports existing output JSONL files (from bulk or sharded runs) line by
+    line. Returns the number of pages written.
+    """
+    exporter = Exporter(export_dir, formats)
+    for output_path in output_paths:
+        with open(output_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # A line cut short by a crash
+                exporter.write(record)
+    return exporter.close()
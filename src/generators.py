@@ -1,14 +1,55 @@
 # ai_content_generator/src/generators.py (MODIFIED)
 
 # Use relative import to get helper function from the same package
-from .utils import call_gemini_api
+from .utils import call_gemini_api, stream_gemini_api, get_last_api_error
+import hashlib
+import json
+from .routing import get_router
+from .templates import get_template, join_prompt
+from .quality import QUALITY_SPECS, check_quality, last_words, remove_repeated_paragraphs
+from .structured import JsonArrayStreamParser, parse_json_array
+import os
 import re # Import regular expressions for parsing blog ideas
+from concurrent.futures import ThreadPoolExecutor # Bounded pool for batch generation
+
+# Default cap on in-flight model requests for batch generation
+DEFAULT_MAX_CONCURRENCY = 4
+# Opt-in: serve the shared website-context prefix from the model's context cache
+USE_CONTEXT_CACHE = os.getenv("GEMINI_CONTEXT_CACHE", "").lower() in ("1", "true", "yes")
+# Local quality checks after every generation (on unless CONTENT_QUALITY_GATE=0)
+USE_QUALITY_GATE = os.getenv("CONTENT_QUALITY_GATE", "1").lower() not in ("0", "false", "no")
+CONTINUATION_CONTEXT_WORDS = 250  # Draft words sent with a continuation request
+KEYWORD_PARAGRAPH_WORDS = 80  # Length of a continuation that only adds missing keywords
+# Ideas come back as schema-constrained JSON (on unless CONTENT_STRUCTURED_IDEAS=0)
+USE_STRUCTURED_IDEAS = os.getenv("CONTENT_STRUCTURED_IDEAS", "1").lower() not in ("0", "false", "no")
+
+
+def _run_template(template_name, website_context, model, use_cache=True, stream=False, generation_config=None, **params):
+    """
+    Renders a prompt template and sends it to the model (streaming if requested).
+    Metrics for the call are recorded under the template name, which also picks
+    the model tier and output limits (see routing.py).
+    With GEMINI_CONTEXT_CACHE=1 the website-context prefix is sent through the
+    model's context cache when the API accepts it; otherwise the full prompt is sent.
+    """
+    prefix, body = get_template(template_name).render_parts(website_context, **params)
+    model, generation_config = get_router().route(template_name, model, generation_config)
+    call = stream_gemini_api if stream else call_gemini_api
+    if USE_CONTEXT_CACHE:
+        from .api_config import get_context_cached_model # Only needed when context caching is on
+        cached_model = get_context_cached_model(model, prefix)
+        if cached_model:
+            return call(cached_model, body, generation_config=generation_config, use_cache=use_cache,
+                        generator_name=template_name)
+    return call(model, join_prompt(prefix, body), generation_config=generation_config, use_cache=use_cache,
+                generator_name=template_name)
 
 # MODIFIED: Function signature now accepts optional arguments
-def generate_about_page(website_context, model, brand_story=None, call_to_action=None):
+def generate_about_page(website_context, model, brand_story=None, call_to_action=None, use_cache=True, stream=False):
     """
     Generates an 'About Us' page aiming for approx 600 words,
     using the provided website context, model, and optional details.
+    With stream=True, returns an iterator of text chunks instead of the full text.
     """
     if not model or not website_context:
         print("Error: Model or website context is missing for About Page generation.")
@@ -22,45 +63,47 @@ def generate_about_page(website_context, model, brand_story=None, call_to_action
     # call_to_action = input(...) # REMOVED - Value now comes from arguments
     # --- END REMOVED INPUT CALLS ---
 
+    # Prompt text lives in src/templates.py; the context block is shared per site
+    content = _run_template("about_page", website_context, model, use_cache=use_cache, stream=stream,
+                            **_about_page_params(brand_story, call_to_action))
+    if stream or not content or not USE_QUALITY_GATE:
+        return content # Streaming callers run enforce_quality on the collected text
+    return enforce_quality("about_page", content, website_context, model, use_cache=use_cache)[0]
+
+
+def _about_page_params(brand_story, call_to_action):
     # Use the arguments passed to the function or provide defaults for the prompt
-    story_detail = brand_story if brand_story else 'Not provided.'
-    cta_detail = call_to_action if call_to_action else 'Encourage exploration of the site.'
-
-    prompt = f"""
-    Act as an expert copywriter creating a compelling 'About Us' page.
-    Use the following website context and specific details:
-
-    **Website Context:**
-    * Name: {website_context.get('website_name', 'N/A')}
-    * Central Theme: {website_context.get('website_theme', 'N/A')}
-    * Purpose/Mission: {website_context.get('website_purpose', 'N/A')}
-    * Target Audience: {website_context.get('target_audience', 'N/A')}
-    * Key Offerings: {website_context.get('key_offerings', 'N/A')}
-    * Uniqueness: {website_context.get('unique_selling_prop', 'N/A')}
-    * General Tone: {website_context.get('tone_of_voice', 'neutral')}
-
-    **About Page Specifics:**
-    * Brand Story: {story_detail}
-    * Call to Action: {cta_detail}
-
-    **Instructions:**
-    1. Write a coherent and engaging 'About Us' page clearly reflecting the central theme.
-    2. Strictly adhere to the general tone specified in the context.
-    3. Target the specified audience.
-    4. Naturally integrate the purpose, offerings, and uniqueness.
-    5. Incorporate the brand story concisely if provided (value is '{story_detail}').
-    6. Conclude with or integrate the call to action (value is '{cta_detail}').
-    7. Structure logically. Do not add information not derived from the details provided.
-    8. Important: Write the content to be approximately 600 words long.
-    """
-    # Ensure the helper function is called correctly
-    return call_gemini_api(model, prompt)
-
-
-def generate_blog_post(website_context, model, topic, keywords=None):
+    return {"story_detail": brand_story if brand_story else 'Not provided.',
+            "cta_detail": call_to_action if call_to_action else 'Encourage exploration of the site.'}
+
+
+def _blog_post_params(topic, keywords):
+    return {"topic": topic, "keywords": keywords if keywords else 'Focus on the main topic naturally.'}
+
+
+def render_generator_prompt(template_name, website_context, topic=None, keywords=None, brand_story=None, call_to_action=None,
+                            target_words=None):
+    """
+    Returns (template id, full prompt) as sent by generate_about_page ('about_page'),
+    generate_blog_post ('blog_post') or, for the outline of a long post,
+    generate_long_blog_post ('blog_post_outline') for the same arguments, e.g.
+    to store the prompt alongside the generated content.
+    """
+    if template_name == "about_page":
+        params = _about_page_params(brand_story, call_to_action)
+    elif template_name == "blog_post_outline":
+        params = _outline_params(topic, keywords, target_words)
+    else:
+        params = _blog_post_params(topic, keywords)
+    template = get_template(template_name)
+    return template.template_id, template.render(website_context, **params)
+
+
+def generate_blog_post(website_context, model, topic, keywords=None, use_cache=True, stream=False):
     """
     Generates a blog post aiming for 600-800 words on a specific topic,
     using the website context and AI model.
+    With stream=True, returns an iterator of text chunks instead of the full text.
     """
     if not model or not website_context:
         print("Error: Model or website context is missing for Blog Post generation.")
@@ -72,82 +115,619 @@ def generate_blog_post(website_context, model, topic, keywords=None):
     # Server-side print
     print(f"\nGenerating Blog Post about: '{topic}' (aiming for 600-800 words)...")
 
-    prompt = f"""
-    Act as a knowledgeable blog writer creating an engaging post for the website '{website_context.get('website_name', 'this website')}'.
+    content = _run_template("blog_post", website_context, model, use_cache=use_cache, stream=stream,
+                            **_blog_post_params(topic, keywords))
+    if stream or not content or not USE_QUALITY_GATE:
+        return content # Streaming callers run enforce_quality on the collected text
+    return enforce_quality("blog_post", content, website_context, model, keywords=keywords, use_cache=use_cache)[0]
+
+
+_ARTIFACT_LABELS = {"about_page": "'About Us' page", "blog_post": "blog post"}
 
-    **Website Context (Use this for relevance and tone):**
-    * Central Theme: {website_context.get('website_theme', 'N/A')}
-    * Target Audience: {website_context.get('target_audience', 'N/A')}
-    * General Tone: {website_context.get('tone_of_voice', 'neutral')}
+# --- Input tracking for incremental regeneration ---
+# Each artifact's prompt reads its template's context fields; the About page
+# also reads the brand story and call to action, which it passes as parameters.
+_ARTIFACT_TEMPLATES = {"about_page": "about_page", "blog_ideas": "blog_post_ideas", "blog_post": "blog_post"}
+_EXTRA_CONTEXT_DEPENDENCIES = {"about_page": ("brand_story", "call_to_action")}
 
-    **Blog Post Specifics:**
-    * Topic: {topic}
-    * Target Keywords (Optional): {keywords if keywords else 'Focus on the main topic naturally.'}
-    * Required Word Count Range: Approximately 600 to 800 words.
 
-    **Instructions:**
-    1. Write an informative and engaging blog post specifically about '{topic}'.
-    2. Ensure the content is highly relevant to the website's central theme: '{website_context.get('website_theme', 'N/A')}'.
-    3. Write in a style and language appropriate for the target audience: '{website_context.get('target_audience', 'N/A')}'.
-    4. Maintain the general tone: '{website_context.get('tone_of_voice', 'neutral')}'.
-    5. If keywords were provided, try to incorporate them naturally.
-    6. Important: Write the post to be approximately 600 to 800 words long, ensuring quality and coherence within this range.
-    7. Structure the post logically with an introduction, main body (perhaps with subheadings), and a conclusion.
-    8. The content must be original and focused solely on the provided topic within the website's context.
+def context_dependencies(artifact):
+    """Returns the website-context fields an artifact's prompt depends on."""
+    template = get_template(_ARTIFACT_TEMPLATES[artifact])
+    return template.context_fields + _EXTRA_CONTEXT_DEPENDENCIES.get(artifact, ())
+
+
+def inputs_hash(artifact, website_context):
+    """
+    Hash of everything in the website context (and the template version) that
+    an artifact's prompt uses. It changes only when one of those inputs does,
+    so artifacts whose stored hash still matches can be reused.
+    """
+    template = get_template(_ARTIFACT_TEMPLATES[artifact])
+    values = [template.template_id] + [website_context.get(field) or "" for field in context_dependencies(artifact)]
+    return hashlib.sha256(json.dumps(values).encode("utf-8")).hexdigest()[:16]
+
+
+def changed_dependencies(artifact, old_context, new_context):
+    """The fields an artifact depends on that differ between two contexts."""
+    return [field for field in context_dependencies(artifact)
+            if (old_context.get(field) or "") != (new_context.get(field) or "")]
+
+
+def enforce_quality(artifact, text, website_context, model, keywords=None, use_cache=True):
     """
-    return call_gemini_api(model, prompt)
+    Runs the local quality checks (src/quality.py) on an About page or blog post
+    and fixes what it cheaply can. Repeated paragraphs are removed locally. A
+    text that is too short, or is missing keywords and has room for them, gets
+    one continuation request for just the missing part. A text that is too
+    long gets one trim request. Returns (text, QualityReport); the report
+    describes the final text and lists the fixes applied. Artifacts without a
+    spec are returned unchanged with a None report.
+    """
+    spec = QUALITY_SPECS.get(artifact)
+    if spec is None or not text:
+        return text, None
+    report = check_quality(text, spec, keywords)
+    if report.passed:
+        return text, report
+
+    fixes = []
+    if report.repeated_paragraphs:
+        text = remove_repeated_paragraphs(text)
+        fixes.append(f"removed {report.repeated_paragraphs} repeated paragraph(s)")
+        report = check_quality(text, spec, keywords)
+
+    label = _ARTIFACT_LABELS.get(artifact, artifact)
+    room_for_keywords = report.missing_keywords and report.word_count + KEYWORD_PARAGRAPH_WORDS <= spec.max_words
+    if report.too_short or room_for_keywords:
+        missing_words = max(spec.target_words - report.word_count, KEYWORD_PARAGRAPH_WORDS)
+        keyword_line = ""
+        if report.missing_keywords:
+            keyword_line = "4. Work these keywords in naturally: " + ", ".join(report.missing_keywords) + "."
+        continuation = _run_template("content_continuation", website_context, model, use_cache=use_cache,
+                                     artifact_label=label, word_count=report.word_count, target_words=spec.target_words,
+                                     missing_words=missing_words, keyword_line=keyword_line,
+                                     draft_tail=last_words(text, CONTINUATION_CONTEXT_WORDS))
+        if continuation:
+            text = text.rstrip() + "\n\n" + continuation.strip()
+            fixes.append(f"continued from {report.word_count} words")
+    elif report.too_long:
+        trimmed = _run_template("content_trim", website_context, model, use_cache=use_cache,
+                                artifact_label=label, word_count=report.word_count, max_words=spec.max_words, draft=text)
+        # Only accept a trim that actually shortened the text without cutting it below the minimum
+        if trimmed and spec.min_words <= len(trimmed.split()) < report.word_count:
+            text = trimmed.strip()
+            fixes.append(f"trimmed from {report.word_count} words")
+
+    if fixes:
+        report = check_quality(text, spec, keywords)
+    report.fixes = fixes
+    if report.issues:
+        print(f"Quality check for {label}: " + "; ".join(report.issues))
+    return text, report
 
 
-def generate_blog_post_ideas(website_context, model):
+def generate_blog_posts(website_context, model, topics, keywords=None, max_concurrency=DEFAULT_MAX_CONCURRENCY, use_cache=True,
+                        topic_index=None):
     """
-    Generates a list of 10 blog post title ideas based on the website context.
-    Returns a list of strings (titles) or None if failed.
+    Generates blog posts for many topics concurrently using a bounded thread pool.
+    At most `max_concurrency` model requests are in flight at any time.
+    Returns a list of dicts ({'topic', 'content', 'error'}) in the same order as `topics`.
+    If `topic_index` (an IdeaIndex of topics that already have posts) is given,
+    near-duplicate topics are skipped before any request is scheduled and
+    successfully generated topics are added to it.
     """
     if not model or not website_context:
-        print("Error: Model or website context is missing for Idea generation.")
+        print("Error: Model or website context is missing for batch Blog Post generation.")
         return None
 
-    # Server-side print
-    print("\nGenerating 10 Blog Post Title Ideas...")
+    topics = list(topics or [])
+    if not topics:
+        return []
+    max_concurrency = max(1, min(int(max_concurrency or 1), len(topics)))
+
+    skipped = _near_duplicate_topics(topics, topic_index) if topic_index is not None else {}
+
+    print(f"\nGenerating {len(topics) - len(skipped)} Blog Posts (up to {max_concurrency} at a time)...")
 
-    prompt = f"""
-    Act as an expert content strategist and blogger for the website '{website_context.get('website_name', 'this website')}'.
+    def _generate_one(position):
+        topic = topics[position]
+        if position in skipped:
+            return {"topic": topic, "content": None, "error": f"Skipped: near-duplicate of '{skipped[position]}'."}
+        # Errors are captured per topic so one failure never sinks the whole batch
+        try:
+            content = generate_blog_post(website_context, model, topic, keywords=keywords, use_cache=use_cache)
+        except Exception as e:
+            return {"topic": topic, "content": None, "error": str(e)}
+        if not content:
+            return {"topic": topic, "content": None, "error": get_last_api_error() or "No content was returned by the model."}
+        if topic_index is not None:
+            topic_index.add(topic)
+        return {"topic": topic, "content": content, "error": None}
 
-    **Website Context:**
-    * Central Theme: {website_context.get('website_theme', 'N/A')}
-    * Target Audience: {website_context.get('target_audience', 'N/A')}
-    * Purpose/Mission: {website_context.get('website_purpose', 'N/A')}
-    * Key Offerings: {website_context.get('key_offerings', 'N/A')}
-    * General Tone: {website_context.get('tone_of_voice', 'neutral')}
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        # executor.map yields results in input order regardless of completion order
+        return list(executor.map(_generate_one, range(len(topics))))
 
-    **Task:**
-    Based *only* on the website context provided above, generate a list of exactly 10 engaging and relevant blog post titles.
-    The titles should:
-    - Be suitable for the target audience.
-    - Directly relate to the website's central theme and purpose.
-    - Be varied and interesting.
 
-    **Output Format:**
-    Provide the output as a numbered list (1. Title 1, 2. Title 2, ... 10. Title 10).
-    Do not include any introductory or concluding text, just the numbered list of titles.
+def _near_duplicate_topics(topics, topic_index):
     """
+    Returns {position: existing title} for the topics that near-duplicate a
+    topic in `topic_index` or an earlier topic of the same batch. Keyed by
+    position, so the first copy of a repeated topic is still generated.
+    """
+    from .idea_index import IdeaIndex # Imported on use: only needed when deduplicating
+    batch_index = IdeaIndex()
+    skipped = {}
+    for position, topic in enumerate(topics):
+        existing, _ = topic_index.find_duplicate(topic)
+        if existing is None:
+            existing, _ = batch_index.find_duplicate(topic)
+        if existing is not None:
+            skipped[position] = existing
+        else:
+            batch_index.add(topic)
+    return skipped
+
+
+# --- Long-form posts ---
+# A long post is written as a short JSON outline followed by all of its
+# sections in parallel, each request carrying the shared site context and the
+# full outline so the sections fit together. Wall-clock time is roughly one
+# outline plus one section instead of the whole article. The sections are then
+# stitched locally: headings are normalised and repeated paragraphs dropped.
+
+LONG_POST_SECTION_WORDS = 350  # Typical section length; sets the number of sections
+LONG_POST_MIN_SECTIONS = 3
+LONG_POST_MAX_SECTIONS = 8
+OUTLINE_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "sections": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "heading": {"type": "string"},
+                    "points": {"type": "array", "items": {"type": "string"}},
+                },
+                "required": ["heading", "points"],
+            },
+        },
+    },
+    "required": ["title", "sections"],
+}
+OUTLINE_GENERATION_CONFIG = {"response_mime_type": "application/json", "response_schema": OUTLINE_RESPONSE_SCHEMA}
+MARKDOWN_HEADING_PATTERN = re.compile(r"^\s*(?:#{1,6}\s+(.+?)|\*\*([^*\n]+)\*\*:?)\s*$")
+
+
+def _heading_text(line):
+    """The text of a Markdown heading line ('## X' or a bold '**X**' line), or None."""
+    match = MARKDOWN_HEADING_PATTERN.match(line)
+    return (match.group(1) or match.group(2)).strip() if match else None
+
+
+def long_post_section_count(target_words):
+    """Number of outline sections for a long post of about `target_words`."""
+    sections = round(target_words / LONG_POST_SECTION_WORDS)
+    return max(LONG_POST_MIN_SECTIONS, min(LONG_POST_MAX_SECTIONS, sections))
+
+
+def _outline_params(topic, keywords, target_words):
+    section_count = long_post_section_count(target_words)
+    return dict(_blog_post_params(topic, keywords), target_words=target_words, section_count=section_count,
+                section_words=target_words // section_count)
+
+
+def _parse_outline(text, topic):
+    """
+    Returns (title, [{'heading', 'points'}]) from the outline response. JSON is
+    expected; a plain list of headings is accepted as a fallback.
+    """
+    text = (text or "").strip()
+    outline = None
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        try:
+            outline = json.loads(text[start:end + 1])
+        except ValueError:
+            outline = None
+    if isinstance(outline, dict):
+        title = " ".join(str(outline.get("title") or "").split()) or topic
+        items = outline.get("sections") or []
+    else:
+        title = topic
+        items = parse_json_array(text, key="sections")
+        if not items:
+            # Not JSON at all: every heading or numbered line starts a section
+            items = [_heading_text(line) or NUMBERED_LINE_PATTERN.sub("", line) for line in text.splitlines()
+                     if _heading_text(line) or NUMBERED_LINE_PATTERN.match(line)]
+    sections = []
+    for item in items:
+        if isinstance(item, str):
+            item = {"heading": item}
+        if not isinstance(item, dict):
+            continue
+        heading = " ".join(str(item.get("heading") or "").split()).strip("#* ")
+        if not heading:
+            continue
+        points = item.get("points") or []
+        if isinstance(points, str):
+            points = [points]
+        sections.append({"heading": heading, "points": [str(point).strip() for point in points if str(point).strip()]})
+    return title, sections[:LONG_POST_MAX_SECTIONS]
+
+
+def _section_position_note(index, count):
+    if index == 0:
+        return "This is the opening section: start with a short introduction to the whole article."
+    if index == count - 1:
+        return "This is the final section: finish the article with a brief conclusion."
+    return "This is a middle section: do not write an introduction or a conclusion for the article."
 
-    raw_ideas_text = call_gemini_api(model, prompt)
+
+def _clean_section(text, heading, title):
+    """
+    Makes a section start with exactly one '## heading' line. A repeated article
+    title is dropped and top-level headings inside the section are demoted.
+    """
+    lines = [line for line in text.strip().splitlines() if not line.strip().startswith("```")]
+    while lines and (not lines[0].strip() or (_heading_text(lines[0]) or "").lower() == title.lower()):
+        lines.pop(0)
+    if lines and _heading_text(lines[0]):
+        lines.pop(0)  # The model's own version of the section heading
+    body = "\n".join("###" + line.lstrip()[1:] if re.match(r"^\s*#\s", line) else line for line in lines).strip()
+    return f"## {heading}\n\n{body}" if body else None
+
+
+def stitch_sections(title, sections, texts):
+    """Joins section texts (in outline order) into one article and drops repeated paragraphs."""
+    parts = [f"# {title}"]
+    for section, text in zip(sections, texts):
+        cleaned = _clean_section(text or "", section["heading"], title)
+        if cleaned:
+            parts.append(cleaned)
+    return remove_repeated_paragraphs("\n\n".join(parts))
+
+
+def generate_long_blog_post(website_context, model, topic, keywords=None, target_words=2000, max_concurrency=None,
+                            use_cache=True, on_outline=None, on_section=None):
+    """
+    Generates a long-form blog post of about `target_words` words: a JSON outline
+    first, then every section concurrently (at most `max_concurrency` at once;
+    default all), then a local stitching pass. Returns the article, or None if
+    the outline or a section could not be generated.
+    on_outline(title, sections) is called once the outline is known and
+    on_section(index, text) as each section finishes (from worker threads).
+    """
+    if not model or not website_context:
+        print("Error: Model or website context is missing for long Blog Post generation.")
+        return None
+    if not topic:
+        print("Error: Blog post topic is required.")
+        return None
+
+    print(f"\nGenerating long-form Blog Post about: '{topic}' (aiming for ~{target_words} words)...")
+    params = _outline_params(topic, keywords, target_words)
+    outline_text = _run_template("blog_post_outline", website_context, model, use_cache=use_cache,
+                                 generation_config=OUTLINE_GENERATION_CONFIG, **params)
+    title, sections = _parse_outline(outline_text, topic)
+    if len(sections) < 2:
+        print("Could not plan the article: the outline had fewer than two sections.")
+        return None
+    if on_outline:
+        on_outline(title, sections)
+
+    section_words = target_words // len(sections)
+    outline_block = "\n".join(f"{i}. {section['heading']}" for i, section in enumerate(sections, 1))
+
+    def _write_section(index):
+        section = sections[index]
+        points = section["points"] or [f"Whatever the heading '{section['heading']}' promises, in the article's context."]
+        text = _run_template("blog_post_section", website_context, model, use_cache=use_cache,
+                             title=title, topic=topic, keywords=params["keywords"], outline_block=outline_block,
+                             section_number=index + 1, section_count=len(sections), heading=section["heading"],
+                             points_block="\n".join(f"- {point}" for point in points), section_words=section_words,
+                             position_note=_section_position_note(index, len(sections)))
+        if text and on_section:
+            on_section(index, text)
+        return text
+
+    max_concurrency = max(1, min(int(max_concurrency or len(sections)), len(sections)))
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        texts = list(executor.map(_write_section, range(len(sections))))
+    missing = [i for i, text in enumerate(texts) if not text]
+    for i in missing:
+        texts[i] = _write_section(i)  # One more try (the scheduler has already retried transient errors)
+    if not all(texts):
+        print(f"Could not generate {sum(1 for text in texts if not text)} section(s) of '{topic}'.")
+        return None
+    return stitch_sections(title, sections, texts)
+
+
+# --- Blog post ideas ---
+# In structured mode the model is asked for JSON matching IDEA_RESPONSE_SCHEMA
+# (enforced through the generation config) and the response is streamed
+# through an incremental parser, so each idea is usable as soon as its object
+# is complete. If the output is not JSON after all, or an element is malformed,
+# parsing stops and (if no idea was usable) the text is parsed as a list.
+
+IDEA_INTENTS = ("informational", "commercial", "transactional", "navigational")
+IDEA_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "ideas": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "title": {"type": "string"},
+                    "keywords": {"type": "array", "items": {"type": "string"}},
+                    "intent": {"type": "string", "enum": list(IDEA_INTENTS)},
+                    "estimated_words": {"type": "integer"},
+                },
+                "required": ["title", "keywords", "intent", "estimated_words"],
+            },
+        },
+    },
+    "required": ["ideas"],
+}
+IDEA_GENERATION_CONFIG = {"response_mime_type": "application/json", "response_schema": IDEA_RESPONSE_SCHEMA}
+
+
+def _normalize_idea(item):
+    """
+    Turns one parsed element into {'title', 'keywords', 'intent', 'estimated_words'},
+    or None if it has no usable title. Plain strings become titles without metadata.
+    """
+    if isinstance(item, str):
+        item = {"title": item}
+    if not isinstance(item, dict):
+        return None
+    title = " ".join(str(item.get("title") or "").split())
+    if not title:
+        return None
+    keywords = item.get("keywords") or []
+    if isinstance(keywords, str):
+        keywords = keywords.split(",")
+    intent = str(item.get("intent") or "").strip().lower()
+    try:
+        estimated_words = int(item.get("estimated_words")) or None
+    except (TypeError, ValueError):
+        estimated_words = None
+    return {
+        "title": title,
+        "keywords": [str(keyword).strip() for keyword in keywords if str(keyword).strip()],
+        "intent": intent if intent in IDEA_INTENTS else None,
+        "estimated_words": estimated_words,
+    }
+
+
+def idea_keywords(idea):
+    """The keywords of an idea dict as the comma-separated string generate_blog_post takes (or None)."""
+    keywords = (idea or {}).get("keywords")
+    return ", ".join(keywords) if keywords else None
+
+
+def generate_blog_post_ideas(website_context, model, use_cache=True, idea_index=None, avoid_limit=30, count=10,
+                             with_details=False, on_idea=None):
+    """
+    Generates `count` (default 10) blog post title ideas based on the website context.
+    Returns a list of titles, or with with_details=True a list of dicts with
+    'title', 'keywords', 'intent' and 'estimated_words'; None if it failed.
+    on_idea(idea dict) is called for each new idea as soon as it has arrived.
+    If `idea_index` (the site's IdeaIndex) is given, the prompt lists up to
+    `avoid_limit` existing titles to avoid, near-duplicates are dropped from the
+    result and the new titles are added to the index.
+    """
+    if not model or not website_context:
+        print("Error: Model or website context is missing for Idea generation.")
+        return None
+
+    # Server-side print
+    print(f"\nGenerating {count} Blog Post Title Ideas...")
+
+    avoid_titles = idea_index.recent_titles(avoid_limit) if idea_index is not None else []
+    avoid_block = ""
+    if avoid_titles:
+        avoid_block = ("\n**Already Covered (do not repeat or closely paraphrase these):**\n"
+                       + "\n".join(f"- {title}" for title in avoid_titles) + "\n")
+
+    ideas = []
+    seen_titles = set()
+    dropped = 0
+
+    def _accept(idea):
+        # Drops exact repeats within the response and near-duplicates of earlier ideas
+        nonlocal dropped
+        if idea is None or len(ideas) >= count or idea["title"].lower() in seen_titles:
+            return
+        seen_titles.add(idea["title"].lower())
+        if idea_index is not None and not idea_index.add(idea["title"]):
+            dropped += 1
+            return
+        ideas.append(idea)
+        if on_idea:
+            on_idea(idea)
+
+    if USE_STRUCTURED_IDEAS:
+        chunks = _run_template("blog_post_ideas_json", website_context, model, use_cache=use_cache, stream=True,
+                               generation_config=IDEA_GENERATION_CONFIG, idea_count=count,
+                               avoid_block=avoid_block, intents=", ".join(IDEA_INTENTS))
+        parser = JsonArrayStreamParser(key="ideas", strict=True)
+        received = []
+        malformed = False
+        for chunk in chunks or ():
+            received.append(chunk)
+            if malformed:
+                continue  # Stop parsing, but keep the text for the list fallback
+            for item in parser.feed(chunk):
+                idea = _normalize_idea(item)
+                if idea is None:
+                    malformed = True
+                    break
+                _accept(idea)
+            malformed = malformed or parser.errors > 0
+        raw_ideas_text = "".join(received)
+        if not ideas and raw_ideas_text and (malformed or not parser.items):
+            print("Idea response was not valid JSON; parsing it as a list instead.")
+            for title in _parse_idea_list(raw_ideas_text):
+                _accept(_normalize_idea(title))
+    else:
+        raw_ideas_text = _run_template("blog_post_ideas", website_context, model, use_cache=use_cache,
+                                       avoid_block=avoid_block)
+        # Attempt to parse the numbered list into a Python list
+        for title in _parse_idea_list(raw_ideas_text or ""):
+            _accept(_normalize_idea(title))
 
     if not raw_ideas_text:
         print("Could not generate blog post ideas.")
         return None
+    if dropped:
+        print(f"Dropped {dropped} near-duplicate idea(s).")
+    if not ideas and not dropped:
+        print("Could not parse generated ideas into a list. Raw Output:")
+        print(raw_ideas_text)
+        return None
+
+    return ideas if with_details else [idea["title"] for idea in ideas]
+
 
-    # Attempt to parse the numbered list into a Python list
+NUMBERED_LINE_PATTERN = re.compile(r"^\s*\d+[\.\)\-]?\s*")
+
+
+def _parse_idea_list(raw_ideas_text):
+    """
+    Parses a numbered list of titles into a list of strings. If some lines are
+    numbered, unnumbered lines (a preamble or closing remark) are ignored.
+    """
+    lines = [line.strip() for line in raw_ideas_text.strip().split('\n') if line.strip() and not line.strip().startswith("```")]
+    if any(NUMBERED_LINE_PATTERN.match(line) and NUMBERED_LINE_PATTERN.sub("", line) for line in lines):
+        lines = [line for line in lines if NUMBERED_LINE_PATTERN.match(line)]
     ideas = []
-    for line in raw_ideas_text.strip().split('\n'):
-        cleaned_line = re.sub(r"^\s*\d+[\.\)\-]?\s*", "", line.strip())
+    for line in lines:
+        cleaned_line = NUMBERED_LINE_PATTERN.sub("", line).strip('*"').strip()
         if cleaned_line:
             ideas.append(cleaned_line)
+    return ideas
+
+
+# --- Combined (multi-artifact) generation ---
+# One structured request returns several artifacts separated by marker lines,
+# so the shared website context is sent once instead of once per artifact.
+
+ABOUT_PAGE_MARKER = "=== ABOUT PAGE ==="
+BLOG_IDEAS_MARKER = "=== BLOG POST IDEAS ==="
+POST_MARKER_PATTERN = re.compile(r"^\s*=== POST (\d+) ===\s*$", re.MULTILINE)
+# Posts per combined request; keeps the response well inside the output token limit
+DEFAULT_POSTS_PER_REQUEST = 4
+
+
+def _split_on_markers(text, markers):
+    """
+    Splits `text` into {marker: section text} for each marker line found.
+    Missing or empty sections are left out.
+    """
+    positions = sorted((text.find(marker), marker) for marker in markers if marker in text)
+    sections = {}
+    for i, (start, marker) in enumerate(positions):
+        end = positions[i + 1][0] if i + 1 < len(positions) else len(text)
+        section = text[start + len(marker):end].strip()
+        if section:
+            sections[marker] = section
+    return sections
+
+
+def generate_about_page_and_ideas(website_context, model, brand_story=None, call_to_action=None, use_cache=True):
+    """
+    Generates the About page and 10 blog post ideas in a single request.
+    Returns {'about_page': str or None, 'blog_ideas': list or None}.
+    If either part cannot be parsed from the combined response, it is
+    regenerated with its own per-item call.
+    """
+    if not model or not website_context:
+        print("Error: Model or website context is missing for combined generation.")
+        return None
+
+    print("\nGenerating 'About Us' page and 10 Blog Post Title Ideas in one request...")
+
+    raw_text = _run_template("about_page_and_ideas", website_context, model, use_cache=use_cache,
+                             **_about_page_params(brand_story, call_to_action),
+                             about_marker=ABOUT_PAGE_MARKER, ideas_marker=BLOG_IDEAS_MARKER)
+    sections = _split_on_markers(raw_text or "", [ABOUT_PAGE_MARKER, BLOG_IDEAS_MARKER])
+
+    about_page = sections.get(ABOUT_PAGE_MARKER)
+    if about_page and USE_QUALITY_GATE:
+        about_page = enforce_quality("about_page", about_page, website_context, model, use_cache=use_cache)[0]
+    ideas = _parse_idea_list(sections[BLOG_IDEAS_MARKER])[:10] if BLOG_IDEAS_MARKER in sections else []
 
+    # Fall back to per-item calls for whatever could not be parsed
+    if not about_page:
+        print("Combined response had no usable About page. Falling back to a separate request.")
+        about_page = generate_about_page(website_context, model, brand_story=brand_story,
+                                         call_to_action=call_to_action, use_cache=use_cache)
     if not ideas:
-         print("Could not parse generated ideas into a list. Raw Output:")
-         print(raw_ideas_text)
-         return None
+        print("Combined response had no usable idea list. Falling back to a separate request.")
+        ideas = generate_blog_post_ideas(website_context, model, use_cache=use_cache)
+
+    return {"about_page": about_page, "blog_ideas": ideas or None}
+
+
+def generate_blog_posts_combined(website_context, model, topics, keywords=None,
+                                 posts_per_request=DEFAULT_POSTS_PER_REQUEST,
+                                 max_concurrency=DEFAULT_MAX_CONCURRENCY, use_cache=True):
+    """
+    Generates blog posts for several topics per request (up to `posts_per_request`
+    each), so the website context is sent once per group instead of once per post.
+    Returns the same list of {'topic', 'content', 'error'} dicts as generate_blog_posts.
+    Posts missing from a combined response are regenerated individually.
+    """
+    if not model or not website_context:
+        print("Error: Model or website context is missing for combined Blog Post generation.")
+        return None
+
+    topics = list(topics or [])
+    if not topics:
+        return []
+    posts_per_request = max(1, int(posts_per_request or 1))
+    groups = [topics[i:i + posts_per_request] for i in range(0, len(topics), posts_per_request)]
+
+    print(f"\nGenerating {len(topics)} Blog Posts in {len(groups)} combined request(s)...")
+
+    def _generate_group(group):
+        topic_lines = "\n".join(f"{i}. {topic}" for i, topic in enumerate(group, start=1))
+        raw_text = _run_template("blog_posts_combined", website_context, model, use_cache=use_cache,
+                                 topic_lines=topic_lines, post_count=len(group),
+                                 keywords=keywords if keywords else 'Focus on each topic naturally.') or ""
+        markers = [match.group(0) for match in POST_MARKER_PATTERN.finditer(raw_text)]
+        sections = _split_on_markers(raw_text, markers)
+        posts = {}
+        for marker, section in sections.items():
+            number = int(POST_MARKER_PATTERN.match(marker).group(1))
+            if 1 <= number <= len(group):
+                if USE_QUALITY_GATE:
+                    section = enforce_quality("blog_post", section, website_context, model, keywords=keywords, use_cache=use_cache)[0]
+                posts[group[number - 1]] = section
+        return posts
+
+    with ThreadPoolExecutor(max_workers=max(1, min(int(max_concurrency or 1), len(groups)))) as executor:
+        parsed = {}
+        for posts in executor.map(_generate_group, groups):
+            parsed.update(posts)
+
+    missing = [topic for topic in topics if not parsed.get(topic)]
+    if missing:
+        print(f"{len(missing)} post(s) missing from combined responses. Falling back to individual requests.")
+        for result in generate_blog_posts(website_context, model, missing, keywords=keywords,
+                                          max_concurrency=max_concurrency, use_cache=use_cache):
+            parsed[result["topic"]] = result
 
-    return ideas[:10] # Return up to 10 parsed ideas
\ No newline at end of file
+    results = []
+    for topic in topics:
+        post = parsed.get(topic)
+        if isinstance(post, dict):
+            results.append(post)  # Result of an individual fallback request
+        else:
+            results.append({"topic": topic, "content": post, "error": None})
+    return results
\ No newline at end of file
@@ -0,0 +1,233 @@
+# ai_content_generator/src/idea_index.py
+
+# Near-duplicate detection for blog post titles.
+# Titles are normalised, split into character shingles and reduced to a
+# MinHash signature. Signatures are stored as rows of one compact uint32
+# NumPy array, and an LSH band index maps each band of a signature to the
+# rows sharing it. A lookup only compares the handful of candidates found in
+# those buckets, so it stays fast with 100k+ stored titles.
+# NumPy is imported on first use, so importing this module stays cheap.
+
+import os
+import re
+import threading
+import zlib
+
+from .context import context_site_id
+
+DEFAULT_NUM_PERM = 64
+DEFAULT_BANDS = 16  # 16 bands x 4 rows: pairs above ~0.5 similarity almost always share a bucket
+DEFAULT_THRESHOLD = 0.6  # Estimated Jaccard similarity at or above which titles count as duplicates
+SHINGLE_SIZE = 4
+_MERSENNE_PRIME = (1 << 31) - 1
+
+STOPWORDS = {"a", "an", "the", "and", "or", "of", "to", "for", "in", "on", "with", "your", "you", "how", "why", "what"}
+
+
+def normalize_title(title):
+    """Casefolds, strips punctuation/stopwords and collapses whitespace (letters of any script are kept)."""
+    text = re.sub(r"[^\w\s]|_", " ", (title or "").casefold())
+    words = [word for word in text.split() if word not in STOPWORDS]
+    return " ".join(words)
+
+
+def _shingle_hashes(normalized):
+    import numpy as np
+    text = normalized or " "
+    if len(text) <= SHINGLE_SIZE:
+        shingles = {text}
+    else:
+        shingles = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+    return np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+
+class IdeaIndex:
+    """
+    MinHash/LSH index of titles for one site.
+    """
+
+    def __init__(self, num_perm=DEFAULT_NUM_PERM, bands=DEFAULT_BANDS, threshold=DEFAULT_THRESHOLD, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        import numpy as np
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.threshold = threshold
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, _MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+        self._signatures = np.empty((0, num_perm), dtype=np.uint32)
+        self._size = 0
+        self.titles = []
+        self._exact = {}  # normalised title -> row
+        self._buckets = [dict() for _ in range(bands)]  # band -> {band bytes: [rows]}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    def signature(self, title):
+        """MinHash signature (uint32 vector) of a title."""
+        import numpy as np
+        hashes = _shingle_hashes(normalize_title(title))
+        # (a * h + b) mod p for every permutation/shingle pair, then min per permutation
+        values = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % np.uint64(_MERSENNE_PRIME)
+        return values.min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature):
+        r = self.rows_per_band
+        return [signature[i * r:(i + 1) * r].tobytes() for i in range(self.bands)]
+
+    def _find(self, normalized, signature, band_keys):
+        row = self._exact.get(normalized)
+        if row is not None:
+            return row, 1.0
+        candidates = set()
+        for band, key in enumerate(band_keys):
+            candidates.update(self._buckets[band].get(key, ()))
+        if not candidates:
+            return None, 0.0
+        import numpy as np
+        rows = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        similarity = (self._signatures[rows] == signature).mean(axis=1)
+        best = int(similarity.argmax())
+        return int(rows[best]), float(similarity[best])
+
+    def find_duplicate(self, title):
+        """Returns (existing title, similarity) for the closest near-duplicate, or (None, score)."""
+        normalized = normalize_title(title)
+        if not normalized:
+            return None, 0.0  # Nothing left to compare (e.g. only stopwords)
+        signature = self.signature(title)
+        with self._lock:
+            row, score = self._find(normalized, signature, self._band_keys(signature))
+            if row is not None and score >= self.threshold:
+                return self.titles[row], score
+            return None, score
+
+    def _append(self, title, normalized, signature, band_keys):
+        if self._size == len(self._signatures):
+            import numpy as np
+            # Grow geometrically so appends stay amortised O(1)
+            grown = np.empty((max(64, self._size * 2), self.num_perm), dtype=np.uint32)
+            grown[:self._size] = self._signatures[:self._size]
+            self._signatures = grown
+        row = self._size
+        self._signatures[row] = signature
+        self._size += 1
+        self.titles.append(title)
+        self._exact.setdefault(normalized, row)
+        for band, key in enumerate(band_keys):
+            self._buckets[band].setdefault(key, []).append(row)
+        return row
+
+    def add(self, title):
+        """
+        Adds a title unless it near-duplicates a stored one. Returns True if
+        added. Titles with nothing left after normalising count as unique but
+        are not indexed.
+        """
+        normalized = normalize_title(title)
+        if not normalized:
+            return True
+        signature = self.signature(title)
+        band_keys = self._band_keys(signature)
+        with self._lock:
+            row, score = self._find(normalized, signature, band_keys)
+            if row is not None and score >= self.threshold:
+                return False
+            self._append(title, normalized, signature, band_keys)
+            return True
+
+    def filter_new(self, titles):
+        """
+        Returns the titles that are not near-duplicates of stored titles (or of
+        each other), adding them to the index. Input order is kept.
+        """
+        return [title for title in titles if self.add(title)]
+
+    def recent_titles(self, limit=30):
+        """The most recently added titles, newest last (for 'avoid these' prompt lists)."""
+        with self._lock:
+            return list(self.titles[-limit:]) if limit else []
+
+    def save(self, path):
+        """Writes signatures and titles to a compressed .npz file (atomically)."""
+        import numpy as np
+        with self._lock:
+            tmp_path = f"{path}.tmp.npz"
+            np.savez_compressed(tmp_path, signatures=self._signatures[:self._size],
+                                titles=np.array(self.titles, dtype=str), a=self._a, b=self._b,
+                                params=np.array([self.num_perm, self.bands], dtype=np.int64),
+                                threshold=np.array([self.threshold]))
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Rebuilds an index (including its LSH buckets) from a file written by save()."""
+        import numpy as np
+        with np.load(path, allow_pickle=False) as data:
+            num_perm, bands = (int(v) for v in data["params"])
+            index = cls(num_perm=num_perm, bands=bands, threshold=float(data["threshold"][0]))
+            index._a = data["a"].astype(np.uint64)
+            index._b = data["b"].astype(np.uint64)
+            for title, signature in zip(data["titles"].tolist(), data["signatures"]):
+                index._append(title, normalize_title(title), signature, index._band_keys(signature))
+        return index
+
+
+# --- Per-site registry ---
+# Each site has one index of generated ideas and one of topics that already
+# have posts. Indexes persist under IDEA_INDEX_DIR between runs.
+IDEA_INDEX_DIR = os.getenv("IDEA_INDEX_DIR", ".idea_index")
+IDEAS = "ideas"
+POSTS = "posts"
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def _index_path(site_id, kind):
+    return os.path.join(IDEA_INDEX_DIR, f"{site_id}-{kind}.npz")
+
+
+def get_idea_index(website_context, kind=IDEAS):
+    """Returns the shared IdeaIndex for this site ('ideas' or 'posts'), loading it from disk once."""
+    site_id = context_site_id(website_context)
+    with _indexes_lock:
+        index = _indexes.get((site_id, kind))
+        if index is None:
+            path = _index_path(site_id, kind)
+            index = None
+            if os.path.exists(path):
+                try:
+                    index = IdeaIndex.load(path)
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Warning: could not load idea index {path}: {e}. Starting a new one.")
+            _indexes[(site_id, kind)] = index = index or IdeaIndex()
+        return index
+
+
+def save_idea_index(website_context, kind=IDEAS):
+    """Persists a site's index to IDEA_INDEX_DIR."""
+    site_id = context_site_id(website_context)
+    with _indexes_lock:
+        index = _indexes.get((site_id, kind))
+    if index is None:
+        return
+    try:
+        os.makedirs(IDEA_INDEX_DIR, exist_ok=True)
+        index.save(_index_path(site_id, kind))
+    except OSError as e:
+        print(f"Warning: could not save idea index: {e}")
+
+
+def unload_idea_indexes(website_context):
+    """
+    Drops a site's indexes from memory so long runs over many sites stay
+    small. Call save_idea_index() first; unsaved additions are lost.
+    """
+    site_id = context_site_id(website_context)
+    with _indexes_lock:
+        for kind in (IDEAS, POSTS):
+            _indexes.pop((site_id, kind), None)
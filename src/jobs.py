@@ -0,0 +1,242 @@
+# ai_content_generator/src/jobs.py
+
+# Background job queue for the Streamlit app.
+# Generation requests are submitted as jobs and run on a shared worker pool,
+# so a Streamlit rerun never waits for a model call. submit() returns a job id
+# straight away; the UI polls the job table for status and partial output.
+# One pool serves every session, which bounds the number of model calls a
+# single server makes no matter how many users are connected. Background jobs
+# (speculative prefetches) only start when no normal job is waiting, use at
+# most a few workers, and can be cancelled while still queued.
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# Job priorities: lower runs first
+FOREGROUND = 0
+BACKGROUND = 1
+
+DEFAULT_JOB_WORKERS = int(os.getenv("CONTENT_JOB_WORKERS", "8"))
+DEFAULT_BACKGROUND_WORKERS = int(os.getenv("CONTENT_PREFETCH_WORKERS", "2"))  # Workers background jobs may occupy
+FINISHED_JOB_TTL_SECONDS = 60 * 60  # Finished jobs stay visible for an hour
+MAX_FINISHED_JOBS = 500
+
+
+class Job:
+    """
+    One queued generation. The job function may update `partial` with the
+    text produced so far; `result` and `error` are set when it finishes.
+    """
+
+    def __init__(self, job_id, kind, label, group, key, priority=FOREGROUND):
+        self.job_id = job_id
+        self.kind = kind
+        self.label = label
+        self.group = group  # e.g. the site id, so the UI can show a site's jobs after a reload
+        self.key = key  # Identifies the work; an active job with the same key is reused
+        self.priority = priority
+        self.status = QUEUED
+        self.partial = ""
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def active(self):
+        return self.status in (QUEUED, RUNNING)
+
+    @property
+    def background(self):
+        return self.priority == BACKGROUND
+
+    def as_dict(self):
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "label": self.label,
+            "group": self.group,
+            "status": self.status,
+            "background": self.background,
+            "partial": self.partial,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue:
+    """
+    Priority queue of jobs, a worker thread pool and a job table. Job
+    functions are called as fn(job, *args, **kwargs) on a worker thread; they
+    must not call Streamlit. A job fails if its function raises.
+    """
+
+    def __init__(self, max_workers=DEFAULT_JOB_WORKERS, max_background=DEFAULT_BACKGROUND_WORKERS):
+        self.max_workers = max(1, max_workers)
+        self.max_background = max(1, min(max_background, self.max_workers))
+        self._jobs = OrderedDict()  # job id -> Job, oldest first
+        self._pending = []  # Heap of (priority, sequence, job id); entries for promoted or cancelled jobs are skipped
+        self._calls = {}  # job id -> (fn, args, kwargs) while queued
+        self._ids = itertools.count(1)
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._work_available = threading.Condition(self._lock)
+        self._threads = []
+        self._idle = 0
+        self._background_running = 0
+
+    def submit(self, fn, *args, kind="job", label=None, group=None, key=None, priority=FOREGROUND, **kwargs):
+        """
+        Queues fn and returns the job id immediately. If a queued or running
+        job has the same `key`, its id is returned instead of queuing a
+        duplicate; a queued background job is promoted to the new priority.
+        """
+        with self._lock:
+            if key is not None:
+                for job in self._jobs.values():
+                    if job.key == key and job.active:
+                        if job.status == QUEUED and priority < job.priority:
+                            job.priority = priority
+                            self._push(job)
+                        return job.job_id
+            self._prune()
+            job = Job(f"job-{next(self._ids)}", kind, label or kind, group, key, priority)
+            self._jobs[job.job_id] = job
+            self._calls[job.job_id] = (fn, args, kwargs)
+            self._push(job)
+        return job.job_id
+
+    def _push(self, job):
+        # Called with the lock held; starts another worker thread if none is idle
+        heapq.heappush(self._pending, (job.priority, next(self._sequence), job.job_id))
+        if self._idle == 0 and len(self._threads) < self.max_workers:
+            thread = threading.Thread(target=self._worker, name=f"content-job-{len(self._threads) + 1}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+        self._work_available.notify_all()
+
+    def _next_job(self):
+        # Called with the lock held: the best runnable job, or None
+        while self._pending:
+            priority, _, job_id = self._pending[0]
+            job = self._jobs.get(job_id)
+            if job is None or job.status != QUEUED or job.priority != priority:
+                heapq.heappop(self._pending)  # Cancelled, already started or promoted
+                continue
+            if job.background and self._background_running >= self.max_background:
+                return None  # Only background jobs are left and their share of workers is busy
+            heapq.heappop(self._pending)
+            return job
+        return None
+
+    def _worker(self):
+        while True:
+            with self._lock:
+                job = self._next_job()
+                while job is None:
+                    self._idle += 1
+                    self._work_available.wait()
+                    self._idle -= 1
+                    job = self._next_job()
+                fn, args, kwargs = self._calls.pop(job.job_id)
+                job.status = RUNNING
+                job.started_at = time.time()
+                if job.background:
+                    self._background_running += 1
+            try:
+                self._run(job, fn, args, kwargs)
+            finally:
+                if job.background:
+                    with self._lock:
+                        self._background_running -= 1
+                        self._work_available.notify_all()
+
+    def _run(self, job, fn, args, kwargs):
+        status = FAILED
+        try:
+            job.result = fn(job, *args, **kwargs)
+            status = DONE
+        except Exception as e:
+            job.error = str(e) or type(e).__name__
+            print(f"Background job {job.job_id} ({job.label}) failed: {job.error}")
+        finally:
+            # finished_at is set before the job stops counting as active, so _prune() never sees it unset
+            with self._lock:
+                job.finished_at = time.time()
+                job.status = status
+
+    def _prune(self):
+        # Drops old finished jobs; called with the lock held
+        now = time.time()
+        finished = [job for job in self._jobs.values() if not job.active and job.finished_at is not None]
+        for i, job in enumerate(finished):
+            if now - job.finished_at > FINISHED_JOB_TTL_SECONDS or len(finished) - i > MAX_FINISHED_JOBS:
+                del self._jobs[job.job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self, group=None):
+        """Returns the jobs of one group (or all jobs), oldest first."""
+        with self._lock:
+            return [job for job in self._jobs.values() if group is None or job.group == group]
+
+    def cancel(self, job_id):
+        """Cancels a job that has not started yet. Returns True if it was cancelled."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                return False
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            self._calls.pop(job_id, None)
+            return True
+
+    def cancel_background(self, group=None):
+        """Cancels every queued background job (of one group, or all). Returns how many were cancelled."""
+        with self._lock:
+            queued = [job.job_id for job in self._jobs.values()
+                      if job.background and job.status == QUEUED and (group is None or job.group == group)]
+        return sum(self.cancel(job_id) for job_id in queued)
+
+    def dismiss(self, job_id):
+        """Removes a finished job from the table."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job and not job.active:
+                del self._jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0, CANCELLED: 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        return counts
+
+
+# Process-wide queue shared by every Streamlit session
+_default_queue = None
+_default_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Returns the shared JobQueue (CONTENT_JOB_WORKERS worker threads)."""
+    global _default_queue
+    with _default_queue_lock:
+        if _default_queue is None:
+            _default_queue = JobQueue(DEFAULT_JOB_WORKERS)
+        return _default_queue
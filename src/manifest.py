@@ -0,0 +1,107 @@
+# ai_content_generator/src/manifest.py
+
+# Reads job manifests for headless bulk generation.
+# A manifest lists many site contexts (one per JSONL line or CSV row) with
+# the QUESTIONS fields plus optional job settings:
+#   site_id          - stable id used in the output file (default: hash of the context)
+#   topics           - blog post topics (a JSON list, or '|'-separated in CSV)
+#   about_page       - generate the About page (default: true)
+#   ideas            - generate the 10-idea list (default: true)
+#   posts_from_ideas - also write posts for the first N generated ideas (default: 0)
+#   post_words       - write the site's posts long-form at about N words (default: 0, standard posts)
+
+import csv
+import json
+import os
+
+from .context import QUESTIONS, site_key
+
+TRUE_VALUES = ("1", "true", "yes", "y")
+
+
+def _as_bool(value, default):
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def _as_int(value, default=0):
+    try:
+        return int(value) if value not in (None, "") else default
+    except (TypeError, ValueError):
+        return default
+
+
+def _as_topics(value):
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split("|")
+    return [str(topic).strip() for topic in value if str(topic).strip()]
+
+
+def normalize_job(row):
+    """
+    Turns a raw manifest row into a job dict:
+    {'site_id', 'context', 'topics', 'about_page', 'ideas', 'posts_from_ideas', 'post_words'}.
+    """
+    context = {key: (row.get(key) or "") for key in QUESTIONS}
+    context["site_id"] = str(row.get("site_id") or site_key(context))  # Pinned, see context.context_site_id
+    return {
+        "site_id": context["site_id"],
+        "context": context,
+        "topics": _as_topics(row.get("topics")),
+        "about_page": _as_bool(row.get("about_page"), True),
+        "ideas": _as_bool(row.get("ideas"), True),
+        "posts_from_ideas": _as_int(row.get("posts_from_ideas")),
+        "post_words": _as_int(row.get("post_words")),
+    }
+
+
+def _csv_rows(f):
+    # (line number, row) pairs; a row the csv module cannot parse comes back as its csv.Error
+    reader = csv.DictReader(f)
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            row = e
+        yield reader.reader.line_num, row  # DictReader.line_num is only updated for rows that parse
+
+
+def iter_manifest(path, on_invalid=None):
+    """
+    Lazily yields normalised jobs from a .jsonl or .csv manifest.
+    Rows without a website name or theme are skipped with a warning. Rows
+    that cannot be read (malformed JSON or CSV, or not an object) are reported with
+    their line number and passed to on_invalid(line_number, error), and the
+    rest of the manifest is still read.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if extension == ".csv":
+            rows = _csv_rows(f)
+        else:
+            rows = ((line_number, line) for line_number, line in enumerate(f, start=1) if line.strip())
+        for line_number, row in rows:
+            try:
+                if isinstance(row, csv.Error):
+                    raise row
+                if extension != ".csv":
+                    row = json.loads(row)
+                if not isinstance(row, dict):
+                    raise ValueError(f"expected a JSON object, got {type(row).__name__}")
+                job = normalize_job(row)
+            except (ValueError, TypeError, AttributeError, csv.Error) as e:
+                print(f"Error: manifest line {line_number} is invalid ({e}). Skipping it.")
+                if on_invalid:
+                    on_invalid(line_number, str(e))
+                continue
+            if not job["context"]["website_name"] or not job["context"]["website_theme"]:
+                print(f"Warning: manifest line {line_number} has no website_name/website_theme. Skipping.")
+                continue
+            yield job
@@ -0,0 +1,177 @@
+# ai_content_generator/src/metrics.py
+
+# Latency and token instrumentation for every model call.
+# call_gemini_api and stream_gemini_api record one sample per call with
+# queue wait, time-to-first-byte, total latency, token counts, cache hit/miss,
+# whether it joined an identical call already in flight, retry count and the
+# generator that made the call. Samples are kept in a
+# bounded in-process registry (for percentile summaries) and, if
+# CONTENT_METRICS_FILE is set, appended to that JSONL file.
+
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+DEFAULT_MAX_SAMPLES = 2000  # Per generator; older samples roll off
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list (None if empty)."""
+    if not sorted_values:
+        return None
+    rank = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def get_usage_tokens(response):
+    """Returns (prompt tokens, response tokens) from a response's usage metadata."""
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage, "prompt_token_count", None)
+    response_tokens = getattr(usage, "candidates_token_count", None)
+    return (prompt_tokens if isinstance(prompt_tokens, int) else None,
+            response_tokens if isinstance(response_tokens, int) else None)
+
+
+class CallTimer:
+    """
+    Collects the measurements for one model call; pass it to record() when done.
+    """
+
+    def __init__(self, generator_name, model_name, streaming=False):
+        self.generator = generator_name or "unknown"
+        self.model = model_name
+        self.streaming = streaming
+        self.started = time.monotonic()
+        self.first_byte = None
+        self.cache_hit = False
+        self.coalesced = False  # Joined an identical in-flight call (see singleflight.py)
+        self.queue_wait = 0.0
+        self.retries = 0
+        self.prompt_tokens = None
+        self.response_tokens = None
+        self.error = None
+
+    def mark_first_byte(self):
+        if self.first_byte is None:
+            self.first_byte = time.monotonic()
+
+    def set_usage(self, response):
+        prompt_tokens, response_tokens = get_usage_tokens(response)
+        if prompt_tokens is not None:
+            self.prompt_tokens = prompt_tokens
+        if response_tokens is not None:
+            self.response_tokens = response_tokens
+
+    def as_sample(self):
+        finished = time.monotonic()
+        return {
+            "timestamp": time.time(),
+            "generator": self.generator,
+            "model": self.model,
+            "streaming": self.streaming,
+            "cache_hit": self.cache_hit,
+            "coalesced": self.coalesced,
+            "queue_wait": round(self.queue_wait, 4),
+            "ttfb": round((self.first_byte or finished) - self.started, 4),
+            "latency": round(finished - self.started, 4),
+            "prompt_tokens": self.prompt_tokens,
+            "response_tokens": self.response_tokens,
+            "retries": self.retries,
+            "error": self.error,
+        }
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of recent call samples with per-generator summaries.
+    """
+
+    def __init__(self, sink_path=None, max_samples=DEFAULT_MAX_SAMPLES):
+        self.sink_path = sink_path
+        self.max_samples = max_samples
+        self._samples = defaultdict(lambda: deque(maxlen=self.max_samples))
+        self._lock = threading.Lock()
+
+    def record(self, timer):
+        """Stores a finished CallTimer's sample and appends it to the JSONL sink."""
+        sample = timer.as_sample()
+        line = json.dumps(sample) + "\n" if self.sink_path else None
+        with self._lock:
+            self._samples[sample["generator"]].append(sample)
+            if line:
+                try:
+                    with open(self.sink_path, "a", encoding="utf-8") as f:
+                        f.write(line)
+                except OSError as e:
+                    print(f"Warning: could not write metrics sample: {e}")
+        return sample
+
+    def samples(self, generator_name=None):
+        """Returns recent samples, for one generator or all of them."""
+        with self._lock:
+            if generator_name:
+                return list(self._samples.get(generator_name, ()))
+            return [sample for samples in self._samples.values() for sample in samples]
+
+    def summary(self):
+        """
+        Returns {generator: stats} with call/error/cache-hit/coalesced counts, retries,
+        token totals and latency/TTFB/queue-wait percentiles (seconds).
+        """
+        with self._lock:
+            snapshot = {name: list(samples) for name, samples in self._samples.items()}
+        summary = {}
+        for name, samples in snapshot.items():
+            # Latency percentiles only cover real API calls; cache hits and joined calls would skew them
+            api_calls = [s for s in samples if not s["cache_hit"] and not s.get("coalesced") and not s["error"]]
+            stats = {
+                "calls": len(samples),
+                "errors": sum(1 for s in samples if s["error"]),
+                "cache_hits": sum(1 for s in samples if s["cache_hit"]),
+                "coalesced": sum(1 for s in samples if s.get("coalesced")),
+                "retries": sum(s["retries"] for s in samples),
+                "prompt_tokens": sum(s["prompt_tokens"] or 0 for s in samples),
+                "response_tokens": sum(s["response_tokens"] or 0 for s in samples),
+            }
+            for field in ("latency", "ttfb", "queue_wait"):
+                values = sorted(s[field] for s in api_calls)
+                for pct in PERCENTILES:
+                    stats[f"{field}_p{pct}"] = percentile(values, pct)
+            summary[name] = stats
+        return summary
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+
+# Process-wide registry used by call_gemini_api / stream_gemini_api
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_metrics():
+    """Returns the shared MetricsRegistry (JSONL sink from CONTENT_METRICS_FILE, if set)."""
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = MetricsRegistry(sink_path=os.getenv("CONTENT_METRICS_FILE") or None)
+        return _default_registry
+
+
+def _fmt_seconds(value):
+    return f"{value:.2f}" if value is not None else "-"
+
+
+def format_summary(summary):
+    """Formats a summary() dict as a small plain-text table for the CLI."""
+    lines = [f"{'generator':<22}{'calls':>6}{'errors':>7}{'hits':>6}{'retries':>8}{'p50 s':>8}{'p95 s':>8}{'ttfb p50':>9}{'tokens out':>11}"]
+    for name, stats in sorted(summary.items()):
+        lines.append(f"{name:<22}{stats['calls']:>6}{stats['errors']:>7}{stats['cache_hits']:>6}{stats['retries']:>8}"
+                     f"{_fmt_seconds(stats['latency_p50']):>8}{_fmt_seconds(stats['latency_p95']):>8}"
+                     f"{_fmt_seconds(stats['ttfb_p50']):>9}{stats['response_tokens']:>11}")
+    return "\n".join(lines)
@@ -0,0 +1,153 @@
+# ai_content_generator/src/quality.py
+
+# Fast local quality checks for generated text.
+# Every About page and blog post is checked for word count, heading structure,
+# keyword coverage and repeated paragraphs. The checks are plain string and
+# regex work (well under a millisecond for a typical post), so they run on
+# every generation, including bulk runs. Only a failed length check leads to
+# a follow-up model request (a continuation or a trim; see
+# generators.enforce_quality); repeated paragraphs are removed locally.
+
+import re
+
+HEADING_PATTERN = re.compile(r"^[ \t]*(?:(#{1,6})[ \t]+\S|\*\*[^*\n]{2,80}\*\*:?[ \t]*$)", re.MULTILINE)
+PARAGRAPH_SPLIT_PATTERN = re.compile(r"\n[ \t]*\n")
+MIN_REPEAT_WORDS = 8  # Shorter paragraphs (e.g. "Thanks for reading!") may legitimately repeat
+
+
+class QualitySpec:
+    """
+    Expected shape of one kind of generated text.
+    """
+
+    def __init__(self, target_words, min_words, max_words, min_headings=0):
+        self.target_words = target_words
+        self.min_words = min_words
+        self.max_words = max_words
+        self.min_headings = min_headings
+
+
+# Bounds allow the usual drift around the word counts the prompts ask for
+QUALITY_SPECS = {
+    "about_page": QualitySpec(600, 480, 750),  # "approximately 600 words"
+    "blog_post": QualitySpec(700, 540, 900, min_headings=1),  # "600 to 800 words", subheadings suggested
+}
+
+
+def long_post_spec(target_words):
+    """Spec for a long-form post (generators.generate_long_blog_post) of about `target_words`."""
+    return QualitySpec(target_words, int(target_words * 0.8), int(target_words * 1.25), min_headings=3)
+
+
+class QualityReport:
+    """
+    Result of check_quality. `issues` lists every failed check in plain words;
+    `fixes` records what enforce_quality changed.
+    """
+
+    def __init__(self, word_count, headings, missing_keywords, repeated_paragraphs, spec):
+        self.word_count = word_count
+        self.headings = headings
+        self.missing_keywords = missing_keywords
+        self.repeated_paragraphs = repeated_paragraphs
+        self.spec = spec
+        self.fixes = []
+
+    @property
+    def too_short(self):
+        return self.word_count < self.spec.min_words
+
+    @property
+    def too_long(self):
+        return self.word_count > self.spec.max_words
+
+    @property
+    def issues(self):
+        issues = []
+        if self.too_short:
+            issues.append(f"too short ({self.word_count} words, expected at least {self.spec.min_words})")
+        if self.too_long:
+            issues.append(f"too long ({self.word_count} words, expected at most {self.spec.max_words})")
+        if self.headings < self.spec.min_headings:
+            issues.append(f"{self.headings} heading(s), expected at least {self.spec.min_headings}")
+        if self.missing_keywords:
+            issues.append("missing keywords: " + ", ".join(self.missing_keywords))
+        if self.repeated_paragraphs:
+            issues.append(f"{self.repeated_paragraphs} repeated paragraph(s)")
+        return issues
+
+    @property
+    def passed(self):
+        return not self.issues
+
+    def as_dict(self):
+        return {
+            "word_count": self.word_count,
+            "headings": self.headings,
+            "missing_keywords": self.missing_keywords,
+            "repeated_paragraphs": self.repeated_paragraphs,
+            "issues": self.issues,
+            "fixes": self.fixes,
+        }
+
+
+def parse_keywords(keywords):
+    """Splits a comma-separated keyword string (or list) into clean keywords."""
+    if not keywords:
+        return []
+    if isinstance(keywords, str):
+        keywords = keywords.split(",")
+    return [keyword.strip() for keyword in keywords if keyword and keyword.strip()]
+
+
+def _paragraph_key(paragraph):
+    return " ".join(paragraph.lower().split())
+
+
+def count_repeated_paragraphs(text):
+    """Number of paragraphs that repeat an earlier paragraph (ignoring case and spacing)."""
+    seen = set()
+    repeated = 0
+    for paragraph in PARAGRAPH_SPLIT_PATTERN.split(text):
+        key = _paragraph_key(paragraph)
+        if key.count(" ") + 1 < MIN_REPEAT_WORDS:
+            continue
+        if key in seen:
+            repeated += 1
+        else:
+            seen.add(key)
+    return repeated
+
+
+def remove_repeated_paragraphs(text):
+    """Returns the text with later copies of repeated paragraphs removed."""
+    seen = set()
+    kept = []
+    for paragraph in PARAGRAPH_SPLIT_PATTERN.split(text):
+        key = _paragraph_key(paragraph)
+        if key.count(" ") + 1 >= MIN_REPEAT_WORDS:
+            if key in seen:
+                continue
+            seen.add(key)
+        kept.append(paragraph)
+    return "\n\n".join(kept)
+
+
+def check_quality(text, spec, keywords=None):
+    """Runs every check on `text` against a QualitySpec and returns a QualityReport."""
+    text = text or ""
+    lowered = text.lower()
+    missing_keywords = [keyword for keyword in parse_keywords(keywords) if keyword.lower() not in lowered]
+    return QualityReport(
+        word_count=len(text.split()),
+        headings=len(HEADING_PATTERN.findall(text)),
+        missing_keywords=missing_keywords,
+        repeated_paragraphs=count_repeated_paragraphs(text),
+        spec=spec,
+    )
+
+
+def last_words(text, count):
+    """The last `count` words of `text` (used as context for a continuation request)."""
+    words = text.split()
+    return " ".join(words[-count:])
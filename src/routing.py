@@ -0,0 +1,225 @@
+# ai_content_generator/src/routing.py
+
+# Cost/latency-aware model routing per generator.
+# Every prompt template (the generator name used in metrics) has a route: a
+# model tier plus generation limits such as max_output_tokens. Tiers name
+# concrete models (GEMINI_MODEL_FAST, GEMINI_MODEL_STANDARD,
+# GEMINI_MODEL_QUALITY), so short structured tasks like idea lists run on a
+# cheap model while posts use the standard one. A route may name a faster
+# fallback tier; calls switch to it while the route's recent p95 latency (from
+# metrics.py) is over its limit, or while the shared scheduler has used most
+# of its per-minute request or token budget. Long-form sections have no
+# fallback, so under pressure the cheaper tasks give way to them.
+# Set CONTENT_ROUTING=0 to send every call to the model it was given.
+
+import json
+import os
+import threading
+import time
+
+from .api_config import DEFAULT_MODEL_NAME
+from .metrics import get_metrics, percentile
+from .scheduler import get_scheduler
+from .utils import get_model_name
+
+USE_ROUTING = os.getenv("CONTENT_ROUTING", "1").lower() not in ("0", "false", "no")
+TIERS = ("fast", "standard", "quality")  # Fastest first
+DEFAULT_TIER_MODELS = {
+    "fast": os.getenv("GEMINI_MODEL_FAST", "gemini-2.0-flash-lite"),
+    "standard": os.getenv("GEMINI_MODEL_STANDARD", DEFAULT_MODEL_NAME),
+    "quality": os.getenv("GEMINI_MODEL_QUALITY", DEFAULT_MODEL_NAME),
+}
+LATENCY_WINDOW_SECONDS = 300  # Slow samples older than this no longer trigger a fallback
+MIN_LATENCY_SAMPLES = 5  # p95 of fewer samples is too noisy to act on
+DEFAULT_PRESSURE_THRESHOLD = 0.8  # Share of GEMINI_RPM/GEMINI_TPM used in the last minute
+
+
+class Route:
+    """
+    Model tier and generation limits for one generator. `fallback` is the
+    faster tier used under pressure (None = always use `tier`).
+    """
+
+    def __init__(self, tier, max_output_tokens=None, fallback=None, max_p95_seconds=None):
+        self.tier = tier
+        self.max_output_tokens = max_output_tokens
+        self.fallback = fallback
+        self.max_p95_seconds = max_p95_seconds
+
+    def as_dict(self):
+        return {"tier": self.tier, "max_output_tokens": self.max_output_tokens, "fallback": self.fallback,
+                "max_p95_seconds": self.max_p95_seconds}
+
+
+# Output limits leave headroom over what each prompt asks for (~1.4 tokens per word)
+DEFAULT_ROUTES = {
+    "blog_post_ideas": Route("fast", 1536),
+    "blog_post_ideas_json": Route("fast", 1536),
+    "blog_post_outline": Route("fast", 1536),
+    "about_page": Route("standard", 2048, fallback="fast", max_p95_seconds=45),
+    "blog_post": Route("standard", 2048, fallback="fast", max_p95_seconds=45),
+    "about_page_and_ideas": Route("standard", 4096, fallback="fast", max_p95_seconds=90),
+    "blog_posts_combined": Route("standard", 8192, fallback="fast", max_p95_seconds=180),
+    "content_continuation": Route("standard", 2048, fallback="fast", max_p95_seconds=30),
+    "content_trim": Route("standard", 2048, fallback="fast", max_p95_seconds=30),
+    "blog_post_section": Route("quality", 2048),
+}
+
+
+def _base_model_name(name):
+    # 'models/gemini-2.0-flash+cachedContents/x' -> 'gemini-2.0-flash'
+    name = (name or "").split("+", 1)[0]
+    return name[len("models/"):] if name.startswith("models/") else name
+
+
+def resolve_model(model, model_name):
+    """
+    Returns a model like `model` (same backend and API key) for `model_name`.
+    Falls back to `model` itself when the backend cannot switch models.
+    """
+    if _base_model_name(get_model_name(model)) == _base_model_name(model_name):
+        return model
+    with_model_name = getattr(model, "with_model_name", None)  # e.g. FakeModel
+    if callable(with_model_name):
+        return with_model_name(model_name)
+    from .api_config import get_sibling_model
+    return get_sibling_model(model, model_name) or model
+
+
+def load_routes(raw=None):
+    """
+    Returns DEFAULT_ROUTES updated from CONTENT_MODEL_ROUTES (or `raw`), a JSON
+    object such as {"blog_post": {"tier": "quality", "max_output_tokens": 3000}}.
+    Invalid overrides are reported and ignored.
+    """
+    routes = {name: Route(**route.as_dict()) for name, route in DEFAULT_ROUTES.items()}
+    raw = os.getenv("CONTENT_MODEL_ROUTES") if raw is None else raw
+    if not raw:
+        return routes
+    try:
+        overrides = json.loads(raw)
+        for name, settings in overrides.items():
+            route = routes.get(name) or Route("standard")
+            merged = dict(route.as_dict(), **settings)
+            if merged["tier"] not in TIERS or merged["fallback"] not in TIERS + (None,):
+                raise ValueError(f"unknown tier in route '{name}'")
+            routes[name] = Route(**merged)
+    except (TypeError, ValueError, AttributeError) as e:
+        print(f"Warning: ignoring invalid CONTENT_MODEL_ROUTES ({e}).")
+        return {name: Route(**route.as_dict()) for name, route in DEFAULT_ROUTES.items()}
+    return routes
+
+
+class ModelRouter:
+    """
+    Picks the model and generation config for each call. Thread-safe; keeps
+    per-generator counts of routed calls and fallbacks for the UI and CLI.
+    """
+
+    def __init__(self, routes=None, tier_models=None, pressure_threshold=DEFAULT_PRESSURE_THRESHOLD, enabled=True):
+        self.routes = routes if routes is not None else load_routes()
+        self.tier_models = dict(DEFAULT_TIER_MODELS, **(tier_models or {}))
+        self.pressure_threshold = pressure_threshold
+        self.enabled = enabled
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _quota_pressure(self):
+        """Why the scheduler's budgets are under pressure, or None."""
+        scheduler = get_scheduler()
+        stats = scheduler.stats()
+        for used, budget, unit in ((stats["requests_last_minute"], scheduler.requests_per_minute, "requests"),
+                                   (stats["tokens_last_minute"], scheduler.tokens_per_minute, "tokens")):
+            if budget and used >= self.pressure_threshold * budget:
+                return f"{used}/{budget} {unit} used in the last minute"
+        return None
+
+    def _slow(self, generator_name, route):
+        """Why the route's own tier is too slow (recent p95 over its limit), or None."""
+        if not route.max_p95_seconds:
+            return None
+        model_name = _base_model_name(self.tier_models[route.tier])
+        cutoff = time.time() - LATENCY_WINDOW_SECONDS
+        latencies = sorted(sample["latency"] for sample in get_metrics().samples(generator_name)
+                           if sample["timestamp"] >= cutoff and not sample["cache_hit"] and not sample.get("coalesced")
+                           and not sample["error"] and _base_model_name(sample["model"]) == model_name)
+        if len(latencies) < MIN_LATENCY_SAMPLES:
+            return None
+        p95 = percentile(latencies, 95)
+        if p95 > route.max_p95_seconds:
+            return f"p95 latency {p95:.1f}s over {route.max_p95_seconds}s"
+        return None
+
+    def choose_tier(self, generator_name):
+        """Returns (tier, fallback reason or None) for a generator, or (None, None) if it has no route."""
+        route = self.routes.get(generator_name)
+        if route is None:
+            return None, None
+        if route.fallback and route.fallback != route.tier:
+            reason = self._quota_pressure() or self._slow(generator_name, route)
+            if reason:
+                return route.fallback, reason
+        return route.tier, None
+
+    def route(self, generator_name, model, generation_config=None):
+        """
+        Returns (model, generation_config) for one call by `generator_name`.
+        The route's limits are added to the config unless the caller set them.
+        Generators without a route (or with routing off) pass through unchanged.
+        """
+        route = self.routes.get(generator_name)
+        if not self.enabled or route is None or model is None:
+            return model, generation_config
+        tier, reason = self.choose_tier(generator_name)
+        routed_model = resolve_model(model, self.tier_models[tier])
+        config = dict(generation_config or {})
+        if route.max_output_tokens:
+            config.setdefault("max_output_tokens", route.max_output_tokens)
+        with self._lock:
+            stats = self._stats.setdefault(generator_name, {"calls": 0, "fallbacks": 0, "last_fallback": None})
+            changed = stats.get("tier") not in (None, tier)
+            stats["calls"] += 1
+            stats["tier"] = tier
+            stats["model"] = self.tier_models[tier]
+            if reason:
+                stats["fallbacks"] += 1
+                stats["last_fallback"] = reason
+        if reason and changed:
+            print(f"Routing {generator_name} to the {tier} tier: {reason}.")
+        elif changed:
+            print(f"Routing {generator_name} back to the {tier} tier.")
+        return routed_model, config
+
+    def stats(self):
+        """Returns {generator: {'tier', 'model', 'calls', 'fallbacks', 'last_fallback'}} (last routing decision)."""
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+
+def format_routes(stats):
+    """Formats ModelRouter.stats() as a small plain-text table for the CLI."""
+    lines = [f"{'generator':<22}{'tier':<10}{'model':<28}{'calls':>6}{'fallbacks':>10}  last fallback reason"]
+    for name, row in sorted(stats.items()):
+        lines.append(f"{name:<22}{row['tier']:<10}{row['model']:<28}{row['calls']:>6}{row['fallbacks']:>10}  "
+                     f"{row['last_fallback'] or '-'}")
+    return "\n".join(lines)
+
+
+# Process-wide router shared by every generator call
+_default_router = None
+_default_router_lock = threading.Lock()
+
+
+def get_router():
+    """Returns the shared ModelRouter (routes from CONTENT_MODEL_ROUTES, off with CONTENT_ROUTING=0)."""
+    global _default_router
+    with _default_router_lock:
+        if _default_router is None:
+            threshold = os.getenv("CONTENT_ROUTE_PRESSURE")
+            try:
+                threshold = float(threshold) if threshold else DEFAULT_PRESSURE_THRESHOLD
+            except ValueError:
+                print(f"Warning: ignoring non-numeric CONTENT_ROUTE_PRESSURE={threshold!r}.")
+                threshold = DEFAULT_PRESSURE_THRESHOLD
+            _default_router = ModelRouter(pressure_threshold=threshold, enabled=USE_ROUTING)
+        return _default_router
@@ -0,0 +1,257 @@
+# ai_content_generator/src/scheduler.py
+
+# Central request scheduler for all model calls.
+# Enforces requests-per-minute and tokens-per-minute budgets and retries
+# quota (429) and transient server (5xx) errors with jittered exponential
+# backoff, honouring any retry delay the server asks for.
+
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+
+WINDOW_SECONDS = 60.0
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BASE_DELAY = 1.0  # Seconds before the first retry (before jitter)
+DEFAULT_MAX_DELAY = 60.0  # Upper bound for a single backoff sleep
+DEFAULT_OUTPUT_TOKEN_ESTIMATE = 1200  # ~800 words of output, reserved until actual usage is known
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# google.api_core exception class names, matched by name so the SDK stays optional here
+RETRYABLE_ERROR_NAMES = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError",
+    "DeadlineExceeded", "GatewayTimeout", "BadGateway", "Aborted",
+}
+
+_RETRY_HINT_PATTERNS = [
+    re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+(?:\.\d+)?)"),
+    re.compile(r"retry in\s+(\d+(?:\.\d+)?)\s*s", re.IGNORECASE),
+]
+
+
+def estimate_tokens(text):
+    """Rough token estimate (~4 characters per token) used for budgeting."""
+    return max(1, len(text or "") // 4)
+
+
+def is_retryable_error(error):
+    """
+    Returns True for quota errors (429), transient server errors (5xx)
+    and network-level failures.
+    """
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    if type(error).__name__ in RETRYABLE_ERROR_NAMES:
+        return True
+    code = getattr(error, "code", None)
+    try:
+        return int(code) in RETRYABLE_STATUS_CODES
+    except (TypeError, ValueError):
+        return False
+
+
+def get_retry_delay(error):
+    """
+    Extracts a server-provided retry delay in seconds from an error, if any.
+    Looks at RetryInfo details, Retry-After headers and the error message.
+    """
+    for detail in getattr(error, "details", None) or []:
+        retry_delay = getattr(detail, "retry_delay", None)
+        if retry_delay is not None:
+            return getattr(retry_delay, "seconds", 0) + getattr(retry_delay, "nanos", 0) / 1e9
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("Retry-After"):
+            return float(headers["Retry-After"])
+    except (TypeError, ValueError):
+        pass
+    message = str(error)
+    for pattern in _RETRY_HINT_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+def get_response_tokens(response):
+    """Returns total tokens from a response's usage metadata, or None if unavailable."""
+    usage = getattr(response, "usage_metadata", None)
+    total = getattr(usage, "total_token_count", None)
+    return total if isinstance(total, int) and total > 0 else None
+
+
+class RequestScheduler:
+    """
+    Runs model calls within per-minute request and token budgets.
+    Budgets of None mean unlimited. Thread-safe: callers block in
+    execute() until their request fits in the sliding one-minute window.
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, max_retries=DEFAULT_MAX_RETRIES,
+                 base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._condition = threading.Condition()
+        self._window = deque()  # [timestamp, tokens] for each request in the last minute
+        self._window_tokens = 0
+        self._queue_depth = 0
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._retries = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _prune(self, now):
+        while self._window and now - self._window[0][0] >= WINDOW_SECONDS:
+            _, tokens = self._window.popleft()
+            self._window_tokens -= tokens
+
+    def _has_capacity(self, tokens):
+        if self.requests_per_minute and len(self._window) >= self.requests_per_minute:
+            return False
+        # An empty window always admits one request, even if it alone exceeds the token budget
+        if self.tokens_per_minute and self._window and self._window_tokens + tokens > self.tokens_per_minute:
+            return False
+        return True
+
+    def _acquire(self, tokens):
+        """Blocks until the request fits the budgets; returns (window entry, seconds waited)."""
+        start = time.monotonic()
+        with self._condition:
+            self._queue_depth += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._prune(now)
+                    if self._has_capacity(tokens):
+                        break
+                    # Sleep until the oldest request leaves the window (or another slot frees up)
+                    self._condition.wait(timeout=max(0.01, WINDOW_SECONDS - (now - self._window[0][0])))
+                entry = [now, tokens]
+                self._window.append(entry)
+                self._window_tokens += tokens
+                self._in_flight += 1
+            finally:
+                self._queue_depth -= 1
+            waited = time.monotonic() - start
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+            return entry, waited
+
+    def _release(self, entry, actual_tokens, succeeded):
+        with self._condition:
+            self._in_flight -= 1
+            if succeeded:
+                self._completed += 1
+            else:
+                self._failed += 1
+            # Replace the estimate with real usage if the entry is still in the window
+            if actual_tokens is not None and any(e is entry for e in self._window):
+                self._window_tokens += actual_tokens - entry[1]
+                entry[1] = actual_tokens
+            self._condition.notify_all()
+
+    def _backoff_delay(self, attempt, error):
+        # Full jitter: uniform in [0, base * 2^attempt], capped at max_delay
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        hint = get_retry_delay(error)
+        if hint is not None:
+            # Honour the server's hint, plus a little jitter so waiters don't stampede
+            delay = min(max(hint, delay), self.max_delay) + random.uniform(0, self.base_delay)
+        return delay
+
+    def execute(self, fn, estimated_tokens=0, call_info=None):
+        """
+        Calls fn() within the budgets, retrying retryable errors.
+        If call_info (a dict) is given, it is filled with 'queue_wait' (seconds)
+        and 'retries'. Re-raises the last error once retries are exhausted.
+        """
+        attempt = 0
+        total_wait = 0.0
+        while True:
+            entry, waited = self._acquire(estimated_tokens)
+            total_wait += waited
+            try:
+                result = fn()
+            except Exception as e:
+                self._release(entry, None, succeeded=False)
+                if not is_retryable_error(e) or attempt >= self.max_retries:
+                    if call_info is not None:
+                        call_info.update(queue_wait=total_wait, retries=attempt)
+                    raise
+                delay = self._backoff_delay(attempt, e)
+                attempt += 1
+                with self._condition:
+                    self._retries += 1
+                print(f"Retryable API error ({type(e).__name__}); retry {attempt}/{self.max_retries} in {delay:.1f}s.")
+                time.sleep(delay)
+                continue
+            self._release(entry, get_response_tokens(result), succeeded=True)
+            if call_info is not None:
+                call_info.update(queue_wait=total_wait, retries=attempt)
+            return result
+
+    def stats(self):
+        """Returns queue depth, in-flight count, budget usage and wait times."""
+        with self._condition:
+            self._prune(time.monotonic())
+            admitted = self._completed + self._failed + self._in_flight
+            return {
+                "queue_depth": self._queue_depth,
+                "in_flight": self._in_flight,
+                "requests_last_minute": len(self._window),
+                "tokens_last_minute": self._window_tokens,
+                "completed": self._completed,
+                "failed": self._failed,
+                "retries": self._retries,
+                "avg_wait_seconds": self._total_wait / admitted if admitted else 0.0,
+                "max_wait_seconds": self._max_wait,
+            }
+
+
+def _env_int(name):
+    value = os.getenv(name)
+    try:
+        return int(value) if value else None
+    except ValueError:
+        print(f"Warning: ignoring non-integer {name}={value!r}.")
+        return None
+
+
+# Process-wide scheduler shared by every generator call
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """
+    Returns the shared RequestScheduler, created on first use from the
+    GEMINI_RPM, GEMINI_TPM and GEMINI_MAX_RETRIES environment variables.
+    """
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            max_retries = _env_int("GEMINI_MAX_RETRIES")
+            _default_scheduler = RequestScheduler(
+                requests_per_minute=_env_int("GEMINI_RPM"),
+                tokens_per_minute=_env_int("GEMINI_TPM"),
+                max_retries=DEFAULT_MAX_RETRIES if max_retries is None else max_retries,
+            )
+        return _default_scheduler
+
+
+def configure_scheduler(requests_per_minute=None, tokens_per_minute=None, max_retries=DEFAULT_MAX_RETRIES,
+                        base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY):
+    """Replaces the shared scheduler with one using the given budgets."""
+    global _default_scheduler
+    with _default_scheduler_lock:
+        _default_scheduler = RequestScheduler(requests_per_minute, tokens_per_minute, max_retries,
+                                              base_delay=base_delay, max_delay=max_delay)
+        return _default_scheduler
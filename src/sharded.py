@@ -0,0 +1,426 @@
+# ai_content_generator/src/sharded.py
+
+# Sharded multi-process generation for large numbers of sites.
+# A manifest's sites are put in a SQLite work queue (see workqueue.py) and
+# split into shards by a hash of their site id. Each worker process has a
+# home shard and its own model client, scheduler and thread pool; once its
+# shard is empty it helps with the node's other shards. Throughput grows with
+# the number of workers until the API quota is reached.
+# The request budget (--rpm/--tpm or GEMINI_RPM/GEMINI_TPM) is divided evenly
+# between the running workers, so together they stay within the quota.
+#
+# Each worker appends its records to its own JSONL file in the output
+# directory (same record format as bulk.py). It also follows the files of the
+# node's other shards, since a site can be retried by a different worker, and
+# skips items recorded in any of them, so a retry only pays for unfinished
+# work. When a worker
+# crashes, its claimed sites go back to the queue and it is restarted; sites
+# held by a worker on a node that died return when their lease expires.
+#
+# Several nodes can share the work by running the same manifest with the same
+# --shards count and disjoint --shard-ids: shard assignment depends only on
+# the site id, so no coordination between nodes is needed.
+#
+# Re-running with an edited manifest re-queues the sites whose job changed;
+# their workers only generate the new and out-of-date items.
+#
+# With an export directory, each worker also exports its pages as they
+# finish (see export.py) and bundles a site as soon as the site is done.
+
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .bulk import (ABOUT_PAGE, BLOG_IDEAS, BLOG_POST, SITE_BUNDLE, _idea_post_tasks, _make_task, _open_output, _run_task,
+                   completed_content, completed_post_topics, load_completed_items)
+from .export import Exporter
+from .generators import inputs_hash, DEFAULT_MAX_CONCURRENCY
+from .idea_index import IdeaIndex, get_idea_index, save_idea_index, unload_idea_indexes, IDEAS, POSTS
+from .manifest import iter_manifest
+from .scheduler import DEFAULT_MAX_RETRIES, _env_int, configure_scheduler
+from .workqueue import WorkQueue, shard_for, DEFAULT_LEASE_SECONDS, DEFAULT_MAX_ATTEMPTS
+
+DEFAULT_QUEUE_NAME = "work_queue.db"
+PROGRESS_INTERVAL_SECONDS = 2.0
+MAX_WORKER_RESTARTS = 3  # Per shard, for workers that exit abnormally
+
+
+def shard_output_path(output_dir, shard):
+    return os.path.join(output_dir, f"shard-{shard:03d}.jsonl")
+
+
+def parse_shard_ids(text, shards):
+    """Parses '0,2,5-7' into a sorted list of shard numbers below `shards`; None or '' means all."""
+    if not text:
+        return list(range(shards))
+    shard_ids = set()
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        shard_ids.update(range(int(first), int(last or first) + 1))
+    invalid = [shard for shard in shard_ids if not 0 <= shard < shards]
+    if invalid:
+        raise ValueError(f"Shard ids {invalid} are outside 0-{shards - 1}.")
+    return sorted(shard_ids)
+
+
+def worker_name(pid):
+    """Queue owner name of the worker process `pid` on this node."""
+    return f"{socket.gethostname()}:{pid}"
+
+
+def _create_model(backend, fake_latency):
+    if backend == "fake":
+        from .backends import FakeModel
+        return FakeModel(latency=fake_latency)
+    from .api_config import configure_api_and_model
+    return configure_api_and_model(interactive=False)
+
+
+class _ShardWorker:
+    """
+    Claims sites from the queue (home shard first) and generates each site's
+    About page, idea list and posts, several sites at a time.
+    """
+
+    def __init__(self, queue, shards, output_path, model, max_concurrency, lease_seconds, max_attempts, exporter=None,
+                 other_output_paths=(), combined=False):
+        self.queue = queue
+        self.shards = shards
+        self.shard = shards[0]
+        self.model = model
+        self.combined = combined
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.worker_id = worker_name(os.getpid())
+        self.completed = load_completed_items(output_path)
+        self.post_topics = completed_post_topics(self.completed)  # site_id -> post topics recorded as done
+        self.other_output_paths = [path for path in other_output_paths if path != output_path]
+        self.offsets = {}  # Other shard file -> bytes read so far
+        self.catch_up_lock = threading.Lock()
+        self.lock = threading.Lock()  # Guards the queue connection, the output file, `completed`, `post_topics` and `held`
+        self._catch_up()
+        self.out = _open_output(output_path)
+        self.exporter = exporter
+        self.max_concurrency = max(1, max_concurrency)
+        self.items = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix=f"shard{self.shard}-item")
+        self.held = set()  # Item ids this worker has claimed and not yet finished
+        self.stopped = threading.Event()
+        self.sites_done = 0
+
+    def _remember(self, record):
+        # Caller holds self.lock
+        self.completed[record["item_id"]] = (record.get("inputs_hash"), completed_content(record))
+        if record.get("artifact") == BLOG_POST:
+            self.post_topics.setdefault(record["site_id"], []).append(record["topic"])
+
+    def _catch_up(self):
+        """Reads the records other workers appended to the node's other shard files since the last call."""
+        with self.catch_up_lock:
+            for path in self.other_output_paths:
+                offset = self.offsets.get(path, 0)
+                try:
+                    with open(path, "rb") as f:
+                        f.seek(offset)
+                        for line in f:
+                            if not line.endswith(b"\n"):
+                                break  # Still being written; read it next time
+                            offset += len(line)
+                            try:
+                                record = json.loads(line)
+                            except ValueError:
+                                continue
+                            if record.get("status") == "ok":
+                                with self.lock:
+                                    self._remember(record)
+                except OSError:
+                    continue  # That shard has no file yet
+                self.offsets[path] = offset
+
+    def _is_current(self, task):
+        entry = self.completed.get(task["item_id"])
+        return entry is not None and entry[0] in (None, inputs_hash(task["artifact"], task["job"]["context"]))
+
+    def _select(self, tasks, run_topics, counts):
+        # Drops finished items and near-duplicate post topics, like run_bulk_job does
+        selected = []
+        for task in tasks:
+            if self._is_current(task):
+                counts["ok"] += 1
+                continue
+            if task["artifact"] == BLOG_POST and task["item_id"] not in self.completed:
+                existing, _ = run_topics.find_duplicate(task["topic"])
+                if existing is not None:
+                    print(f"Skipped: {task['item_id']} (near-duplicate of '{existing}')")
+                    continue
+                run_topics.add(task["topic"])
+            selected.append(task)
+        return selected
+
+    def _run(self, tasks, counts):
+        # Runs the items in parallel and records their results; returns the records
+        futures = [self.items.submit(_run_task, task, self.model) for task in tasks]
+        records = []
+        for task, future in zip(tasks, futures):
+            for record in future.result():
+                records.append(record)
+                with self.lock:
+                    self.out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    self.out.flush()
+                    if self.exporter:
+                        self.exporter.write(record)
+                    if record["status"] == "ok":
+                        self._remember(record)
+                if record["status"] == "ok":
+                    counts["ok"] += 1
+                    if record["artifact"] == BLOG_POST:
+                        get_idea_index(task["job"]["context"], POSTS).add(record["topic"])
+                else:
+                    counts["failed"] += 1
+                    print(f"Failed: {record['item_id']} ({record['error']})")
+        return records
+
+    def run_site(self, job):
+        """
+        Generates one site: the About page, idea list and manifest topics in
+        parallel, then posts for the generated ideas. Returns {'ok', 'failed'} item counts.
+        """
+        counts = {"ok": 0, "failed": 0}
+        self._catch_up()  # Another worker may have finished part of this site before failing
+        # Topics are deduplicated against the posts recorded in the output, not the site's persisted
+        # posts index, which also holds the posts a fresh output directory is asked to write again
+        run_topics = IdeaIndex()
+        with self.lock:
+            done_topics = list(self.post_topics.get(job["site_id"], ()))
+        run_topics.filter_new(done_topics)
+        about_task = _make_task(job, ABOUT_PAGE) if job["about_page"] else None
+        ideas_task = _make_task(job, BLOG_IDEAS) if job["ideas"] else None
+        first = []
+        if self.combined and about_task and ideas_task and not any(map(self._is_current, (about_task, ideas_task))):
+            first.append(_make_task(job, SITE_BUNDLE))  # Split back up (like run_bulk_job) if either part is done
+        else:
+            first.extend(task for task in (about_task, ideas_task) if task)
+        first.extend(_make_task(job, BLOG_POST, topic) for topic in job["topics"])
+
+        ideas = None
+        if ideas_task and self._is_current(ideas_task):
+            ideas = self.completed[ideas_task["item_id"]][1]
+        for record in self._run(self._select(first, run_topics, counts), counts):
+            if record["artifact"] == BLOG_IDEAS and record["status"] == "ok":
+                ideas = completed_content(record)
+        if job["posts_from_ideas"] and ideas:
+            self._run(self._select(_idea_post_tasks(job, ideas), run_topics, counts), counts)
+
+        for kind in (IDEAS, POSTS):
+            save_idea_index(job["context"], kind)
+        unload_idea_indexes(job["context"])
+        if self.exporter:
+            self.exporter.finish_site(job["site_id"])
+        return counts
+
+    def _claim(self):
+        with self.lock:
+            claimed = self.queue.claim(self.shards, self.worker_id, self.lease_seconds, self.max_attempts)
+            if claimed:
+                self.held.add(claimed[0])
+            return claimed
+
+    def _finish(self, item_id, counts, error=None):
+        with self.lock:
+            self.held.discard(item_id)
+            if error:
+                self.queue.fail(item_id, self.worker_id, error, self.max_attempts)
+            else:
+                self.queue.complete(item_id, self.worker_id, counts["ok"], counts["failed"])
+                self.sites_done += 1
+
+    def _site_loop(self):
+        while not self.stopped.is_set():
+            claimed = self._claim()
+            if claimed is None:
+                return
+            item_id, job = claimed
+            try:
+                counts = self.run_site(job)
+            except Exception as e:
+                self._finish(item_id, None, f"{type(e).__name__}: {e}")
+                continue
+            # Sites with failed items go back to the queue; the retry only pays for what failed
+            error = f"{counts['failed']} item(s) failed." if counts["failed"] else None
+            self._finish(item_id, counts, error)
+
+    def _heartbeat_loop(self):
+        while not self.stopped.wait(self.lease_seconds / 3):
+            with self.lock:
+                for item_id in list(self.held):
+                    self.queue.heartbeat(item_id, self.worker_id, self.lease_seconds)
+
+    def run(self):
+        heartbeat = threading.Thread(target=self._heartbeat_loop, daemon=True)
+        heartbeat.start()
+        # Half as many sites as item slots keeps every slot busy while a site waits on its idea list
+        site_threads = max(1, self.max_concurrency // 2)
+        try:
+            with ThreadPoolExecutor(max_workers=site_threads, thread_name_prefix=f"shard{self.shard}-site") as sites:
+                for future in [sites.submit(self._site_loop) for _ in range(site_threads)]:
+                    future.result()
+        finally:
+            self.stopped.set()
+            self.items.shutdown()
+            self.out.close()
+        return self.sites_done
+
+
+def run_worker(queue_path, shard, output_dir, other_shards=(), backend="gemini", fake_latency=0.5,
+               max_concurrency=DEFAULT_MAX_CONCURRENCY, requests_per_minute=None, tokens_per_minute=None,
+               lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS, export_dir=None,
+               export_formats=("markdown",), combined=False):
+    """
+    Worker process entry point: runs its home shard, then helps with
+    `other_shards`, until none of them has work left.
+    requests_per_minute/tokens_per_minute are this worker's share of the quota.
+    With export_dir, finished pages are exported there (see export.py).
+    With combined=True, each site's About page and idea list come from one request.
+    Returns the number of sites completed, or None if the model could not be created.
+    """
+    model = _create_model(backend, fake_latency)
+    if not model:
+        print(f"Shard {shard}: could not initialize AI Model. Set GEMINI_API_KEY for headless runs.")
+        return None
+    max_retries = _env_int("GEMINI_MAX_RETRIES")
+    configure_scheduler(requests_per_minute, tokens_per_minute,
+                        DEFAULT_MAX_RETRIES if max_retries is None else max_retries)
+    os.makedirs(output_dir, exist_ok=True)
+    queue = WorkQueue(queue_path)
+    try:
+        shards = [shard] + [other for other in other_shards if other != shard]
+        exporter = Exporter(export_dir, export_formats) if export_dir else None
+        worker = _ShardWorker(queue, shards, shard_output_path(output_dir, shard), model, max_concurrency,
+                              lease_seconds, max_attempts, exporter,
+                              [shard_output_path(output_dir, other) for other in shards[1:]], combined)
+        sites_done = worker.run()
+        if exporter:
+            exporter.close()
+        return sites_done
+    finally:
+        queue.close()
+
+
+def _worker_main(kwargs):
+    # Process target; a non-zero exit code tells the runner to restart the shard
+    if run_worker(**kwargs) is None:
+        raise SystemExit(2)
+
+
+def _share(total, parts):
+    return max(1, total // parts) if total else None
+
+
+def _format_progress(progress, started, sites_at_start):
+    finished = progress["done"] + progress["failed"]
+    elapsed = max(time.time() - started, 1e-6)
+    rate = (progress["done"] - sites_at_start) / elapsed * 60
+    return (f"[progress] {finished}/{progress['total']} sites finished ({progress['failed']} failed, "
+            f"{progress['claimed']} in progress) | items: {progress['ok_items']} ok, {progress['failed_items']} failed "
+            f"| {rate:.1f} sites/min")
+
+
+def run_sharded(manifest_path, output_dir, workers, shards=None, shard_ids=None, queue_path=None, backend="gemini",
+                fake_latency=0.5, max_concurrency=DEFAULT_MAX_CONCURRENCY, requests_per_minute=None,
+                tokens_per_minute=None, retry_failed=False, lease_seconds=DEFAULT_LEASE_SECONDS, export_dir=None,
+                export_formats=("markdown",), combined=False):
+    """
+    Queues every site in the manifest and runs this node's shards with
+    `workers` processes, printing global progress as sites finish.
+    shards is the total shard count across all nodes (default: workers) and
+    shard_ids the shards this node runs (default: all). The per-minute budgets
+    are this node's; each running worker gets an equal share. With export_dir,
+    workers export pages as they finish and bundle each site when it is done.
+    Sites whose job changed since they were queued are queued again, and
+    combined=True asks for each site's About page and idea list in one request.
+    Returns the queue's final progress dict, or None if nothing could be run.
+    """
+    shards = shards or workers
+    shard_ids = list(range(shards)) if shard_ids is None else shard_ids
+    workers = max(1, min(workers, len(shard_ids)))
+    queue_path = queue_path or os.path.join(output_dir, DEFAULT_QUEUE_NAME)
+    requests_per_minute = requests_per_minute or _env_int("GEMINI_RPM")
+    tokens_per_minute = tokens_per_minute or _env_int("GEMINI_TPM")
+    os.makedirs(output_dir, exist_ok=True)
+
+    queue = WorkQueue(queue_path)
+    mine = set(shard_ids)
+    invalid_rows = []  # Line numbers of unreadable manifest rows, reported as failed sites
+    jobs = iter_manifest(manifest_path, on_invalid=lambda line_number, error: invalid_rows.append(line_number))
+    added, requeued = queue.enqueue_jobs((job for job in jobs if shard_for(job["site_id"], shards) in mine), shards)
+    if retry_failed:
+        queue.retry_failed()
+    progress = queue.progress()
+    print(f"\nQueued {added} new and {requeued} changed site(s) from '{manifest_path}' ({progress['total']} in '{queue_path}'). "
+          f"Running {len(shard_ids)} of {shards} shard(s) with {workers} worker process(es)"
+          + (f", {_share(requests_per_minute, workers)} requests/min each" if requests_per_minute else "") + "...")
+
+    # Spawned (not forked) processes: the gRPC client in the parent is not fork-safe
+    mp = multiprocessing.get_context("spawn")
+    worker_kwargs = {
+        "queue_path": queue_path, "output_dir": output_dir, "backend": backend, "fake_latency": fake_latency,
+        "other_shards": shard_ids, "max_concurrency": max_concurrency, "requests_per_minute": _share(requests_per_minute, workers),
+        "tokens_per_minute": _share(tokens_per_minute, workers), "lease_seconds": lease_seconds,
+        "export_dir": export_dir, "export_formats": list(export_formats), "combined": combined,
+    }
+    waiting = shard_ids[:workers] if queue.has_work(shard_ids) else []  # Home shards of the workers to start
+    running = {}  # home shard -> Process
+    restarts = {}
+    started = time.time()
+    sites_at_start = progress["done"]
+    last_report = 0.0
+    try:
+        while waiting or running:
+            while waiting and len(running) < workers:
+                shard = waiting.pop(0)
+                process = mp.Process(target=_worker_main, args=(dict(worker_kwargs, shard=shard),),
+                                     name=f"content-shard-{shard}")
+                process.start()
+                running[shard] = process
+            time.sleep(0.2)
+            for shard, process in list(running.items()):
+                if process.is_alive():
+                    continue
+                process.join()
+                del running[shard]
+                if process.exitcode != 0:
+                    queue.release_worker(worker_name(process.pid))
+                if process.exitcode != 0 and queue.has_work(shard_ids):
+                    restarts[shard] = restarts.get(shard, 0) + 1
+                    if restarts[shard] <= MAX_WORKER_RESTARTS:
+                        print(f"Worker for shard {shard} exited with code {process.exitcode}; restarting it "
+                              f"({restarts[shard]}/{MAX_WORKER_RESTARTS}).")
+                        waiting.insert(0, shard)
+                    else:
+                        print(f"Worker for shard {shard} keeps failing; not restarting it.")
+            if time.time() - last_report >= PROGRESS_INTERVAL_SECONDS:
+                print(_format_progress(queue.progress(), started, sites_at_start))
+                last_report = time.time()
+    except KeyboardInterrupt:
+        print("\nStopping workers; unfinished sites stay queued and resume on the next run.")
+        for process in running.values():
+            process.terminate()
+            process.join()
+        raise
+    finally:
+        progress = queue.progress()
+        queue.close()
+
+    print(_format_progress(progress, started, sites_at_start))
+    progress["failed"] += len(invalid_rows)
+    print(f"\nSharded generation finished in {time.time() - started:.1f}s: {progress['done']} site(s) done, "
+          f"{progress['failed']} failed"
+          + (f" ({len(invalid_rows)} invalid manifest row(s))" if invalid_rows else "")
+          + f", {progress['pending'] + progress['claimed']} still queued. Records are in '{output_dir}'.")
+    return progress
@@ -0,0 +1,129 @@
+# ai_content_generator/src/singleflight.py
+
+# In-process coalescing of identical model requests ("single flight").
+# When several sessions ask for the same prompt at the same time, only the
+# first request goes to the API; the others attach to it and receive the
+# same text (or the same error). Flights are keyed like the response cache
+# (cache.make_cache_key), so identical means same model, prompt and config.
+# A streamed flight is shared chunk by chunk: late joiners first get the
+# chunks already received, then follow along. If every caller stops reading
+# before the stream finishes, the flight is cancelled and the stream closed.
+
+import threading
+
+
+class FlightCancelled(Exception):
+    """Raised inside a flight's request when every caller has left."""
+
+
+class Flight:
+    """
+    One in-flight request shared by its callers. The producer appends text
+    chunks and calls SingleFlight.finish(); callers read with chunks() or wait().
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.callers = 1
+        self.cancelled = False
+        self.done = False
+        self.error = None
+        self._chunks = []
+        self._changed = threading.Condition()
+
+    def append(self, chunk):
+        with self._changed:
+            self._chunks.append(chunk)
+            self._changed.notify_all()
+
+    def finish(self, error=None):
+        with self._changed:
+            self.done = True
+            self.error = error
+            self._changed.notify_all()
+
+    def _cancel(self):
+        with self._changed:
+            self.cancelled = True
+            self._changed.notify_all()
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise FlightCancelled()
+
+    def chunks(self):
+        """Yields every chunk of the flight, from the first one, until it finishes."""
+        index = 0
+        while True:
+            with self._changed:
+                while index == len(self._chunks) and not self.done and not self.cancelled:
+                    self._changed.wait()
+                new_chunks = self._chunks[index:]
+                finished = self.done or self.cancelled
+            for chunk in new_chunks:
+                yield chunk
+            index += len(new_chunks)
+            if finished and index == len(self._chunks):
+                return
+
+    def wait(self):
+        """Blocks until the flight finishes; returns its full text, or None if it failed."""
+        text = "".join(self.chunks())
+        return text if text and not self.error else None
+
+
+class SingleFlight:
+    """
+    Table of in-flight requests by key. join() returns (flight, leader); the
+    leader starts the request, everyone else just reads the flight. Every
+    caller must call leave() when done with it.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def join(self, key):
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None and not flight.done and not flight.cancelled:
+                flight.callers += 1
+                return flight, False
+            flight = self._flights[key] = Flight(key)
+            return flight, True
+
+    def leave(self, flight):
+        """Drops a caller; the last caller to leave an unfinished flight cancels it."""
+        with self._lock:
+            flight.callers -= 1
+            if flight.callers > 0:
+                return
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+        if not flight.done:
+            flight._cancel()
+
+    def finish(self, flight, error=None):
+        """Marks a flight finished; later requests with its key start fresh (or hit the cache)."""
+        with self._lock:
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+        flight.finish(error)
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._flights)
+
+
+# Process-wide table shared by every session and worker thread
+_default_single_flight = None
+_default_single_flight_lock = threading.Lock()
+
+
+def get_single_flight():
+    """Returns the shared SingleFlight table."""
+    global _default_single_flight
+    with _default_single_flight_lock:
+        if _default_single_flight is None:
+            _default_single_flight = SingleFlight()
+        return _default_single_flight
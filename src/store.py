@@ -0,0 +1,199 @@
+# ai_content_generator/src/store.py
+
+# Persistent content store for generated artifacts.
+# Everything the app generates (About pages, idea lists, blog posts) is kept
+# in one SQLite database in WAL mode, keyed by site (see context.context_site_id),
+# artifact type and topic, together with the prompt, template id, model and
+# metadata that produced it. Each artifact also records a hash of the inputs
+# its prompt used (generators.inputs_hash), so after an edit to the site
+# details only artifacts whose inputs changed are reported as stale. Site
+# contexts are stored too, so a session can be restored after a page reload. Readers page through posts instead of loading
+# them all, so memory use stays flat however many posts a site has.
+# Each stored site has an owner (the app uses a digest of the visitor's API
+# key), and sites are only listed or loaded for their owner.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .context import context_site_id
+
+DEFAULT_STORE_PATH = os.getenv("CONTENT_STORE_PATH", "content_store.db")
+DEFAULT_PAGE_SIZE = 10
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sites (
+    site_id    TEXT PRIMARY KEY,
+    name       TEXT,
+    context    TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    owner      TEXT
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    site_id     TEXT NOT NULL,
+    artifact    TEXT NOT NULL,
+    topic       TEXT NOT NULL DEFAULT '',
+    content     TEXT NOT NULL,
+    prompt      TEXT,
+    template_id TEXT,
+    model       TEXT,
+    metadata    TEXT,
+    inputs_hash TEXT,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL,
+    UNIQUE (site_id, artifact, topic)
+);
+CREATE INDEX IF NOT EXISTS artifacts_by_site ON artifacts (site_id, artifact, updated_at);
+"""
+
+
+def _row_to_dict(row):
+    item = dict(row)
+    if item.get("metadata"):
+        item["metadata"] = json.loads(item["metadata"])
+    return item
+
+
+class ContentStore:
+    """
+    SQLite-backed store of generated content. Each thread gets its own
+    connection; WAL mode lets readers run while another thread writes.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(artifacts)")}
+            if "inputs_hash" not in columns:  # Databases created before inputs were tracked
+                conn.execute("ALTER TABLE artifacts ADD COLUMN inputs_hash TEXT")
+            site_columns = {row["name"] for row in conn.execute("PRAGMA table_info(sites)")}
+            if "owner" not in site_columns:  # Databases created before sites had owners
+                conn.execute("ALTER TABLE sites ADD COLUMN owner TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS sites_by_owner ON sites (owner, updated_at)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL; avoids an fsync per commit
+            self._local.conn = conn
+        return conn
+
+    # --- Sites ---
+
+    def save_site(self, website_context, owner=None):
+        """
+        Stores (or refreshes) a site's context for `owner` and returns its site
+        id. A site saved by one owner is never taken over by another.
+        """
+        site_id = context_site_id(website_context)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO sites (site_id, name, context, updated_at, owner) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(site_id) DO UPDATE SET name = excluded.name, context = excluded.context, "
+                "updated_at = excluded.updated_at WHERE sites.owner IS excluded.owner",
+                (site_id, website_context.get("website_name"), json.dumps(website_context), time.time(), owner))
+        return site_id
+
+    def get_site(self, site_id, owner=None):
+        """Returns a site context stored by `owner`, or None."""
+        row = self._connect().execute(
+            "SELECT context FROM sites WHERE site_id = ? AND owner IS ?", (site_id, owner)).fetchone()
+        return json.loads(row["context"]) if row else None
+
+    def list_sites(self, owner=None, limit=50):
+        """Returns [{'site_id', 'name', 'updated_at'}] for `owner`'s most recently used sites."""
+        rows = self._connect().execute(
+            "SELECT site_id, name, updated_at FROM sites WHERE owner IS ? ORDER BY updated_at DESC LIMIT ?",
+            (owner, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    # --- Artifacts ---
+
+    def put(self, site_id, artifact, content, topic="", prompt=None, template_id=None, model=None, metadata=None,
+            inputs_hash=None):
+        """
+        Stores an artifact, replacing any earlier version for the same
+        site/artifact/topic (its created_at is kept).
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO artifacts (site_id, artifact, topic, content, prompt, template_id, model, metadata, inputs_hash, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(site_id, artifact, topic) DO UPDATE SET content = excluded.content, prompt = excluded.prompt, "
+                "template_id = excluded.template_id, model = excluded.model, metadata = excluded.metadata, "
+                "inputs_hash = excluded.inputs_hash, updated_at = excluded.updated_at",
+                (site_id, artifact, topic or "", content, prompt, template_id, model,
+                 json.dumps(metadata) if metadata else None, inputs_hash, now, now))
+
+    def get(self, site_id, artifact, topic=""):
+        """Returns the stored artifact as a dict, or None."""
+        row = self._connect().execute(
+            "SELECT * FROM artifacts WHERE site_id = ? AND artifact = ? AND topic = ?",
+            (site_id, artifact, topic or "")).fetchone()
+        return _row_to_dict(row) if row else None
+
+    def get_content(self, site_id, artifact, topic=""):
+        """Returns just the content of a stored artifact, or None."""
+        row = self._connect().execute(
+            "SELECT content FROM artifacts WHERE site_id = ? AND artifact = ? AND topic = ?",
+            (site_id, artifact, topic or "")).fetchone()
+        return row["content"] if row else None
+
+    def topics(self, site_id, artifact):
+        """Returns the set of topics stored for a site and artifact (content is not loaded)."""
+        rows = self._connect().execute(
+            "SELECT topic FROM artifacts WHERE site_id = ? AND artifact = ?", (site_id, artifact)).fetchall()
+        return {row["topic"] for row in rows}
+
+    def stale_topics(self, site_id, artifact, inputs_hash):
+        """
+        Returns the topics ('' for single artifacts) whose stored inputs hash
+        differs from `inputs_hash`. Artifacts stored without a hash are never
+        reported, since what they were built from is unknown.
+        """
+        rows = self._connect().execute(
+            "SELECT topic FROM artifacts WHERE site_id = ? AND artifact = ? AND inputs_hash IS NOT NULL "
+            "AND inputs_hash != ? ORDER BY updated_at DESC", (site_id, artifact, inputs_hash)).fetchall()
+        return [row["topic"] for row in rows]
+
+    def count(self, site_id, artifact):
+        row = self._connect().execute(
+            "SELECT COUNT(*) AS n FROM artifacts WHERE site_id = ? AND artifact = ?", (site_id, artifact)).fetchone()
+        return row["n"]
+
+    def page(self, site_id, artifact, page=0, page_size=DEFAULT_PAGE_SIZE):
+        """Returns one page of artifacts, most recently updated first."""
+        rows = self._connect().execute(
+            "SELECT * FROM artifacts WHERE site_id = ? AND artifact = ? ORDER BY updated_at DESC, id DESC "
+            "LIMIT ? OFFSET ?", (site_id, artifact, page_size, max(0, page) * page_size)).fetchall()
+        return [_row_to_dict(row) for row in rows]
+
+    def delete(self, site_id, artifact, topic=""):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM artifacts WHERE site_id = ? AND artifact = ? AND topic = ?",
+                         (site_id, artifact, topic or ""))
+
+
+# Process-wide store shared by every Streamlit session and the CLI
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_content_store():
+    """Returns the shared ContentStore (database file from CONTENT_STORE_PATH)."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ContentStore(DEFAULT_STORE_PATH)
+        return _default_store
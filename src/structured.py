@@ -0,0 +1,130 @@
+# ai_content_generator/src/structured.py
+
+# Incremental parsing of streamed JSON output.
+# Structured responses (e.g. {"ideas": [{...}, {...}]}) arrive in arbitrary
+# chunks. JsonArrayStreamParser scans each chunk once and returns every
+# element of the array as soon as the element is complete, so callers can use
+# the first items while the rest is still being generated.
+# The array is either the whole response (optionally in a ```json fence) or
+# the value of a named key such as "ideas". A '[' anywhere else, e.g. in a
+# preamble like "Here are [10] ideas:", does not start it.
+
+import json
+import re
+
+TOP_LEVEL_ARRAY_PATTERN = re.compile(r"\s*(?:```[\w-]*\s*)?\[")
+
+
+class JsonArrayStreamParser:
+    """
+    Feed it text chunks; it returns the elements (objects, strings, numbers)
+    of the array as they complete. With a `key`, the array may also be the
+    value of that key inside an object (e.g. {"ideas": [...]}). With
+    `strict`, parsing ends at the first element that is not valid JSON.
+    """
+
+    def __init__(self, key=None, strict=False):
+        self.strict = strict
+        self._key_pattern = re.compile(r'"%s"\s*:\s*\[' % re.escape(key)) if key else None
+        self._buffer = ""
+        self._pos = 0  # Next character of the buffer to scan
+        self._depth = 0  # Nesting depth; 1 = directly inside the array
+        self._in_string = False
+        self._escaped = False
+        self._item_start = None  # Buffer offset where the current element began
+        self._started = False  # The array's '[' has been seen
+        self.finished = False  # The array's ']' has been seen
+        self.items = []
+        self.errors = 0  # Elements that completed but were not valid JSON
+
+    def feed(self, chunk):
+        """Adds a chunk and returns the elements completed by it."""
+        if self.finished or not chunk:
+            return []
+        self._buffer += chunk
+        if not self._started and not self._find_start():
+            return []
+        completed = []
+        buffer = self._buffer
+        pos = self._pos
+        while pos < len(buffer) and not self.finished:
+            char = buffer[pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._complete(pos + 1, completed)
+                pos += 1
+                continue
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    self._item_start = pos
+            elif char in "{[":
+                if self._depth == 1:
+                    self._item_start = pos
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 1:
+                    self._complete(pos + 1, completed)
+                elif self._depth == 0:
+                    self._complete(pos, completed)  # A bare last element, e.g. [1, 2]
+                    self.finished = True
+                    pos += 1
+                    break
+            elif char == "," and self._depth == 1:
+                self._complete(pos, completed)  # Ends a bare element (number, true, null)
+            elif self._depth == 1 and self._item_start is None and not char.isspace():
+                self._item_start = pos
+            pos += 1
+        # Drop scanned text that no open element still needs
+        keep_from = self._item_start if self._item_start is not None else pos
+        self._buffer = buffer[keep_from:]
+        self._pos = pos - keep_from
+        if self._item_start is not None:
+            self._item_start = 0
+        return completed
+
+    def _find_start(self):
+        # Text before the array is kept (and rescanned) until its '[' arrives
+        match = TOP_LEVEL_ARRAY_PATTERN.match(self._buffer)
+        if match is None and self._key_pattern is not None:
+            match = self._key_pattern.search(self._buffer)
+        if match is None:
+            return False
+        self._buffer = self._buffer[match.end():]
+        self._pos = 0
+        self._started = True
+        self._depth = 1
+        return True
+
+    def _complete(self, end, completed):
+        if self._item_start is None:
+            return
+        text = self._buffer[self._item_start:end].strip()
+        self._item_start = None
+        if not text:
+            return
+        try:
+            item = json.loads(text)
+        except ValueError:
+            self.errors += 1
+            self.finished = self.finished or self.strict
+            return
+        self.items.append(item)
+        completed.append(item)
+
+
+def parse_json_array(text, key=None):
+    """
+    Returns the elements of the JSON array in `text` (complete elements only,
+    so truncated output still yields what was finished).
+    """
+    parser = JsonArrayStreamParser(key)
+    parser.feed(text or "")
+    return parser.items
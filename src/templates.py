@@ -0,0 +1,349 @@
+# ai_content_generator/src/templates.py
+
+# Named, versioned prompt templates for the generators.
+# Every prompt is split into two parts:
+#   1. a website-context block, listing only the context fields the template uses.
+#      It is rendered once per site and field set, and reused for every post.
+#   2. a task body with $placeholders (string.Template syntax) for per-call values.
+# The context block always comes first, so all calls for a site share the same
+# prefix. That prefix can also be served from the model's context cache (see
+# api_config.get_context_cached_model).
+
+from functools import lru_cache
+from string import Template
+
+# Labels for each context field, in the order they appear in the context block
+CONTEXT_FIELD_LABELS = {
+    "website_name": "Name",
+    "website_theme": "Central Theme",
+    "website_purpose": "Purpose/Mission",
+    "target_audience": "Target Audience",
+    "key_offerings": "Key Offerings",
+    "unique_selling_prop": "Uniqueness",
+    "tone_of_voice": "General Tone",
+    "brand_story": "Brand Story",
+    "call_to_action": "Call to Action",
+}
+CONTEXT_FIELD_DEFAULTS = {"tone_of_voice": "neutral"}
+
+
+@lru_cache(maxsize=1024)
+def _render_context_block(fields, values):
+    lines = ["**Website Context (Use this for relevance and tone):**"]
+    for field, value in zip(fields, values):
+        lines.append(f"* {CONTEXT_FIELD_LABELS.get(field, field)}: {value}")
+    return "\n".join(lines) + "\n"
+
+
+def render_context_block(website_context, fields):
+    """
+    Returns the website-context block for the given fields.
+    Results are memoised, so repeated calls for the same site cost a dict lookup.
+    """
+    fields = tuple(fields)
+    values = tuple(website_context.get(field) or CONTEXT_FIELD_DEFAULTS.get(field, "N/A") for field in fields)
+    return _render_context_block(fields, values)
+
+
+class PromptTemplate:
+    """
+    A named, versioned prompt: the context fields it reads plus a task body.
+    """
+
+    def __init__(self, name, version, context_fields, body):
+        self.name = name
+        self.version = version
+        self.context_fields = tuple(context_fields)
+        self._body = Template(body.strip("\n"))
+
+    @property
+    def template_id(self):
+        return f"{self.name}@{self.version}"
+
+    def render_parts(self, website_context, **params):
+        """Returns (shared context prefix, task body)."""
+        return render_context_block(website_context, self.context_fields), self._body.substitute(params)
+
+    def render(self, website_context, **params):
+        """Returns the full prompt text."""
+        return join_prompt(*self.render_parts(website_context, **params))
+
+
+def join_prompt(prefix, body):
+    """Joins a context prefix and a task body into one prompt."""
+    return f"{prefix}\n{body}\n"
+
+
+# --- Template registry ---
+# Templates are registered once at import time; get_template returns the
+# newest version unless a specific one is requested.
+_TEMPLATES = {}
+
+
+def register_template(template):
+    _TEMPLATES.setdefault(template.name, {})[template.version] = template
+    return template
+
+
+def get_template(name, version=None):
+    """Returns a registered template (the newest version by default)."""
+    versions = _TEMPLATES.get(name)
+    if not versions:
+        raise KeyError(f"Unknown prompt template: {name}")
+    if version is None:
+        version = max(versions)
+    return versions[version]
+
+
+def list_templates():
+    """Returns the ids ('name@version') of every registered template."""
+    return sorted(template.template_id for versions in _TEMPLATES.values() for template in versions.values())
+
+
+register_template(PromptTemplate(
+    "about_page", 2,
+    ["website_name", "website_theme", "website_purpose", "target_audience",
+     "key_offerings", "unique_selling_prop", "tone_of_voice"],
+    """
+Act as an expert copywriter creating a compelling 'About Us' page for the website described above.
+
+**About Page Specifics:**
+* Brand Story: $story_detail
+* Call to Action: $cta_detail
+
+**Instructions:**
+1. Write a coherent and engaging 'About Us' page clearly reflecting the central theme.
+2. Strictly adhere to the general tone specified in the context.
+3. Target the specified audience.
+4. Naturally integrate the purpose, offerings, and uniqueness.
+5. Incorporate the brand story concisely if provided (value is '$story_detail').
+6. Conclude with or integrate the call to action (value is '$cta_detail').
+7. Structure logically. Do not add information not derived from the details provided.
+8. Important: Write the content to be approximately 600 words long.
+""",
+))
+
+register_template(PromptTemplate(
+    "blog_post", 2,
+    ["website_name", "website_theme", "target_audience", "tone_of_voice"],
+    """
+Act as a knowledgeable blog writer creating an engaging post for the website described above.
+
+**Blog Post Specifics:**
+* Topic: $topic
+* Target Keywords (Optional): $keywords
+* Required Word Count Range: Approximately 600 to 800 words.
+
+**Instructions:**
+1. Write an informative and engaging blog post specifically about '$topic'.
+2. Ensure the content is highly relevant to the website's central theme.
+3. Write in a style and language appropriate for the target audience.
+4. Maintain the general tone.
+5. If keywords were provided, try to incorporate them naturally.
+6. Important: Write the post to be approximately 600 to 800 words long, ensuring quality and coherence within this range.
+7. Structure the post logically with an introduction, main body (perhaps with subheadings), and a conclusion.
+8. The content must be original and focused solely on the provided topic within the website's context.
+""",
+))
+
+register_template(PromptTemplate(
+    "blog_post_ideas", 2,
+    ["website_name", "website_theme", "target_audience", "website_purpose", "key_offerings", "tone_of_voice"],
+    """
+Act as an expert content strategist and blogger for the website described above.
+
+**Task:**
+Based *only* on the website context provided above, generate a list of exactly 10 engaging and relevant blog post titles.
+The titles should:
+- Be suitable for the target audience.
+- Directly relate to the website's central theme and purpose.
+- Be varied and interesting.
+
+**Output Format:**
+Provide the output as a numbered list (1. Title 1, 2. Title 2, ... 10. Title 10).
+Do not include any introductory or concluding text, just the numbered list of titles.
+""",
+))
+
+register_template(PromptTemplate(
+    "blog_post_ideas", 3,
+    ["website_name", "website_theme", "target_audience", "website_purpose", "key_offerings", "tone_of_voice"],
+    """
+Act as an expert content strategist and blogger for the website described above.
+
+**Task:**
+Based *only* on the website context provided above, generate a list of exactly 10 engaging and relevant blog post titles.
+The titles should:
+- Be suitable for the target audience.
+- Directly relate to the website's central theme and purpose.
+- Be varied and interesting.
+$avoid_block
+**Output Format:**
+Provide the output as a numbered list (1. Title 1, 2. Title 2, ... 10. Title 10).
+Do not include any introductory or concluding text, just the numbered list of titles.
+""",
+))
+
+# Structured variant: the response is JSON constrained by a schema (see
+# generators.IDEA_RESPONSE_SCHEMA), so there is no list formatting to parse.
+register_template(PromptTemplate(
+    "blog_post_ideas_json", 1,
+    ["website_name", "website_theme", "target_audience", "website_purpose", "key_offerings", "tone_of_voice"],
+    """
+Act as an expert content strategist and blogger for the website described above.
+
+**Task:**
+Based *only* on the website context provided above, generate exactly $idea_count engaging and relevant blog post ideas.
+The titles should:
+- Be suitable for the target audience.
+- Directly relate to the website's central theme and purpose.
+- Be varied and interesting.
+$avoid_block
+**For each idea give:**
+- title: the blog post title.
+- keywords: 2 to 4 target keywords or phrases for the post.
+- intent: the reader's search intent, one of: $intents.
+- estimated_words: a suitable length for the post in words (between 600 and 1500).
+
+**Output Format:**
+Return exactly $idea_count blog post ideas as JSON: an object with an "ideas" array of objects with the fields above.
+""",
+))
+
+register_template(PromptTemplate(
+    "about_page_and_ideas", 1,
+    ["website_name", "website_theme", "website_purpose", "target_audience",
+     "key_offerings", "unique_selling_prop", "tone_of_voice"],
+    """
+Act as an expert copywriter and content strategist for the website described above.
+
+* Brand Story: $story_detail
+* Call to Action: $cta_detail
+
+**Task 1 - About Page:**
+Write a coherent and engaging 'About Us' page of approximately 600 words that reflects the central theme,
+strictly follows the general tone, targets the audience, integrates the purpose, offerings and uniqueness,
+incorporates the brand story if provided and concludes with the call to action.
+Do not add information not derived from the details provided.
+
+**Task 2 - Blog Post Ideas:**
+Generate exactly 10 engaging, varied blog post titles suitable for the target audience
+that directly relate to the website's central theme and purpose.
+
+**Output Format (follow exactly):**
+$about_marker
+<the About page text>
+$ideas_marker
+<a numbered list of the 10 titles: 1. Title 1, 2. Title 2, ... 10. Title 10>
+Do not include any other introductory or concluding text.
+""",
+))
+
+register_template(PromptTemplate(
+    "blog_posts_combined", 1,
+    ["website_name", "website_theme", "target_audience", "tone_of_voice"],
+    """
+Act as a knowledgeable blog writer creating engaging posts for the website described above.
+
+**Topics (write one separate post for each):**
+$topic_lines
+* Target Keywords (Optional): $keywords
+
+**Instructions:**
+1. Write $post_count informative and engaging blog posts, one per topic, each focused solely on its topic.
+2. Keep every post highly relevant to the website's central theme, the target audience and the general tone.
+3. Important: Each post must be approximately 600 to 800 words long.
+4. Structure each post with an introduction, main body (perhaps with subheadings), and a conclusion.
+
+**Output Format (follow exactly):**
+Start each post with a marker line '=== POST <number> ===' using the topic's number above, followed by the post text.
+Do not include any other introductory or concluding text.
+""",
+))
+
+# Long-form posts (see generators.generate_long_blog_post): an outline first,
+# then every section at once. Both share the blog_post context fields, so all
+# requests for one article start with the same context prefix.
+register_template(PromptTemplate(
+    "blog_post_outline", 1,
+    ["website_name", "website_theme", "target_audience", "tone_of_voice"],
+    """
+Act as a knowledgeable blog writer planning a long-form article for the website described above.
+
+**Article Specifics:**
+* Topic: $topic
+* Target Keywords (Optional): $keywords
+* Total Length: About $target_words words.
+
+**Task:**
+Plan the article as $section_count sections of roughly $section_words words each. The first section opens the
+article and the last one concludes it. Give every section a short heading and 2 to 4 points it must cover.
+Sections must not overlap: each point belongs to exactly one section.
+
+Return the outline as JSON with exactly $section_count sections, in this shape:
+{"title": "<article title>", "sections": [{"heading": "<section heading>", "points": ["<point>", "<point>"]}]}
+""",
+))
+
+register_template(PromptTemplate(
+    "blog_post_section", 1,
+    ["website_name", "website_theme", "target_audience", "tone_of_voice"],
+    """
+Act as a knowledgeable blog writer. You are writing one section of a long-form article for the website
+described above; the other sections are being written at the same time from the same outline.
+
+**Article:** $title
+* Topic: $topic
+* Target Keywords (Optional): $keywords
+
+**Full Outline:**
+$outline_block
+
+**Your Section ($section_number of $section_count): $heading**
+$points_block
+
+**Instructions:**
+1. Write only section $section_number, about $section_words words, starting with the heading line "## $heading".
+2. $position_note
+3. Cover this section's points only; the rest of the outline is covered elsewhere, so do not repeat it.
+4. Write for the target audience in the website's tone. Use ### subheadings if the section needs them.
+5. Do not add the article title, a table of contents or notes about the outline.
+""",
+))
+
+# Quality-gate follow-ups (see generators.enforce_quality). They share the
+# blog_post context fields, so the context prefix is the same as the post's.
+register_template(PromptTemplate(
+    "content_continuation", 1,
+    ["website_name", "website_theme", "target_audience", "tone_of_voice"],
+    """
+You are finishing a $artifact_label for the website described above. The draft stops at $word_count words;
+the finished piece should be about $target_words words.
+
+**Draft so far (last part only):**
+$draft_tail
+
+**Instructions:**
+1. Write only the continuation, about $missing_words words, picking up exactly where the draft stops.
+2. Do not repeat or summarise earlier text and do not restart the piece or add a new title.
+3. Keep the same tone, formatting and heading style, and end with a proper conclusion.
+$keyword_line
+""",
+))
+
+register_template(PromptTemplate(
+    "content_trim", 1,
+    ["website_name", "website_theme", "target_audience", "tone_of_voice"],
+    """
+Edit the $artifact_label below for the website described above. It is $word_count words long;
+shorten it to at most $max_words words.
+
+**Instructions:**
+1. Keep the title, headings, key points, tone and the conclusion or call to action.
+2. Cut repetition and filler rather than whole sections.
+3. Return only the revised text, with no commentary.
+
+**Draft:**
+$draft
+""",
+))
@@ -1,20 +1,118 @@
+import os
 import textwrap
+import threading
+
+from .cache import get_response_cache, make_cache_key
+from .metrics import CallTimer, get_metrics
+from .scheduler import get_scheduler, estimate_tokens, DEFAULT_OUTPUT_TOKEN_ESTIMATE
+from .singleflight import FlightCancelled, get_single_flight
+
+# Identical concurrent requests share one API call (on unless CONTENT_SINGLE_FLIGHT=0)
+USE_SINGLE_FLIGHT = os.getenv("CONTENT_SINGLE_FLIGHT", "1").lower() not in ("0", "false", "no")
 
 # Note: No 'google.generativeai' import needed here if model object is passed in
 # import google.generativeai as genai # Keep commented unless needed directly
 
-def call_gemini_api(model, prompt):
+def get_model_name(model):
+    """
+    Returns the model's name (e.g. 'models/gemini-2.0-flash') for cache keys and logs.
+    """
+    name = getattr(model, 'model_name', None) or type(model).__name__
+    # Models bound to cached context only see part of the prompt, so the
+    # cached content id must be part of the name used for response cache keys
+    cached_content = getattr(model, 'cached_content', None)
+    return f"{name}+{cached_content}" if cached_content else name
+
+# Last API error per thread, so batch callers can report why a call returned None
+_last_error = threading.local()
+
+def get_last_api_error():
+    """
+    Returns a description of the last failed API call on this thread, or None.
+    """
+    return getattr(_last_error, 'message', None)
+
+def _set_last_api_error(message):
+    _last_error.message = message
+
+def call_gemini_api(model, prompt, generation_config=None, use_cache=True, generator_name=None):
     """
     Helper function to call the Gemini API using the provided model object
-    and handles basic response/errors.
+    and handles basic response/errors. Any backend following the interface
+    in src/backends.py (e.g. FakeModel for offline runs) works as `model`.
+    Identical requests are served from the on-disk response cache unless
+    use_cache is False, and identical requests already in flight are joined
+    instead of being sent again. Requests go through the shared scheduler,
+    which enforces rate budgets and retries quota/transient errors.
+    Every call is recorded in the metrics registry under `generator_name`.
     """
+    _set_last_api_error(None)
     if not model:
         print("Error: AI model object not provided to call_gemini_api.")
+        _set_last_api_error("AI model object not provided.")
         return None
+
+    timer = CallTimer(generator_name, get_model_name(model))
     try:
-        response = model.generate_content(prompt)
+        text = _call_gemini_api(model, prompt, generation_config, use_cache, timer)
+    finally:
+        timer.error = get_last_api_error()
+        get_metrics().record(timer)
+    return text
+
+def _call_gemini_api(model, prompt, generation_config, use_cache, timer):
+    cache = get_response_cache() if use_cache else None
+    cache_key = None
+    if cache or USE_SINGLE_FLIGHT:
+        cache_key = make_cache_key(get_model_name(model), prompt, generation_config)
+    if cache:
+        cached_text = cache.get(cache_key)
+        if cached_text:
+            timer.cache_hit = True
+            return cached_text
+    if not USE_SINGLE_FLIGHT:
+        return _request_text(model, prompt, generation_config, cache, cache_key, timer)
+
+    flights = get_single_flight()
+    flight, leader = flights.join(cache_key)
+    try:
+        if not leader:
+            # Same request already in flight: share its result (or its error)
+            timer.coalesced = True
+            text = flight.wait()
+            timer.mark_first_byte()
+            if text is None:
+                _set_last_api_error(flight.error or "The shared request was cancelled.")
+            return text
+        text = None
+        try:
+            text = _request_text(model, prompt, generation_config, cache, cache_key, timer)
+        finally:
+            if text:
+                flight.append(text)
+            flights.finish(flight, None if text else (get_last_api_error() or "No text was returned by the model."))
+        return text
+    finally:
+        flights.leave(flight)
+
+def _request_text(model, prompt, generation_config, cache, cache_key, timer):
+    def _request():
+        if generation_config is not None:
+            return model.generate_content(prompt, generation_config=generation_config)
+        return model.generate_content(prompt)
+
+    scheduler = get_scheduler()
+    call_info = {}
+    try:
+        response = scheduler.execute(_request, estimated_tokens=estimate_tokens(prompt) + DEFAULT_OUTPUT_TOKEN_ESTIMATE, call_info=call_info)
+        timer.mark_first_byte()  # Non-streaming: the whole response arrives at once
+        timer.queue_wait = call_info.get('queue_wait', 0.0)
+        timer.retries = call_info.get('retries', 0)
+        timer.set_usage(response)
         # Basic check if text exists
         if hasattr(response, 'text') and response.text:
+            if cache:
+                cache.set(cache_key, response.text, model_name=get_model_name(model))
             return response.text
         else:
              # Check for safety ratings or blockages if applicable
@@ -22,16 +120,141 @@ def call_gemini_api(model, prompt):
                  # Check if prompt_feedback exists and has safety_ratings
                  if hasattr(response, 'prompt_feedback') and hasattr(response.prompt_feedback, 'safety_ratings'):
                     print(f"Generation possibly blocked or failed. Safety Ratings: {response.prompt_feedback.safety_ratings}")
+                    _set_last_api_error("Generation blocked or returned no text (see safety ratings in logs).")
                  else:
                     print("Generation failed. No text was returned, and detailed feedback unavailable.")
+                    _set_last_api_error("No text was returned by the model.")
 
             except Exception as feedback_error:
                  print(f"Generation failed. No text returned. Error accessing feedback: {feedback_error}")
+                 _set_last_api_error(f"No text returned ({feedback_error}).")
             return None
     except Exception as e:
-        print(f"\nAn error occurred while calling the Gemini API: {e}")
+        retries = call_info.get('retries', 0)
+        timer.queue_wait = call_info.get('queue_wait', 0.0)
+        timer.retries = retries
+        suffix = f" after {retries} retries" if retries else ""
+        print(f"\nAn error occurred while calling the Gemini API{suffix}: {type(e).__name__}: {e}")
+        _set_last_api_error(f"{type(e).__name__}{suffix}: {e}")
         return None
 
+def stream_gemini_api(model, prompt, generation_config=None, use_cache=True, generator_name=None):
+    """
+    Streaming counterpart of call_gemini_api.
+    Yields text chunks as the model produces them. A cache hit yields the
+    cached text as a single chunk; a completed stream is written to the cache.
+    """
+    if not model:
+        print("Error: AI model object not provided to stream_gemini_api.")
+        return
+
+    timer = CallTimer(generator_name, get_model_name(model), streaming=True)
+    try:
+        yield from _stream_gemini_api(model, prompt, generation_config, use_cache, timer)
+    finally:
+        # Also runs if the consumer stops early (generator closed)
+        get_metrics().record(timer)
+
+def _stream_gemini_api(model, prompt, generation_config, use_cache, timer):
+    cache = get_response_cache() if use_cache else None
+    cache_key = None
+    if cache or USE_SINGLE_FLIGHT:
+        cache_key = make_cache_key(get_model_name(model), prompt, generation_config)
+    if cache:
+        cached_text = cache.get(cache_key)
+        if cached_text:
+            timer.cache_hit = True
+            timer.mark_first_byte()
+            yield cached_text
+            return
+    if not USE_SINGLE_FLIGHT:
+        chunks = []
+        for text in _request_stream(model, prompt, generation_config, timer):
+            chunks.append(text)
+            yield text
+        if cache and chunks and not timer.error:
+            cache.set(cache_key, ''.join(chunks), model_name=get_model_name(model))
+        return
+
+    # The stream is read by a producer thread into a shared flight, so other
+    # callers of the same request can follow it and it survives any one reader leaving
+    flights = get_single_flight()
+    flight, leader = flights.join(cache_key)
+    if leader:
+        threading.Thread(target=_produce_stream, args=(flights, flight, model, prompt, generation_config, cache,
+                                                       cache_key, timer), daemon=True).start()
+    else:
+        timer.coalesced = True
+    try:
+        for text in flight.chunks():
+            timer.mark_first_byte()
+            yield text
+        if flight.error:
+            timer.error = flight.error
+    finally:
+        flights.leave(flight)
+
+def _produce_stream(flights, flight, model, prompt, generation_config, cache, cache_key, timer):
+    chunks = []
+    try:
+        for text in _request_stream(model, prompt, generation_config, timer, flight):
+            chunks.append(text)
+            flight.append(text)
+    finally:
+        if cache and chunks and not timer.error and not flight.cancelled:
+            cache.set(cache_key, ''.join(chunks), model_name=get_model_name(model))
+        flights.finish(flight, timer.error)
+
+def _request_stream(model, prompt, generation_config, timer, flight=None):
+    """
+    Opens a streaming request and yields its text chunks, recording timings
+    and errors on `timer`. Stops early (closing the stream) once `flight` is cancelled.
+    """
+    def _request():
+        if flight is not None:
+            flight.check_cancelled()  # Everyone left while the request waited for the scheduler
+        if generation_config is not None:
+            return model.generate_content(prompt, generation_config=generation_config, stream=True)
+        return model.generate_content(prompt, stream=True)
+
+    received_text = False
+    call_info = {}
+    try:
+        # Only opening the stream is retried; a failure mid-stream would duplicate output
+        response = get_scheduler().execute(_request, estimated_tokens=estimate_tokens(prompt) + DEFAULT_OUTPUT_TOKEN_ESTIMATE, call_info=call_info)
+        timer.queue_wait = call_info.get('queue_wait', 0.0)
+        timer.retries = call_info.get('retries', 0)
+        for chunk in response:
+            if flight is not None and flight.cancelled:
+                close = getattr(response, 'close', None)
+                if close:
+                    close()
+                timer.error = "Cancelled: every caller stopped reading."
+                return
+            timer.set_usage(chunk)  # Usage metadata arrives with the final chunk
+            # Chunks without text (e.g. safety-only updates) raise on .text access
+            try:
+                text = chunk.text
+            except Exception:
+                text = None
+            if text:
+                timer.mark_first_byte()
+                received_text = True
+                yield text
+    except FlightCancelled:
+        timer.error = "Cancelled before the request was sent."
+        return
+    except Exception as e:
+        timer.queue_wait = call_info.get('queue_wait', timer.queue_wait)
+        timer.retries = call_info.get('retries', timer.retries)
+        timer.error = f"{type(e).__name__}: {e}"
+        print(f"\nAn error occurred while streaming from the Gemini API: {e}")
+        return
+
+    if not received_text:
+        timer.error = "The stream finished without returning any text."
+        print("Generation failed. The stream finished without returning any text.")
+
 def display_output(content_type, text):
     """
     Formats and prints the generated text.
@@ -44,4 +267,32 @@ def display_output(content_type, text):
     else:
         print("No content was generated.")
     print(f"--- End of Generated {content_type} ---")
-    print("\nReminder: AI word counts are approximate. Review the length and quality.")
\ No newline at end of file
+    if text:
+        print(f"\nWord count: {len(text.split())}.")
+
+def display_stream(content_type, chunks, width=80):
+    """
+    Prints text chunks as they arrive, wrapped to `width` columns.
+    Returns the full text (or None if nothing was generated).
+    """
+    print(f"\n--- Generated {content_type} ---")
+    received = []
+    pending = ''  # Text of the current line not yet printed
+    for chunk in chunks:
+        received.append(chunk)
+        pending += chunk
+        # Print every completed line, then any full-width part of the current one
+        *complete_lines, pending = pending.split('\n')
+        for line in complete_lines:
+            print('\n'.join(textwrap.wrap(line, width=width)), flush=True)
+        wrapped = textwrap.wrap(pending, width=width)
+        if len(wrapped) > 1:
+            print('\n'.join(wrapped[:-1]), flush=True)
+            tail_start = pending.rfind(wrapped[-1])
+            pending = pending[tail_start:] if tail_start != -1 else wrapped[-1]
+    if pending:
+        print('\n'.join(textwrap.wrap(pending, width=width)))
+    if not received:
+        print("No content was generated.")
+    print(f"--- End of Generated {content_type} ---")
+    return ''.join(received) or None
@@ -0,0 +1,191 @@
+# ai_content_generator/src/workqueue.py
+
+# SQLite work queue for sharded bulk generation (see sharded.py).
+# Each site from a manifest is one work item, assigned to a shard by a hash
+# of its site id. Workers claim items from their own shard first (then from
+# other shards, so no worker idles while another has a backlog) with a lease
+# and renew it while they work; an item whose lease expires (its worker
+# crashed) goes back to the queue. Items that keep failing are parked as 'failed'
+# after a few attempts. Re-enqueueing a manifest re-queues the sites whose
+# job changed, so edits to a manifest are picked up like in bulk.py. The
+# database runs in WAL mode so many worker processes can claim and report
+# concurrently.
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+PENDING = "pending"
+CLAIMED = "claimed"
+DONE = "done"
+FAILED = "failed"
+
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS work (
+    item_id       TEXT PRIMARY KEY,
+    shard         INTEGER NOT NULL,
+    payload       TEXT NOT NULL,
+    status        TEXT NOT NULL,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    worker        TEXT,
+    lease_expires REAL,
+    ok_items      INTEGER NOT NULL DEFAULT 0,
+    failed_items  INTEGER NOT NULL DEFAULT 0,
+    error         TEXT,
+    updated_at    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS work_by_shard ON work (shard, status);
+"""
+
+
+def shard_for(site_id, shards):
+    """Stable shard number for a site id (the same on every node and run)."""
+    return int(hashlib.sha256(site_id.encode("utf-8")).hexdigest()[:8], 16) % max(1, shards)
+
+
+class WorkQueue:
+    """
+    Lease-based queue of site jobs in one SQLite file. Open one instance per
+    process; threads may share it if calls are serialised with a lock.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)  # Transactions are explicit
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def _write(self, sql, params=()):
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers never claim the same row
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = self._conn.execute(sql, params)
+            self._conn.execute("COMMIT")
+            return cursor.rowcount
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def enqueue_jobs(self, jobs, shards):
+        """
+        Adds manifest jobs (see manifest.normalize_job), one item per site.
+        A site already in the queue with the same job is left as it is, so
+        re-enqueueing the same manifest is safe; a site whose job changed in
+        the manifest (new topics, edited context) is queued again with the new
+        job and a fresh set of attempts, even if it was done. Returns
+        (new items, re-queued items).
+        """
+        now = time.time()
+        changed = 0
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            before = self._conn.execute("SELECT COUNT(*) FROM work").fetchone()[0]
+            for job in jobs:
+                # Clearing the worker makes a stale claim's complete()/fail() a no-op
+                cursor = self._conn.execute(
+                    "INSERT INTO work (item_id, shard, payload, status, updated_at) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(item_id) DO UPDATE SET shard = excluded.shard, payload = excluded.payload, "
+                    "status = excluded.status, attempts = 0, worker = NULL, lease_expires = NULL, error = NULL, "
+                    "updated_at = excluded.updated_at WHERE work.payload IS NOT excluded.payload",
+                    (job["site_id"], shard_for(job["site_id"], shards), json.dumps(job), PENDING, now))
+                changed += cursor.rowcount
+            added = self._conn.execute("SELECT COUNT(*) FROM work").fetchone()[0] - before
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return added, changed - added
+
+    def claim(self, shards, worker, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """
+        Claims the next pending item (or one whose lease has expired) from the
+        given shards, preferring the first one. Returns (item_id, job), or None
+        when none of the shards has work left.
+        """
+        now = time.time()
+        marks = ", ".join("?" * len(shards))
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Expired claims that already used every attempt are parked rather than retried forever
+            self._conn.execute(
+                "UPDATE work SET status = ?, error = 'Worker stopped before finishing (lease expired).', "
+                f"lease_expires = NULL, updated_at = ? WHERE shard IN ({marks}) AND status = ? AND lease_expires < ? "
+                "AND attempts >= ?", (FAILED, now, *shards, CLAIMED, now, max_attempts))
+            row = self._conn.execute(
+                f"SELECT item_id, payload FROM work WHERE shard IN ({marks}) AND "
+                "(status = ? OR (status = ? AND lease_expires < ?)) ORDER BY shard != ?, rowid LIMIT 1",
+                (*shards, PENDING, CLAIMED, now, shards[0])).fetchone()
+            if row is not None:
+                self._conn.execute(
+                    "UPDATE work SET status = ?, worker = ?, attempts = attempts + 1, lease_expires = ?, updated_at = ? "
+                    "WHERE item_id = ?", (CLAIMED, worker, now + lease_seconds, now, row["item_id"]))
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return (row["item_id"], json.loads(row["payload"])) if row else None
+
+    def heartbeat(self, item_id, worker, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """Extends a claim's lease. Returns False if the item is no longer held by this worker."""
+        return self._write("UPDATE work SET lease_expires = ? WHERE item_id = ? AND worker = ? AND status = ?",
+                           (time.time() + lease_seconds, item_id, worker, CLAIMED)) > 0
+
+    def complete(self, item_id, worker, ok_items=0, failed_items=0):
+        self._write("UPDATE work SET status = ?, ok_items = ?, failed_items = ?, error = NULL, lease_expires = NULL, "
+                    "updated_at = ? WHERE item_id = ? AND worker = ?",
+                    (DONE, ok_items, failed_items, time.time(), item_id, worker))
+
+    def fail(self, item_id, worker, error, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """Returns the item to the queue, or parks it as failed once it has used its attempts."""
+        self._write("UPDATE work SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, error = ?, "
+                    "lease_expires = NULL, updated_at = ? WHERE item_id = ? AND worker = ?",
+                    (max_attempts, FAILED, PENDING, error, time.time(), item_id, worker))
+
+    def release_worker(self, worker, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """
+        Puts a worker's claimed items back to pending (used when the worker
+        crashed); items out of attempts are parked as failed.
+        """
+        return self._write("UPDATE work SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, lease_expires = NULL, "
+                           "error = CASE WHEN attempts >= ? THEN 'Worker crashed while generating this site.' ELSE error END "
+                           "WHERE worker = ? AND status = ?",
+                           (max_attempts, FAILED, PENDING, max_attempts, worker, CLAIMED))
+
+    def retry_failed(self):
+        """Gives every parked failed item a fresh set of attempts."""
+        return self._write("UPDATE work SET status = ?, attempts = 0 WHERE status = ?", (PENDING, FAILED))
+
+    def progress(self):
+        """
+        Returns {'total', 'pending', 'claimed', 'done', 'failed', 'ok_items',
+        'failed_items', 'shards': {shard: {status: count}}}.
+        """
+        rows = self._conn.execute(
+            "SELECT shard, status, COUNT(*) AS n, SUM(ok_items) AS ok_items, SUM(failed_items) AS failed_items "
+            "FROM work GROUP BY shard, status").fetchall()
+        progress = {"total": 0, PENDING: 0, CLAIMED: 0, DONE: 0, FAILED: 0, "ok_items": 0, "failed_items": 0, "shards": {}}
+        for row in rows:
+            progress["total"] += row["n"]
+            progress[row["status"]] += row["n"]
+            progress["ok_items"] += row["ok_items"] or 0
+            progress["failed_items"] += row["failed_items"] or 0
+            progress["shards"].setdefault(row["shard"], {})[row["status"]] = row["n"]
+        return progress
+
+    def has_work(self, shards):
+        """True if any of the shards still has pending or claimed items."""
+        marks = ", ".join("?" * len(shards))
+        row = self._conn.execute(f"SELECT 1 FROM work WHERE shard IN ({marks}) AND status IN (?, ?) LIMIT 1",
+                                 (*shards, PENDING, CLAIMED)).fetchone()
+        return row is not None
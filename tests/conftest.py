@@ -0,0 +1,37 @@
+# ai_content_generator/tests/conftest.py
+
+# Shared test setup. Paths and switches that src/ modules read at import time
+# are pointed at a temporary directory first, so tests never touch the real
+# cache, idea indexes or content store, and never need an API key.
+
+import os
+import sys
+import tempfile
+
+_TEST_DIR = tempfile.mkdtemp(prefix="content-tests-")
+os.environ["CONTENT_CACHE_DISABLED"] = "1"
+os.environ["CONTENT_CACHE_DIR"] = os.path.join(_TEST_DIR, "cache")
+os.environ["IDEA_INDEX_DIR"] = os.path.join(_TEST_DIR, "idea_index")
+os.environ["CONTENT_STORE_PATH"] = os.path.join(_TEST_DIR, "content_store.db")
+os.environ.pop("CONTENT_METRICS_FILE", None)
+os.environ.pop("GEMINI_RPM", None)
+os.environ.pop("GEMINI_TPM", None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+from src.scheduler import configure_scheduler  # noqa: E402
+
+SITE_CONTEXT = {
+    "website_name": "Trail Notes",
+    "website_theme": "Beginner-friendly day hikes in the Alps",
+    "target_audience": "Adults new to hiking",
+    "tone_of_voice": "friendly",
+}
+
+
+@pytest.fixture(autouse=True)
+def fast_scheduler():
+    """Fresh shared scheduler per test, with no budgets and near-instant retries."""
+    yield configure_scheduler(max_retries=3, base_delay=0.001, max_delay=0.01)
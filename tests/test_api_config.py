@@ -0,0 +1,90 @@
+import pytest
+
+genai = pytest.importorskip("google.generativeai")
+from google.ai import generativelanguage as glm  # noqa: E402
+
+from src import api_config  # noqa: E402
+
+
+class StubGenerativeClient:
+    def __init__(self, client_options=None):
+        self.api_key = (client_options or {}).get("api_key")
+        self.requests = []
+
+    def _response(self, text):
+        return glm.GenerateContentResponse(candidates=[glm.Candidate(
+            content=glm.Content(role="model", parts=[glm.Part(text=text)]), finish_reason=1)])
+
+    def generate_content(self, request, **kwargs):
+        self.requests.append(request)
+        return self._response(f"answer for {self.api_key}")
+
+    def stream_generate_content(self, request, **kwargs):
+        self.requests.append(request)
+        return iter([self._response("Hello, "), self._response("world")])
+
+
+class StubCacheClient:
+    def __init__(self, client_options=None):
+        self.api_key = (client_options or {}).get("api_key")
+        self.created = []
+
+    def create_cached_content(self, cached_content, **kwargs):
+        self.created.append(cached_content)
+        return glm.CachedContent(name="cachedContents/site-context", model=cached_content.model,
+                                 display_name=cached_content.display_name)
+
+
+@pytest.fixture(autouse=True)
+def stub_clients(monkeypatch):
+    for name in ("_model_pool", "_model_digests", "_key_clients", "_key_cache_clients", "_context_cached_models"):
+        monkeypatch.setattr(api_config, name, {})
+    monkeypatch.setattr(glm, "GenerativeServiceClient", StubGenerativeClient)
+    monkeypatch.setattr(glm, "CacheServiceClient", StubCacheClient)
+
+
+def _client_for(model):
+    return api_config._key_clients[api_config._model_key_digest(model)]
+
+
+def test_each_key_sends_through_its_own_client():
+    first = api_config.get_model("key-a", "gemini-test")
+    second = api_config.get_model("key-b", "gemini-test")
+    assert api_config.get_model("key-a", "gemini-test") is first
+    # Relies on the SDK sending requests through GenerativeModel._client
+    assert first.generate_content("Topic: x").text == "answer for key-a"
+    assert second.generate_content("Topic: x").text == "answer for key-b"
+    assert len(_client_for(first).requests) == 1
+    assert _client_for(first).requests[0].model == "models/gemini-test"
+
+
+def test_streaming_uses_the_pooled_client():
+    model = api_config.get_model("key-a", "gemini-test")
+    assert "".join(chunk.text for chunk in model.generate_content("Topic: x", stream=True)) == "Hello, world"
+    assert len(_client_for(model).requests) == 1
+
+
+def test_sibling_models_share_the_key():
+    model = api_config.get_model("key-a", "gemini-test")
+    sibling = api_config.get_sibling_model(model, "gemini-test-lite")
+    assert _client_for(sibling) is _client_for(model)
+    assert api_config.get_sibling_model(object(), "gemini-test-lite") is None
+
+
+def test_context_cached_model_uses_the_callers_key():
+    model = api_config.get_model("key-a", "gemini-test")
+    api_config.get_model("key-b", "gemini-test")
+    cached = api_config.get_context_cached_model(model, "Website: Trail Notes")
+    # Relies on CachedContent._from_obj and GenerativeModel._client
+    assert cached is not None
+    digest = api_config._model_key_digest(model)
+    created = api_config._key_cache_clients[digest].created
+    assert [c.contents[0].parts[0].text for c in created] == ["Website: Trail Notes"]
+    assert cached.generate_content("Topic: x").text == "answer for key-a"
+    assert _client_for(model).requests[-1].cached_content == "cachedContents/site-context"
+    assert api_config.get_context_cached_model(model, "Website: Trail Notes") is cached
+    assert len(created) == 1
+
+
+def test_context_cache_needs_a_pooled_model():
+    assert api_config.get_context_cached_model(genai.GenerativeModel("gemini-test"), "prefix") is None
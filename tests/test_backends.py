@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from src.backends import FakeAPIError, FakeModel, ModelBackend
+
+
+def test_model_backend_is_abstract():
+    with pytest.raises(TypeError):
+        ModelBackend()
+
+    class NoGenerate(ModelBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        NoGenerate()
+
+
+def test_outputs_are_deterministic():
+    prompt = "Write a post.\nTopic: Packing for a day hike"
+    first = FakeModel(latency=0).generate_content(prompt)
+    second = FakeModel(latency=0).generate_content(prompt)
+    assert first.text == second.text
+    assert first.text.startswith("# Packing for a day hike")
+    assert first.usage_metadata.total_token_count > 0
+    assert FakeModel(latency=0, seed=1).generate_content(prompt).text != first.text
+
+
+def test_stream_matches_the_full_response():
+    model = FakeModel(latency=0)
+    prompt = "Topic: Trail running basics"
+    chunks = list(model.generate_content(prompt, stream=True))
+    assert len(chunks) > 1
+    assert "".join(chunk.text for chunk in chunks) == model.render_output(prompt)
+    assert chunks[-1].usage_metadata is not None
+    assert all(chunk.usage_metadata is None for chunk in chunks[:-1])
+
+
+def test_canned_outputs_win():
+    model = FakeModel(latency=0, canned_outputs={"numbered list": "1. Only idea"})
+    assert model.generate_content("Give me a numbered list").text == "1. Only idea"
+
+
+def test_json_ideas_prompt_returns_the_requested_count():
+    text = FakeModel(latency=0).render_output("Return exactly 4 blog post ideas as JSON")
+    assert len(json.loads(text)["ideas"]) == 4
+
+
+def test_failure_injection():
+    model = FakeModel(latency=0, failure_rate=1.0, failure_code=429)
+    with pytest.raises(FakeAPIError) as error:
+        model.generate_content("Topic: x")
+    assert error.value.code == 429
+    assert model.calls == 1
+
+
+def test_variants_count_calls_on_the_root_model():
+    model = FakeModel(latency=0)
+    fast = model.with_model_name("models/fake-flash")
+    assert fast.model_name == "models/fake-flash"
+    assert model.with_model_name("models/fake-flash") is fast
+    fast.generate_content("Topic: x")
+    model.generate_content("Topic: y")
+    assert model.calls == 2
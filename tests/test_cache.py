@@ -0,0 +1,82 @@
+import json
+import multiprocessing
+import os
+import time
+
+from src import cache
+from src.cache import ResponseCache, make_cache_key
+
+
+def _entries(cache_dir):
+    return sorted(name[:-5] for name in os.listdir(cache_dir) if name.endswith(".json"))
+
+
+def _fill(cache_dir, prefix, count, max_entries):
+    # Runs in a separate process
+    cache.RESCAN_INTERVAL_SECONDS = 0
+    responses = ResponseCache(cache_dir, max_entries=max_entries)
+    for i in range(count):
+        responses.set(f"{prefix}{i:03d}", f"text {prefix}{i}")
+
+
+def test_roundtrip_and_stable_keys(tmp_path):
+    responses = ResponseCache(str(tmp_path))
+    key = make_cache_key("models/fake", "Topic: x", {"temperature": 0.7})
+    assert key == make_cache_key("models/fake", "Topic: x", {"temperature": 0.7})
+    assert key != make_cache_key("models/fake", "Topic: x", {"temperature": 0.8})
+    assert responses.get(key) is None
+    responses.set(key, "Hello")
+    assert responses.get(key) == "Hello"
+    assert ResponseCache(str(tmp_path)).get(key) == "Hello"
+    assert responses.stats()["hits"] == 1 and responses.stats()["misses"] == 1
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    responses = ResponseCache(str(tmp_path), max_entries=3)
+    for key in ("a", "b", "c"):
+        responses.set(key, key)
+    responses.get("a")
+    responses.set("d", "d")
+    assert _entries(str(tmp_path)) == ["a", "c", "d"]
+
+
+def test_expired_entries_are_evicted_before_fresh_ones(tmp_path):
+    cache_dir = str(tmp_path)
+    writer = ResponseCache(cache_dir)
+    now = time.time()
+    for i, key in enumerate(["fresh1", "fresh2", "old1", "old2", "old3"]):
+        writer.set(key, key)
+        path = os.path.join(cache_dir, f"{key}.json")
+        if key.startswith("old"):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"created_at": now - 3600, "model": None, "text": key}, f)
+        # The fresh entries are the least recently used ones
+        os.utime(path, (now - 100 + i, now - 100 + i))
+
+    responses = ResponseCache(cache_dir, max_entries=5, max_age_seconds=600)
+    responses.set("new", "new")
+    assert _entries(cache_dir) == ["fresh1", "fresh2", "new"]
+    assert responses.stats()["entries"] == 3
+
+
+def test_size_limit_holds_across_instances(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "RESCAN_INTERVAL_SECONDS", 0)
+    first = ResponseCache(str(tmp_path), max_entries=10)
+    second = ResponseCache(str(tmp_path), max_entries=10)
+    for i in range(15):
+        first.set(f"a{i:03d}", "text")
+        second.set(f"b{i:03d}", "text")
+        assert len(_entries(str(tmp_path))) <= 10
+    assert second.get("a014") == "text"  # Written by the other instance
+
+
+def test_size_limit_holds_across_processes(tmp_path):
+    cache_dir = str(tmp_path)
+    mp = multiprocessing.get_context("spawn")
+    processes = [mp.Process(target=_fill, args=(cache_dir, prefix, 40, 10)) for prefix in ("a", "b", "c")]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+    assert 0 < len(_entries(cache_dir)) <= 10
@@ -0,0 +1,86 @@
+import json
+import os
+
+from conftest import SITE_CONTEXT
+from src.backends import FakeModel
+from src.bulk import ABOUT_PAGE, BLOG_POST, run_bulk_job
+from src.export import INDEX_LOG_NAME, Exporter
+
+
+def _post(topic, site_id="trail-notes"):
+    return {"site_id": site_id, "website_name": "Trail Notes", "artifact": BLOG_POST, "topic": topic,
+            "status": "ok", "content": f"# {topic}\n\nSome text.", "finished_at": "2026-10-18T10:00:00"}
+
+
+def _pages(export_dir, site_id="trail-notes"):
+    with open(os.path.join(export_dir, site_id, INDEX_LOG_NAME), encoding="utf-8") as f:
+        return {entry["title"]: entry["page"] for entry in map(json.loads, f)}
+
+
+def test_colliding_slugs_get_numbered_pages(tmp_path):
+    exporter = Exporter(str(tmp_path))
+    for topic in ("Trail Maps!", "Trail maps?", "trail maps.", "Trail Maps!"):
+        assert exporter.write(_post(topic))
+    exporter.close()
+    assert _pages(str(tmp_path)) == {"Trail Maps!": "posts/trail-maps", "Trail maps?": "posts/trail-maps-2",
+                                     "trail maps.": "posts/trail-maps-3"}
+    posts = sorted(os.listdir(tmp_path / "trail-notes" / "posts"))
+    assert posts == ["trail-maps-2.md", "trail-maps-3.md", "trail-maps.md"]
+
+
+def test_page_names_are_reloaded_from_the_index_log(tmp_path):
+    first = Exporter(str(tmp_path))
+    first.write(_post("Trail Maps!"))
+    first.write(_post("Trail maps?"))
+    first.close()
+
+    second = Exporter(str(tmp_path))
+    second.write(_post("Trail maps?"))  # Same topic keeps its page
+    second.write(_post("TRAIL MAPS"))  # A new colliding topic takes the next free number
+    second.finish_site("trail-notes")
+    second.write(_post("Trail Maps!"))  # Reloaded again after the site was finished
+    second.close()
+    assert _pages(str(tmp_path)) == {"Trail Maps!": "posts/trail-maps", "Trail maps?": "posts/trail-maps-2",
+                                     "TRAIL MAPS": "posts/trail-maps-3"}
+
+
+def test_bulk_run_finishes_each_site_after_its_last_item(tmp_path):
+    manifest = tmp_path / "sites.jsonl"
+    with open(manifest, "w", encoding="utf-8") as f:
+        for i in range(6):
+            f.write(json.dumps(dict(SITE_CONTEXT, site_id=f"site-{i}", website_name=f"Site {i}",
+                                    topics=[f"Topic {i}"], posts_from_ideas=2)) + "\n")
+    exporter = Exporter(str(tmp_path / "export"), ["markdown", "html"])
+    events = []
+    open_sites = []
+
+    def on_record(record):
+        events.append(("record", record["site_id"]))
+        exporter.write(record)
+        open_sites.append(len(exporter._post_pages))
+
+    def on_site_done(site_id):
+        events.append(("done", site_id))
+        exporter.finish_site(site_id)
+
+    summary = run_bulk_job(str(manifest), str(tmp_path / "out.jsonl"), FakeModel(latency=0), max_concurrency=2,
+                           on_record=on_record, on_site_done=on_site_done)
+    assert summary["ok"] == 6 * 5 and summary["failed"] == 0
+    done = [site_id for kind, site_id in events if kind == "done"]
+    assert sorted(done) == [f"site-{i}" for i in range(6)]
+    for site_id in done:
+        finished_at = events.index(("done", site_id))
+        assert ("record", site_id) not in events[finished_at:]
+    # Sites are released as they finish instead of being held until close()
+    assert max(open_sites) <= 3
+    assert exporter._post_pages == {}
+    assert os.path.exists(tmp_path / "export" / "site-0" / "html" / "index.html")
+    assert exporter.close() == 6 * 4  # About page and three posts per site
+
+
+def test_about_page_and_failed_records(tmp_path):
+    exporter = Exporter(str(tmp_path))
+    about = dict(_post(None), artifact=ABOUT_PAGE, content="About us.")
+    assert exporter.write(about)
+    assert not exporter.write(dict(_post("Broken"), status="error", content=None))
+    assert os.path.exists(tmp_path / "trail-notes" / "about.md")
@@ -0,0 +1,106 @@
+import json
+
+from conftest import SITE_CONTEXT
+from src.backends import FakeModel
+from src.bulk import run_bulk_job
+from src.generators import generate_blog_post_ideas, generate_blog_posts
+from src.idea_index import IdeaIndex, normalize_title
+
+
+def test_near_duplicates_are_detected():
+    index = IdeaIndex()
+    assert index.add("10 Tips for Your First Alpine Day Hike")
+    existing, score = index.find_duplicate("10 tips for your first alpine day-hike!")
+    assert existing == "10 Tips for Your First Alpine Day Hike"
+    assert score >= index.threshold
+    assert index.find_duplicate("Choosing waterproof boots on a budget")[0] is None
+
+
+def test_filter_new_drops_duplicates_within_the_batch():
+    titles = ["Best Trail Snacks", "The best trail snacks", "Reading a topographic map"]
+    assert IdeaIndex().filter_new(titles) == ["Best Trail Snacks", "Reading a topographic map"]
+
+
+def test_normalize_keeps_letters_of_any_script():
+    assert normalize_title("Café Guide: Zürich's Best Trails!") == "café guide zürich s best trails"
+    assert normalize_title("Лучшие маршруты в Альпах") == "лучшие маршруты в альпах"
+    assert normalize_title("初心者のためのハイキング入門") == "初心者のためのハイキング入門"
+    assert normalize_title("snake_case-title") == "snake case title"
+
+
+def test_non_latin_titles_are_kept_apart():
+    index = IdeaIndex()
+    titles = ["Лучшие маршруты в Альпах", "Как выбрать треккинговые ботинки", "初心者のためのハイキング入門"]
+    assert index.filter_new(titles) == titles
+    assert index.find_duplicate("Лучшие маршруты в Альпах")[0] == "Лучшие маршруты в Альпах"
+
+
+def test_titles_with_nothing_left_count_as_unique():
+    index = IdeaIndex()
+    assert index.add("How to?")
+    assert index.add("How to?")
+    assert len(index) == 0
+    assert index.find_duplicate("!!!") == (None, 0.0)
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    index = IdeaIndex()
+    index.filter_new(["Packing a first aid kit", "Лучшие маршруты в Альпах"])
+    path = str(tmp_path / "ideas.npz")
+    index.save(path)
+    loaded = IdeaIndex.load(path)
+    assert loaded.titles == index.titles
+    assert loaded.find_duplicate("packing a first-aid kit")[0] == "Packing a first aid kit"
+    assert not loaded.add("Лучшие маршруты в Альпах")
+
+
+def test_repeated_batch_topic_is_generated_once():
+    model = FakeModel(latency=0)
+    topics = ["Packing for a day hike", "Packing for a day hike", "Trail running basics"]
+    results = generate_blog_posts(SITE_CONTEXT, model, topics, use_cache=False, topic_index=IdeaIndex())
+    assert [r["topic"] for r in results] == topics
+    assert results[0]["content"] and not results[0]["error"]
+    assert results[1]["content"] is None and results[1]["error"]
+    assert results[2]["content"]
+    assert model.calls == 2
+
+
+def test_non_latin_ideas_survive_generation():
+    titles = ["Лучшие маршруты в Альпах", "初心者のためのハイキング入門", "Ποδοπορία στις Άλπεις"]
+    model = FakeModel(latency=0, canned_outputs={
+        "blog post ideas as JSON": json.dumps({"ideas": [{"title": title} for title in titles]}),
+        "numbered list": "\n".join(f"{i}. {title}" for i, title in enumerate(titles, 1)),
+    })
+    ideas = generate_blog_post_ideas(SITE_CONTEXT, model, use_cache=False, idea_index=IdeaIndex(), count=3)
+    assert ideas == titles
+
+
+def _bulk_manifest(tmp_path):
+    path = tmp_path / "manifest.jsonl"
+    row = dict(SITE_CONTEXT, site_id="trail-notes", about_page=False, ideas=False,
+               topics=["Packing for a day hike", "Trail running basics"])
+    path.write_text(json.dumps(row) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_bulk_rerun_without_resume_generates_posts_again(tmp_path):
+    manifest = _bulk_manifest(tmp_path)
+    output = str(tmp_path / "out.jsonl")
+    first = run_bulk_job(manifest, output, FakeModel(latency=0), resume=False)
+    assert first["ok"] == 2 and first["duplicates"] == 0
+    # The site's persisted posts index now holds both topics; a --no-resume run must still write them
+    second = run_bulk_job(manifest, output, FakeModel(latency=0), resume=False)
+    assert second["ok"] == 2 and second["duplicates"] == 0
+    # ...and so must a run to a fresh output file
+    third = run_bulk_job(manifest, str(tmp_path / "fresh.jsonl"), FakeModel(latency=0))
+    assert third["ok"] == 2 and third["duplicates"] == 0
+
+
+def test_bulk_resume_skips_finished_posts(tmp_path):
+    manifest = _bulk_manifest(tmp_path)
+    output = str(tmp_path / "out.jsonl")
+    run_bulk_job(manifest, output, FakeModel(latency=0))
+    model = FakeModel(latency=0)
+    summary = run_bulk_job(manifest, output, model)
+    assert summary["ok"] == 0 and summary["skipped"] == 2
+    assert model.calls == 0
@@ -0,0 +1,90 @@
+import threading
+import time
+
+from src import jobs
+from src.jobs import BACKGROUND, CANCELLED, DONE, FAILED, JobQueue
+
+
+def _wait(queue, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while queue.get(job_id).active and time.time() < deadline:
+        time.sleep(0.005)
+    return queue.get(job_id)
+
+
+def test_jobs_run_and_report_results():
+    queue = JobQueue(max_workers=2)
+    ok = queue.submit(lambda job, x: x * 2, 21, kind="double")
+    failed = queue.submit(lambda job: 1 / 0, kind="broken")
+    assert _wait(queue, ok).status == DONE and queue.get(ok).result == 42
+    assert _wait(queue, failed).status == FAILED and queue.get(failed).error == "division by zero"
+
+
+def test_finished_at_is_set_before_the_job_stops_being_active(monkeypatch):
+    queue = JobQueue(max_workers=1)
+    release = threading.Event()
+    job_id = queue.submit(lambda job: release.wait(5))
+    job = queue.get(job_id)
+    seen = []
+    real_time = time.time
+
+    def recording_time():
+        if threading.current_thread().name.startswith("content-job-"):
+            seen.append(job.status)
+        return real_time()
+
+    monkeypatch.setattr(jobs.time, "time", recording_time)
+    release.set()
+    while job.active:
+        time.sleep(0.005)
+    monkeypatch.undo()
+    assert job.finished_at is not None and seen
+    # The clock was read for finished_at while the job still counted as running
+    assert all(status in (jobs.QUEUED, jobs.RUNNING) for status in seen)
+
+
+def test_finished_jobs_are_pruned_under_concurrent_submits(monkeypatch):
+    monkeypatch.setattr(jobs, "MAX_FINISHED_JOBS", 20)
+    queue = JobQueue(max_workers=4)
+    errors = []
+
+    def submit_many():
+        try:
+            for _ in range(200):
+                queue.submit(lambda job: None)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=submit_many) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert all(job.finished_at is not None for job in queue.jobs() if not job.active)
+
+
+def test_same_key_reuses_the_active_job():
+    queue = JobQueue(max_workers=1)
+    release = threading.Event()
+    first = queue.submit(lambda job: release.wait(5), key=("site", "blog_post", "Topic", None, "hash-1"))
+    assert queue.submit(lambda job: None, key=("site", "blog_post", "Topic", None, "hash-1")) == first
+    # Another inputs hash (an edited context) is different work
+    assert queue.submit(lambda job: None, key=("site", "blog_post", "Topic", None, "hash-2")) != first
+    release.set()
+    _wait(queue, first)
+    assert queue.submit(lambda job: None, key=("site", "blog_post", "Topic", None, "hash-1")) != first
+
+
+def test_background_job_is_promoted_and_can_be_cancelled():
+    queue = JobQueue(max_workers=1)
+    release = threading.Event()
+    queue.submit(lambda job: release.wait(5))
+    prefetch = queue.submit(lambda job: "post", key="post", priority=BACKGROUND)
+    assert queue.submit(lambda job: "post", key="post") == prefetch
+    assert not queue.get(prefetch).background
+    other = queue.submit(lambda job: None, priority=BACKGROUND)
+    assert queue.cancel(other)
+    assert queue.get(other).status == CANCELLED
+    release.set()
+    assert _wait(queue, prefetch).result == "post"
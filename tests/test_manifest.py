@@ -0,0 +1,55 @@
+import json
+
+from conftest import SITE_CONTEXT
+from src.backends import FakeModel
+from src.bulk import run_bulk_job
+from src.manifest import iter_manifest
+
+
+def _read(path):
+    invalid = []
+    jobs = list(iter_manifest(str(path), on_invalid=lambda line_number, error: invalid.append(line_number)))
+    return [job["site_id"] for job in jobs], invalid
+
+
+def test_jsonl_rows_are_normalised(tmp_path):
+    path = tmp_path / "sites.jsonl"
+    path.write_text(json.dumps(dict(SITE_CONTEXT, site_id="a", topics=["One", " ", "Two"], about_page="no",
+                                    posts_from_ideas="2")) + "\n", encoding="utf-8")
+    job = next(iter_manifest(str(path)))
+    assert job["topics"] == ["One", "Two"]
+    assert job["about_page"] is False and job["ideas"] is True
+    assert job["posts_from_ideas"] == 2
+    assert job["context"]["site_id"] == "a"
+
+
+def test_malformed_jsonl_rows_are_skipped(tmp_path):
+    path = tmp_path / "sites.jsonl"
+    lines = [
+        json.dumps(dict(SITE_CONTEXT, site_id="a")),
+        "",
+        '{"website_name": "Broken", ',
+        json.dumps(["not", "an", "object"]),
+        json.dumps(dict(SITE_CONTEXT, site_id="b")),
+        json.dumps({"site_id": "no-name"}),  # Skipped with a warning, not invalid
+    ]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    assert _read(path) == (["a", "b"], [3, 4])
+
+
+def test_malformed_csv_rows_are_skipped(tmp_path):
+    path = tmp_path / "sites.csv"
+    too_long = "x" * 200000  # Over the csv module's field size limit
+    path.write_text("site_id,website_name,website_theme,topics\n"
+                    "a,Trail Notes,Day hikes,First|Second\n"
+                    f'b,Broken,"{too_long}",Topic\n'
+                    '"c",Quoted "Notes",Alpine huts,\n', encoding="utf-8")
+    assert _read(path) == (["a", "c"], [3])
+
+
+def test_bulk_run_counts_invalid_rows_as_failed(tmp_path):
+    path = tmp_path / "sites.jsonl"
+    path.write_text(json.dumps(dict(SITE_CONTEXT, site_id="a", about_page=False, ideas=False, topics=["Maps"]))
+                    + "\n{oops\n", encoding="utf-8")
+    summary = run_bulk_job(str(path), str(tmp_path / "out.jsonl"), FakeModel(latency=0))
+    assert summary["ok"] == 1 and summary["failed"] == 1
@@ -0,0 +1,88 @@
+import threading
+import time
+
+import pytest
+
+from src import scheduler
+from src.backends import FakeAPIError, FakeModel
+from src.scheduler import RequestScheduler, get_retry_delay, is_retryable_error
+
+
+def _failing(times, error):
+    calls = {"n": 0}
+
+    def fn():
+        calls["n"] += 1
+        if calls["n"] <= times:
+            raise error
+        return "ok"
+    return fn, calls
+
+
+def test_retries_retryable_errors_until_success():
+    fn, calls = _failing(2, FakeAPIError("busy", code=503))
+    call_info = {}
+    result = RequestScheduler(max_retries=3, base_delay=0.001).execute(fn, call_info=call_info)
+    assert result == "ok"
+    assert calls["n"] == 3
+    assert call_info["retries"] == 2
+
+
+def test_non_retryable_error_is_raised_at_once():
+    fn, calls = _failing(1, ValueError("bad request"))
+    with pytest.raises(ValueError):
+        RequestScheduler(max_retries=3, base_delay=0.001).execute(fn)
+    assert calls["n"] == 1
+
+
+def test_gives_up_after_max_retries():
+    fn, calls = _failing(10, FakeAPIError("quota", code=429))
+    sched = RequestScheduler(max_retries=2, base_delay=0.001, max_delay=0.01)
+    with pytest.raises(FakeAPIError):
+        sched.execute(fn)
+    assert calls["n"] == 3
+    assert sched.stats()["failed"] == 3
+
+
+def test_retryable_error_classification():
+    assert is_retryable_error(FakeAPIError("x", code=429))
+    assert is_retryable_error(FakeAPIError("x", code=503))
+    assert is_retryable_error(TimeoutError())
+    assert not is_retryable_error(FakeAPIError("x", code=400))
+    assert not is_retryable_error(ValueError())
+
+
+def test_retry_delay_hint_from_message():
+    assert get_retry_delay(Exception("Quota exceeded. Please retry in 2.5s")) == 2.5
+    assert get_retry_delay(Exception("no hint")) is None
+
+
+def test_request_budget_delays_requests_over_the_limit(monkeypatch):
+    monkeypatch.setattr(scheduler, "WINDOW_SECONDS", 0.3)
+    sched = RequestScheduler(requests_per_minute=2)
+    started = time.monotonic()
+    for _ in range(3):
+        sched.execute(lambda: "ok")
+    # The third request waits until the first one leaves the (shortened) window
+    assert time.monotonic() - started >= 0.25
+
+
+def test_token_budget_admits_one_oversized_request():
+    sched = RequestScheduler(tokens_per_minute=10)
+    assert sched.execute(lambda: "ok", estimated_tokens=50) == "ok"
+    assert sched.stats()["tokens_last_minute"] == 50
+
+
+def test_concurrent_calls_are_all_counted():
+    sched = RequestScheduler()
+    model = FakeModel(latency=0.01)
+    threads = [threading.Thread(target=sched.execute, args=(lambda: model.generate_content("Topic: x"),))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = sched.stats()
+    assert stats["completed"] == 8
+    assert stats["in_flight"] == 0
+    assert model.calls == 8
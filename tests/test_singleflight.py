@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+from src.backends import FakeModel
+from src.singleflight import FlightCancelled, SingleFlight
+from src.utils import call_gemini_api
+
+
+def test_followers_join_the_leaders_flight():
+    flights = SingleFlight()
+    flight, leader = flights.join("key")
+    same, follower_leads = flights.join("key")
+    assert leader and not follower_leads
+    assert same is flight
+    flight.append("Hello, ")
+    flight.append("world")
+    flights.finish(flight)
+    assert same.wait() == "Hello, world"
+    flights.leave(same)
+    flights.leave(flight)
+    assert flights.in_flight() == 0
+
+
+def test_finished_flight_is_not_joined_again():
+    flights = SingleFlight()
+    flight, _ = flights.join("key")
+    flights.finish(flight)
+    flights.leave(flight)
+    _, leader = flights.join("key")
+    assert leader
+
+
+def test_late_joiner_gets_earlier_chunks():
+    flights = SingleFlight()
+    flight, _ = flights.join("key")
+    flight.append("a")
+    late, _ = flights.join("key")
+    flight.append("b")
+    flights.finish(flight)
+    assert list(late.chunks()) == ["a", "b"]
+
+
+def test_error_is_shared_with_every_caller():
+    flights = SingleFlight()
+    flight, _ = flights.join("key")
+    follower, _ = flights.join("key")
+    flights.finish(flight, error="quota exceeded")
+    assert follower.wait() is None
+    assert follower.error == "quota exceeded"
+
+
+def test_flight_is_cancelled_when_every_caller_leaves():
+    flights = SingleFlight()
+    flight, _ = flights.join("key")
+    follower, _ = flights.join("key")
+    flights.leave(follower)
+    flight.check_cancelled()  # One caller left: still running
+    flights.leave(flight)
+    with pytest.raises(FlightCancelled):
+        flight.check_cancelled()
+
+
+def test_identical_concurrent_calls_reach_the_model_once():
+    model = FakeModel(latency=0.2)
+    results = []
+
+    def call():
+        results.append(call_gemini_api(model, "Topic: Packing for your first hike", use_cache=False))
+
+    threads = [threading.Thread(target=call) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert model.calls == 1
+    assert len(results) == 5 and len(set(results)) == 1 and results[0]
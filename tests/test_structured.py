@@ -0,0 +1,98 @@
+import json
+
+from conftest import SITE_CONTEXT
+from src.backends import FakeModel
+from src.generators import generate_blog_post_ideas
+from src.structured import JsonArrayStreamParser, parse_json_array
+
+IDEAS = {"ideas": [
+    {"title": "Packing [light] for \"day\" hikes", "keywords": ["pack", "list"]},
+    {"title": "Trail food, {quick} and cheap", "keywords": []},
+    {"title": "Reading a map \\ compass", "keywords": ["map"]},
+]}
+
+
+def test_elements_arrive_as_soon_as_they_complete():
+    text = json.dumps(IDEAS)
+    parser = JsonArrayStreamParser("ideas")
+    seen = []
+    for position, char in enumerate(text):
+        for item in parser.feed(char):
+            seen.append((item, position))
+    assert [item for item, _ in seen] == IDEAS["ideas"]
+    # The first idea is returned well before the stream ends
+    assert seen[0][1] < len(text) // 2
+    assert parser.finished
+    assert parser.errors == 0
+
+
+def test_arbitrary_chunk_sizes_give_the_same_items():
+    text = json.dumps(IDEAS, indent=2)
+    for size in (1, 3, 7, 64, len(text)):
+        parser = JsonArrayStreamParser("ideas")
+        items = []
+        for start in range(0, len(text), size):
+            items.extend(parser.feed(text[start:start + size]))
+        assert items == IDEAS["ideas"]
+
+
+def test_preamble_and_code_fence_are_skipped():
+    text = "Here are your ideas:\n```json\n" + json.dumps(IDEAS) + "\n```"
+    assert parse_json_array(text, "ideas") == IDEAS["ideas"]
+    assert parse_json_array("```json\n" + json.dumps(IDEAS["ideas"]) + "\n```") == IDEAS["ideas"]
+
+
+def test_brackets_in_a_preamble_do_not_start_the_array():
+    text = "Here are [10] ideas:\n" + json.dumps(IDEAS)
+    parser = JsonArrayStreamParser("ideas")
+    items = []
+    for start in range(0, len(text), 5):
+        items.extend(parser.feed(text[start:start + 5]))
+    assert items == IDEAS["ideas"] and parser.errors == 0
+    # Without the key only a top-level array counts
+    assert parse_json_array(text) == []
+    assert parse_json_array("Here are [10] ideas:\n1. Packing light") == []
+
+
+def test_bare_elements():
+    assert parse_json_array('[1, "two", true, null, 3.5]') == [1, "two", True, None, 3.5]
+
+
+def test_truncated_output_keeps_finished_elements():
+    text = json.dumps(IDEAS)
+    cut = text.index("Reading")
+    assert parse_json_array(text[:cut], "ideas") == IDEAS["ideas"][:2]
+
+
+def test_invalid_element_is_counted_and_skipped():
+    parser = JsonArrayStreamParser()
+    items = parser.feed('[{"title": "ok"}, {title: broken}, {"title": "also ok"}]')
+    assert items == [{"title": "ok"}, {"title": "also ok"}]
+    assert parser.errors == 1
+
+
+def test_strict_parser_stops_at_the_first_invalid_element():
+    parser = JsonArrayStreamParser(strict=True)
+    assert parser.feed('[{"title": "ok"}, {title: broken}, {"title": "not reached"}]') == [{"title": "ok"}]
+    assert parser.finished and parser.errors == 1
+    assert parser.feed('{"title": "late"}]') == []
+
+
+def test_text_after_the_array_is_ignored():
+    parser = JsonArrayStreamParser()
+    assert parser.feed('["a"] trailing ["b"]') == ["a"]
+    assert parser.feed('["c"]') == []
+
+
+def test_ideas_with_a_bracketed_preamble_are_parsed_as_a_list():
+    model = FakeModel(latency=0, canned_outputs={
+        "blog post ideas as JSON": "Here are [3] ideas:\n1. Packing light\n2. Trail food\n3. Map reading"})
+    assert generate_blog_post_ideas(SITE_CONTEXT, model, use_cache=False, count=3) == [
+        "Packing light", "Trail food", "Map reading"]
+
+
+def test_malformed_idea_stops_parsing_and_falls_back_to_the_list():
+    model = FakeModel(latency=0, canned_outputs={
+        "blog post ideas as JSON": "[Draft]\n1. Packing light\n2. Trail food\n3. Map reading"})
+    assert generate_blog_post_ideas(SITE_CONTEXT, model, use_cache=False, count=3) == [
+        "Packing light", "Trail food", "Map reading"]
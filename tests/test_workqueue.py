@@ -0,0 +1,167 @@
+import glob
+import json
+import os
+
+import pytest
+
+from conftest import SITE_CONTEXT
+from main import parse_args
+from src.manifest import normalize_job
+from src.sharded import parse_shard_ids, run_sharded
+from src.workqueue import CLAIMED, DONE, FAILED, PENDING, WorkQueue, shard_for
+
+
+def _job(site_id, topics=()):
+    return normalize_job(dict(SITE_CONTEXT, site_id=site_id, topics=list(topics)))
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"))
+    yield queue
+    queue.close()
+
+
+def _status(queue, item_id):
+    return queue._conn.execute("SELECT status, attempts FROM work WHERE item_id = ?", (item_id,)).fetchone()
+
+
+def test_shard_for_is_stable_and_in_range():
+    assert shard_for("site-a", 8) == shard_for("site-a", 8)
+    assert all(0 <= shard_for(f"site-{i}", 5) < 5 for i in range(100))
+    assert len({shard_for(f"site-{i}", 4) for i in range(100)}) == 4
+
+
+def test_parse_shard_ids():
+    assert parse_shard_ids(None, 3) == [0, 1, 2]
+    assert parse_shard_ids("0,2, 5-7", 8) == [0, 2, 5, 6, 7]
+    with pytest.raises(ValueError):
+        parse_shard_ids("3-4", 4)
+
+
+def test_enqueue_is_idempotent(queue):
+    jobs = [_job("a"), _job("b")]
+    assert queue.enqueue_jobs(jobs, 2) == (2, 0)
+    assert queue.enqueue_jobs(jobs, 2) == (0, 0)
+    assert queue.progress()["total"] == 2
+
+
+def test_changed_job_is_queued_again(queue):
+    queue.enqueue_jobs([_job("a", ["First topic"])], 1)
+    item_id, _ = queue.claim([0], "w1")
+    queue.complete(item_id, "w1", ok_items=3)
+    assert queue.enqueue_jobs([_job("a", ["First topic"])], 1) == (0, 0)
+    assert _status(queue, "a")["status"] == DONE
+
+    assert queue.enqueue_jobs([_job("a", ["First topic", "Second topic"])], 1) == (0, 1)
+    assert tuple(_status(queue, "a")) == (PENDING, 0)
+    _, job = queue.claim([0], "w1")
+    assert job["topics"] == ["First topic", "Second topic"]
+
+
+def test_requeue_drops_a_stale_claim(queue):
+    queue.enqueue_jobs([_job("a")], 1)
+    queue.claim([0], "w1")
+    queue.enqueue_jobs([_job("a", ["New topic"])], 1)
+    queue.complete("a", "w1")  # The old worker finishing the old job must not mark the new one done
+    assert _status(queue, "a")["status"] == PENDING
+
+
+def test_claim_prefers_the_home_shard(queue):
+    jobs = [_job(f"site-{i}") for i in range(20)]
+    queue.enqueue_jobs(jobs, 2)
+    home = [job["site_id"] for job in jobs if shard_for(job["site_id"], 2) == 1]
+    claimed = [queue.claim([1, 0], "w1")[0] for _ in range(len(home))]
+    assert claimed == home
+    assert shard_for(queue.claim([1, 0], "w1")[0], 2) == 0  # Then helps with the other shard
+    assert queue.claim([1], "w1") is None
+
+
+def test_expired_lease_is_claimed_again(queue):
+    queue.enqueue_jobs([_job("a")], 1)
+    assert queue.claim([0], "w1", lease_seconds=-1)[0] == "a"
+    assert not queue.heartbeat("a", "w2")
+    assert queue.claim([0], "w2")[0] == "a"
+    assert tuple(_status(queue, "a")) == (CLAIMED, 2)
+    assert not queue.heartbeat("a", "w1")
+
+
+def test_expired_lease_out_of_attempts_is_parked(queue):
+    queue.enqueue_jobs([_job("a")], 1)
+    for _ in range(2):
+        queue.claim([0], "w1", lease_seconds=-1, max_attempts=2)
+    assert queue.claim([0], "w1", max_attempts=2) is None
+    assert _status(queue, "a")["status"] == FAILED
+    assert not queue.has_work([0])
+
+
+def test_fail_requeues_until_attempts_run_out(queue):
+    queue.enqueue_jobs([_job("a")], 1)
+    queue.claim([0], "w1", max_attempts=2)
+    queue.fail("a", "w1", "boom", max_attempts=2)
+    assert _status(queue, "a")["status"] == PENDING
+    queue.claim([0], "w1", max_attempts=2)
+    queue.fail("a", "w1", "boom", max_attempts=2)
+    assert _status(queue, "a")["status"] == FAILED
+
+
+def test_release_worker(queue):
+    queue.enqueue_jobs([_job("a"), _job("b")], 1)
+    queue.claim([0], "crashed", max_attempts=1)
+    queue.claim([0], "other")
+    assert queue.release_worker("crashed", max_attempts=1) == 1
+    assert _status(queue, "a")["status"] == FAILED  # Out of attempts
+    assert _status(queue, "b")["status"] == CLAIMED  # Held by a live worker
+
+    queue.enqueue_jobs([_job("c")], 1)
+    queue.claim([0], "crashed")
+    assert queue.release_worker("crashed") == 1
+    assert _status(queue, "c")["status"] == PENDING
+
+
+def test_retry_failed(queue):
+    queue.enqueue_jobs([_job("a")], 1)
+    queue.claim([0], "w1", max_attempts=1)
+    queue.fail("a", "w1", "boom", max_attempts=1)
+    assert queue.retry_failed() == 1
+    assert tuple(_status(queue, "a")) == (PENDING, 0)
+
+
+def test_no_resume_is_rejected_with_workers():
+    with pytest.raises(SystemExit):
+        parse_args(["--manifest", "m.jsonl", "--workers", "2", "--no-resume"])
+    assert parse_args(["--manifest", "m.jsonl", "--workers", "2", "--combined"]).combined
+
+
+def _write_manifest(path, topics_by_site):
+    with open(path, "w", encoding="utf-8") as f:
+        for site_id, topics in topics_by_site.items():
+            f.write(json.dumps(dict(SITE_CONTEXT, site_id=site_id, topics=topics)) + "\n")
+
+
+def _records(output_dir):
+    records = []
+    for path in glob.glob(os.path.join(output_dir, "shard-*.jsonl")):
+        with open(path, encoding="utf-8") as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    return records
+
+
+def test_sharded_run_with_fake_backend(tmp_path):
+    manifest = str(tmp_path / "sites.jsonl")
+    output_dir = str(tmp_path / "out")
+    sites = {f"site-{i}": [f"Topic {i} about trail maps"] for i in range(4)}
+    _write_manifest(manifest, sites)
+    progress = run_sharded(manifest, output_dir, workers=2, backend="fake", fake_latency=0, combined=True)
+    assert progress["done"] == 4 and progress["failed"] == 0
+    records = _records(output_dir)
+    assert len(records) == 12 and all(record["status"] == "ok" for record in records)
+
+    # An edited manifest: the changed site is queued again and only its new post is generated
+    sites["site-0"].append("Packing list for a hut-to-hut trek")
+    _write_manifest(manifest, sites)
+    progress = run_sharded(manifest, output_dir, workers=2, backend="fake", fake_latency=0, combined=True)
+    assert progress["done"] == 4
+    new_records = [record for record in _records(output_dir) if record not in records]
+    assert [(record["site_id"], record["topic"]) for record in new_records] == [
+        ("site-0", "Packing list for a hut-to-hut trek")]